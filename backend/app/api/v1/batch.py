@@ -0,0 +1,153 @@
+"""
+批量任务相关 API 路由
+"""
+from typing import List, Optional
+from uuid import UUID
+from pathlib import Path
+from fastapi import APIRouter, File, Form, HTTPException, Path as PathParam, Query, Request, UploadFile
+
+from app.services.batch_service import BatchService, BATCH_DOWNLOAD_XLSX, BATCH_DOWNLOAD_ZIP
+from app.services.excel_pool import ExcelPoolBusyError
+from app.schemas.batch import BatchCreateResponse, BatchProgress
+from app.schemas.common import ResponseModel
+from app.utils.file_download import file_download_response
+from app.core.config import get_settings
+from app.core.logging import logger
+
+
+router = APIRouter(prefix="/batches", tags=["批量任务"])
+settings = get_settings()
+
+DOWNLOAD_MEDIA_TYPES = {
+    BATCH_DOWNLOAD_XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    BATCH_DOWNLOAD_ZIP: "application/zip",
+}
+
+
+@router.post(
+    "",
+    response_model=ResponseModel[BatchCreateResponse],
+    summary="批量上传图片并提交 OCR"
+)
+async def create_batch(
+    files: List[UploadFile] = File(..., description="图片文件（可多个），或包含图片的 zip 压缩包"),
+    name: Optional[str] = Form(None, description="批次名称，默认使用第一个文件名"),
+    generate_excel: Optional[bool] = Query(None, description="OCR 完成后是否自动生成 Excel，默认使用配置")
+):
+    """
+    批量上传图片并提交 OCR（一个请求创建多个任务）
+    
+    - 支持在一个 multipart 请求中上传多个 `files`，zip 压缩包会被展开（跳过目录、隐藏文件与非图片文件）
+    - 所有任务在一个事务中批量写入，随后提交到后台 OCR 任务池，并发数由 `ocr_worker_concurrency` 控制
+    - 单个批次最多 `batch_max_files` 张图片；无法识别的文件会被跳过并在 `rejected` 中返回
+    
+    进度通过 `GET /batches/{batch_id}` 查询，完成后通过 `GET /batches/{batch_id}/download` 下载
+    
+    Args:
+        files: 图片文件或 zip 压缩包
+        name: 批次名称
+        generate_excel: OCR 完成后是否自动生成 Excel
+    
+    Returns:
+        批次 ID 及各任务信息
+    """
+    logger.info(f"接收到批量上传请求: files={len(files)}, name={name}")
+    
+    success, message, data = await BatchService.create_batch(files, name, generate_excel)
+    
+    if not success:
+        logger.error(f"批量上传失败: {message}")
+        raise HTTPException(status_code=400, detail=message)
+    
+    return ResponseModel(success=True, message=message, data=data)
+
+
+@router.get(
+    "/{batch_id}",
+    response_model=ResponseModel[BatchProgress],
+    summary="查询批次进度"
+)
+async def get_batch_progress(
+    batch_id: UUID = PathParam(..., description="批次 ID")
+):
+    """
+    查询批次的汇总进度
+    
+    返回排队 / 处理中 / 完成 / 失败的任务数、完成百分比，以及每个任务的状态（按上传顺序）
+    
+    Args:
+        batch_id: 批次 ID
+    
+    Returns:
+        批次进度
+    
+    Raises:
+        HTTPException: 批次不存在
+    """
+    success, message, data = await BatchService.get_batch_progress(batch_id)
+    
+    if not success:
+        raise HTTPException(status_code=404, detail=message)
+    
+    return ResponseModel(success=True, message=message, data=data)
+
+
+@router.get(
+    "/{batch_id}/download",
+    summary="下载批次的合并文件"
+)
+async def download_batch(
+    request: Request,
+    batch_id: UUID = PathParam(..., description="批次 ID"),
+    format: str = Query(BATCH_DOWNLOAD_XLSX, pattern="^(xlsx|zip)$", description="xlsx：合并为一个多 Sheet 工作簿；zip：每个任务一个工作簿"),
+    partial: bool = Query(False, description="是否允许在批次未全部完成时只下载已完成的任务")
+):
+    """
+    下载批次的合并文件（按需生成，任务未变化时复用）
+    
+    - `format=xlsx`：所有任务的表格合并为一个工作簿，Sheet 名称为 "序号_原文件名"
+    - `format=zip`：每个任务当前版本的 Excel（含编辑结果）打包为 zip
+    
+    响应与单任务下载一致，带 ETag / Cache-Control 并支持 Range
+    
+    Args:
+        batch_id: 批次 ID
+        format: 下载格式
+        partial: 是否允许部分下载
+    
+    Returns:
+        xlsx 或 zip 文件
+    
+    Raises:
+        HTTPException: 批次不存在（404）、批次未完成（409）、无法生成（400）或生成队列繁忙（503）
+    """
+    logger.info(f"下载批次 {batch_id} 的合并文件: format={format}, partial={partial}")
+    
+    # 检查批次是否存在、是否已完成
+    success, message, progress = await BatchService.get_batch_progress(batch_id)
+    if not success:
+        raise HTTPException(status_code=404, detail=message)
+    if not partial and progress.done != progress.total:
+        raise HTTPException(
+            status_code=409,
+            detail=f"批次尚未全部完成: {progress.done}/{progress.total}，可使用 partial=true 下载已完成的部分"
+        )
+    
+    try:
+        success, message, file_path = await BatchService.ensure_batch_download(batch_id, format, partial)
+    except ExcelPoolBusyError as e:
+        logger.warning(f"Excel 生成繁忙: batch_id={batch_id}, {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    if not success:
+        logger.error(f"生成批次文件失败: {message}")
+        raise HTTPException(status_code=400, detail=message)
+    
+    batch, _, _ = await BatchService.load_batch(batch_id)
+    return await file_download_response(
+        request,
+        Path(file_path),
+        filename=BatchService.get_download_filename(batch, format),
+        media_type=DOWNLOAD_MEDIA_TYPES[format],
+        cache_control=settings.excel_download_cache_control
+    )
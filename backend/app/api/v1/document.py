@@ -0,0 +1,139 @@
+"""
+文档（多页合并）相关 API 路由
+"""
+from typing import Optional
+from uuid import UUID
+from pathlib import Path
+from fastapi import APIRouter, HTTPException, Path as PathParam, Query, Request
+
+from app.models.document import DocumentLayout
+from app.services.document_service import DocumentService
+from app.services.excel_pool import ExcelPoolBusyError
+from app.schemas.document import DocumentCreate, DocumentInfo
+from app.schemas.common import ResponseModel
+from app.utils.file_download import file_download_response
+from app.core.config import get_settings
+from app.core.logging import logger
+
+
+router = APIRouter(prefix="/documents", tags=["文档合并"])
+settings = get_settings()
+
+
+@router.post(
+    "",
+    response_model=ResponseModel[DocumentInfo],
+    summary="创建文档"
+)
+async def create_document(body: DocumentCreate):
+    """
+    把多个任务（多页扫描件的各页）按页顺序组织为一个文档
+    
+    - `task_ids`：按页顺序排列的任务 ID
+    - `batch_id`：使用批次内的任务（按上传顺序）作为各页，与 `task_ids` 二选一
+    - `layout`：默认工作簿布局，`sheets` 每个表格一个 Sheet，`stacked` 所有表格在一个 Sheet 中纵向排列
+    
+    Args:
+        body: 创建文档请求
+    
+    Returns:
+        文档信息
+    """
+    logger.info(f"创建文档: name={body.name}, pages={len(body.task_ids or [])}, batch_id={body.batch_id}")
+    
+    success, message, data = await DocumentService.create_document(
+        task_ids=body.task_ids,
+        batch_id=body.batch_id,
+        name=body.name,
+        layout=body.layout
+    )
+    
+    if not success:
+        raise HTTPException(status_code=400, detail=message)
+    
+    return ResponseModel(success=True, message="文档创建成功", data=data)
+
+
+@router.get(
+    "/{document_id}",
+    response_model=ResponseModel[DocumentInfo],
+    summary="获取文档信息"
+)
+async def get_document(
+    document_id: UUID = PathParam(..., description="文档 ID")
+):
+    """
+    获取文档信息与各页状态
+    
+    Args:
+        document_id: 文档 ID
+    
+    Returns:
+        文档信息
+    
+    Raises:
+        HTTPException: 文档不存在
+    """
+    success, message, data = await DocumentService.get_document_info(document_id)
+    
+    if not success:
+        raise HTTPException(status_code=404, detail=message)
+    
+    return ResponseModel(success=True, message=message, data=data)
+
+
+@router.get(
+    "/{document_id}/download",
+    summary="下载文档工作簿"
+)
+async def download_document(
+    request: Request,
+    document_id: UUID = PathParam(..., description="文档 ID"),
+    layout: Optional[DocumentLayout] = Query(None, description="工作簿布局，默认使用文档的布局")
+):
+    """
+    下载文档合并后的工作簿（按需生成，各页未变化时复用）
+    
+    工作簿在后台进程中逐页流式写入，任何时刻只加载一页的表格；
+    编辑过的页使用编辑后的数据
+    
+    Args:
+        document_id: 文档 ID
+        layout: 工作簿布局
+    
+    Returns:
+        Excel 文件
+    
+    Raises:
+        HTTPException: 文档不存在（404）、有页面未完成 OCR（409）、无法生成（400）或生成队列繁忙（503）
+    """
+    logger.info(f"下载文档 {document_id} 的工作簿: layout={layout}")
+    
+    # 检查文档是否存在、各页是否已完成
+    success, message, info = await DocumentService.get_document_info(document_id)
+    if not success:
+        raise HTTPException(status_code=404, detail=message)
+    if info.ready_pages != info.total_pages:
+        raise HTTPException(
+            status_code=409,
+            detail=f"文档尚有页面未完成 OCR: {info.ready_pages}/{info.total_pages}"
+        )
+    
+    try:
+        success, message, excel_path = await DocumentService.ensure_document_excel(document_id, layout)
+    except ExcelPoolBusyError as e:
+        logger.warning(f"Excel 生成繁忙: document_id={document_id}, {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    if not success:
+        logger.error(f"生成文档工作簿失败: {message}")
+        raise HTTPException(status_code=400, detail=message)
+    
+    document, _, _ = await DocumentService.load_document(document_id)
+    return await file_download_response(
+        request,
+        Path(excel_path),
+        filename=DocumentService.get_download_filename(document),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        cache_control=settings.excel_download_cache_control
+    )
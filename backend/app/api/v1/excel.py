@@ -5,16 +5,19 @@ from uuid import UUID
 from pathlib import Path
 from datetime import datetime
 import re
-from fastapi import APIRouter, HTTPException, Path as PathParam
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Path as PathParam, Request
 
 from app.services.excel_service import ExcelService
+from app.services.excel_pool import ExcelPoolBusyError
 from app.services.task_service import TaskService
 from app.schemas.common import ResponseModel
+from app.utils.file_download import file_download_response
+from app.core.config import get_settings
 from app.core.logging import logger
 
 
 router = APIRouter(prefix="/excel", tags=["Excel 服务"])
+settings = get_settings()
 
 
 @router.post(
@@ -26,10 +29,13 @@ async def generate_excel(
     task_id: UUID = PathParam(..., description="任务 ID")
 ):
     """
-    根据任务的 OCR JSON 生成 Excel 文件（多表 → 多 Sheet）
+    生成任务当前版本的 Excel 文件（多表 → 多 Sheet）
+    
+    已编辑过的任务使用编辑后的数据；当前版本的 Excel 已存在时直接复用。
+    下载接口会按需生成，调用本接口只是提前生成
     
     前置条件：
-    - 任务状态必须为 ocr_done
+    - 任务状态必须为 ocr_done / excel_generated / editable
     - OCR JSON 文件必须存在
     
     Args:
@@ -75,14 +81,19 @@ async def generate_excel(
     summary="下载 Excel 文件"
 )
 async def download_excel(
+    request: Request,
     task_id: UUID = PathParam(..., description="任务 ID")
 ):
     """
-    下载生成的 Excel 文件
+    下载任务当前版本的 Excel 文件（尚未生成或数据已修改时先生成）
+    
+    响应带强 ETag（文件内容哈希）与 Cache-Control：
+    - If-None-Match 与当前文件一致时返回 304，不重复传输
+    - 支持单区间 Range（206），便于断点续传
     
     前置条件：
-    - 任务状态必须为 excel_generated 或 editable
-    - Excel 文件必须存在
+    - 任务状态必须为 ocr_done / excel_generated / editable
+    - OCR JSON 文件必须存在
     
     Args:
         task_id: 任务 ID
@@ -91,7 +102,7 @@ async def download_excel(
         Excel 文件
         
     Raises:
-        HTTPException: 任务不存在或文件不存在
+        HTTPException: 任务不存在、无法生成（400）或生成队列繁忙（503）
     """
     logger.info(f"下载任务 {task_id} 的 Excel 文件")
     
@@ -100,13 +111,19 @@ async def download_excel(
     if not task:
         raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
     
-    # 检查 Excel 文件是否存在
-    if not task.excel_path:
-        raise HTTPException(status_code=400, detail="Excel 文件尚未生成")
+    # 获取当前版本的 Excel（按需生成）
+    try:
+        success, message, excel_path = await ExcelService.ensure_excel(task_id)
+    except ExcelPoolBusyError as e:
+        logger.warning(f"Excel 生成繁忙: task_id={task_id}, {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    if not success:
+        logger.error(f"生成 Excel 失败: {message}")
+        raise HTTPException(status_code=400, detail=message)
     
-    excel_path = Path(task.excel_path)
-    if not excel_path.exists():
-        raise HTTPException(status_code=404, detail="Excel 文件不存在")
+    excel_path = Path(excel_path)
+    task = await TaskService.get_task(task_id)
     
     # 返回文件（图片名称_修改时间）
     image_stem = "image"
@@ -119,8 +136,10 @@ async def download_excel(
     updated_at = task.updated_at or datetime.utcnow()
     updated_stamp = updated_at.strftime("%Y%m%d_%H%M%S")
     filename = f"{image_stem}_{updated_stamp}.xlsx"
-    return FileResponse(
-        path=str(excel_path),
+    return await file_download_response(
+        request,
+        excel_path,
         filename=filename,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        cache_control=settings.excel_download_cache_control
     )
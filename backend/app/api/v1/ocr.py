@@ -1,17 +1,25 @@
 """
 OCR 相关 API 路由
 """
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, HTTPException, Path as PathParam
+from fastapi import APIRouter, HTTPException, Path as PathParam, Query
 
 from app.services.ocr_service import OCRService
+from app.services.ocr_worker import get_ocr_worker_pool
+from app.services.excel_pool import get_excel_pool
+from app.clients.ocr_client import get_ocr_client
+from app.clients.ocr_status_mux import get_ocr_status_mux
 from app.services.task_service import TaskService
 from app.schemas.ocr import OCRJobResponse, OCRHealthResponse
 from app.schemas.common import ResponseModel
+from app.models.task import TaskStatus
 from app.core.logging import logger
+from app.core.config import get_settings
 
 
 router = APIRouter(prefix="/ocr", tags=["OCR 服务"])
+settings = get_settings()
 
 
 @router.get(
@@ -38,6 +46,32 @@ async def check_ocr_health():
     )
 
 
+@router.get(
+    "/stats",
+    response_model=ResponseModel,
+    summary="OCR 连接池与后台任务池统计"
+)
+async def get_ocr_stats():
+    """
+    获取 OCR HTTP 连接池、状态多路复用器、后台任务池与 Excel 生成进程池的统计信息
+    
+    用于评估连接池大小（max_connections / keepalive）和 worker 并发数是否合适
+    
+    Returns:
+        连接池统计（请求数、并发数、连接数）与任务池统计（排队数、处理中数）
+    """
+    return ResponseModel(
+        success=True,
+        message="获取 OCR 统计成功",
+        data={
+            "http_pool": get_ocr_client().get_pool_stats(),
+            "status_mux": get_ocr_status_mux().stats(),
+            "worker_pool": get_ocr_worker_pool().stats(),
+            "excel_pool": get_excel_pool().stats()
+        }
+    )
+
+
 @router.post(
     "/start/{task_id}",
     response_model=ResponseModel[OCRJobResponse],
@@ -86,7 +120,61 @@ async def start_ocr_job(
         message=message,
         data=OCRJobResponse(
             task_id=task.task_id,
-            ocr_job_id=task.ocr_job_id,
+            ocr_job_id=task.ocr_job_id or "",
+            status=task.status.value,
+            message=message
+        )
+    )
+
+
+@router.post(
+    "/submit/{task_id}",
+    response_model=ResponseModel[OCRJobResponse],
+    summary="提交 OCR 任务到后台队列"
+)
+async def submit_ocr_job(
+    task_id: UUID = PathParam(..., description="任务 ID"),
+    generate_excel: Optional[bool] = Query(None, description="OCR 完成后是否自动生成 Excel（默认取配置）")
+):
+    """
+    提交 OCR 任务到后台队列（立即返回）
+    
+    **流程**：
+    1. 验证任务存在且已上传图片
+    2. 任务状态置为 ocr_queued 并进入后台队列
+    3. 后台 worker 依次完成：创建 OCR job → 轮询状态 → 保存 JSON → 可选生成 Excel
+    
+    **进度查询**：
+    - 通过 `GET /tasks/{task_id}` 查看任务状态
+    - ocr_queued → ocr_processing → ocr_done（或 excel_generated / ocr_failed）
+    
+    Args:
+        task_id: 任务 ID (UUID)
+        generate_excel: OCR 完成后是否自动生成 Excel
+    
+    Returns:
+        提交结果（包含当前任务状态）
+    
+    Raises:
+        HTTPException: 任务不存在或状态不允许提交
+    """
+    logger.info(f"接收到 OCR 提交请求: task_id={task_id}, generate_excel={generate_excel}")
+    
+    success, message = await get_ocr_worker_pool().submit(task_id, generate_excel)
+    
+    if not success:
+        logger.error(f"OCR 任务提交失败: task_id={task_id}, error={message}")
+        raise HTTPException(status_code=400, detail=message)
+    
+    # 获取更新后的任务信息
+    task = await TaskService.get_task(task_id)
+    
+    return ResponseModel(
+        success=True,
+        message=message,
+        data=OCRJobResponse(
+            task_id=task.task_id,
+            ocr_job_id=task.ocr_job_id or "",
             status=task.status.value,
             message=message
         )
@@ -118,7 +206,9 @@ async def poll_ocr_result(
     
     **注意**：
     - 此接口可能需要较长时间（最多 5 分钟）
-    - 建议在后台异步调用或使用前端轮询
+    - 建议使用 `POST /ocr/submit/{task_id}` 提交到后台队列
+    - 若任务已由后台队列处理，本接口只等待其结束，不会重复轮询 OCR 服务；
+      等待超过 OCR_POLL_TIMEOUT 秒时返回当前状态（ocr_queued / ocr_processing）
     
     Args:
         task_id: 任务 ID (UUID)
@@ -131,8 +221,28 @@ async def poll_ocr_result(
     """
     logger.info(f"接收到 OCR 轮询请求: task_id={task_id}")
     
-    # 轮询并获取结果
-    success, message = await OCRService.poll_and_fetch_result(task_id)
+    # 轮询并获取结果（后台队列处理中的任务只等待其结束）
+    worker_pool = get_ocr_worker_pool()
+    if worker_pool.is_active(task_id):
+        finished = await worker_pool.wait(task_id, timeout=settings.ocr_poll_timeout)
+        task = await TaskService.get_task(task_id)
+        if not finished and task is not None:
+            # 等待超时：返回当前状态（ocr_queued / ocr_processing），由调用方稍后再次轮询
+            logger.info(f"OCR 任务仍在后台队列处理中: task_id={task_id}, status={task.status.value}")
+            return ResponseModel(
+                success=True,
+                message="OCR 任务处理中，请稍后再次轮询",
+                data=OCRJobResponse(
+                    task_id=task.task_id,
+                    ocr_job_id=task.ocr_job_id or "",
+                    status=task.status.value,
+                    message="OCR 任务处理中"
+                )
+            )
+        success = task is not None and task.status not in (TaskStatus.OCR_FAILED, TaskStatus.EXCEL_FAILED)
+        message = "OCR 任务完成" if success else (task.error_message if task else f"任务不存在: {task_id}")
+    else:
+        success, message = await OCRService.poll_and_fetch_result(task_id)
     
     if not success:
         logger.error(f"OCR 任务轮询失败: task_id={task_id}, error={message}")
@@ -146,7 +256,7 @@ async def poll_ocr_result(
         message=message,
         data=OCRJobResponse(
             task_id=task.task_id,
-            ocr_job_id=task.ocr_job_id,
+            ocr_job_id=task.ocr_job_id or "",
             status=task.status.value,
             message=message
         )
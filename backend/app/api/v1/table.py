@@ -1,17 +1,27 @@
 """
 表格数据相关 API 路由
 """
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, HTTPException, Path as PathParam, Body
+from fastapi import APIRouter, HTTPException, Path as PathParam, Body, Query, Header
 
 from app.services.table_service import TableService
 from app.services.task_service import TaskService
 from app.schemas.common import ResponseModel
-from app.schemas.table import TableDataResponse, TableMetadata
+from app.services.table_edit_store import TableVersionConflictError
+from app.services.table_columnar import (
+    COLUMNAR_MSGPACK_MEDIA_TYPE,
+    columnar_response,
+    negotiate_table_format,
+)
+from app.schemas.table import TableDataResponse, TableMetadata, TablePatchRequest
+from app.utils.responses import json_response
+from app.core.config import get_settings
 from app.core.logging import logger
 
 
 router = APIRouter(prefix="/table", tags=["表格数据服务"])
+settings = get_settings()
 
 
 @router.get(
@@ -20,12 +30,17 @@ router = APIRouter(prefix="/table", tags=["表格数据服务"])
     summary="获取表格数据（完整）"
 )
 async def get_table_data(
-    task_id: UUID = PathParam(..., description="任务 ID")
+    task_id: UUID = PathParam(..., description="任务 ID"),
+    accept: Optional[str] = Header(None, description="响应格式（可选列式格式，见 table_columnar）")
 ):
     """
     获取任务的完整表格数据（供前端预览/编辑）
     
-    直接从 OCR JSON 提取表格数据，转换为前端需要的格式
+    直接从 OCR JSON 提取表格数据，转换为前端需要的格式；
+    已编辑过的任务返回编辑后的数据，响应中的 version 用于增量保存
+    
+    Accept 为 application/x-table-columnar+json（或 +msgpack）时返回列式编码：
+    每个 Sheet 为文本数组 + 合并单元格稀疏列表 + 表头位图，体积远小于逐单元格对象
     
     前置条件：
     - 任务状态必须为 ocr_done / excel_generated / editable
@@ -47,6 +62,17 @@ async def get_table_data(
     if not task:
         raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
     
+    # 列式格式
+    media_type = negotiate_table_format(accept)
+    if media_type:
+        success, message, columnar = await TableService.get_table_data_columnar(
+            task_id, binary=media_type == COLUMNAR_MSGPACK_MEDIA_TYPE
+        )
+        if not success:
+            logger.error(f"获取表格数据失败: {message}")
+            raise HTTPException(status_code=400, detail=message)
+        return columnar_response(media_type, message, columnar)
+    
     # 获取表格数据
     success, message, table_data = await TableService.get_table_data(task_id)
     
@@ -54,11 +80,85 @@ async def get_table_data(
         logger.error(f"获取表格数据失败: {message}")
         raise HTTPException(status_code=400, detail=message)
     
-    return ResponseModel(
-        success=True,
-        message=message,
-        data=table_data.model_dump()
+    # 表格数据可能包含大量单元格，直接编码为 JSON（结构同 ResponseModel）；
+    # 同一 URL 按 Accept 返回不同格式，默认格式同样声明 Vary，避免共享缓存把 JSON 返回给列式客户端
+    return json_response(message, table_data, headers={'Vary': 'Accept'})
+
+
+@router.get(
+    "/data/{task_id}/sheets/{sheet_id}",
+    response_model=ResponseModel,
+    summary="获取单个 Sheet 的窗口数据（分页）"
+)
+async def get_table_window(
+    task_id: UUID = PathParam(..., description="任务 ID"),
+    sheet_id: int = PathParam(..., description="Sheet ID (从 1 开始)", ge=1),
+    row_offset: int = Query(0, description="起始行（从 0 开始）", ge=0),
+    row_limit: Optional[int] = Query(
+        None, description="行数（默认 table_window_default_rows）", ge=1, le=settings.table_window_max_rows
+    ),
+    col_offset: int = Query(0, description="起始列（从 0 开始）", ge=0),
+    col_limit: Optional[int] = Query(
+        None, description="列数（默认到最后一列）", ge=1, le=settings.table_window_max_cols
+    ),
+    accept: Optional[str] = Header(None, description="响应格式（可选列式格式，见 table_columnar）")
+):
+    """
+    获取单个 Sheet 指定行列范围内的表格数据
+    
+    大表格的完整数据可能达到数 MB，前端可先通过元数据获取行列数，
+    再按视口分页请求；超出表格的部分被截断，响应中的 rows / cols 为 Sheet 总行列数
+    
+    Accept 为列式格式时返回窗口的列式编码（同完整数据接口）
+    
+    前置条件：
+    - 任务状态必须为 ocr_done / excel_generated / editable
+    - OCR JSON 文件必须存在
+    
+    Args:
+        task_id: 任务 ID
+        sheet_id: Sheet ID
+        row_offset / row_limit: 行范围
+        col_offset / col_limit: 列范围
+        
+    Returns:
+        窗口内的表格数据
+        
+    Raises:
+        HTTPException: 任务不存在、状态错误或 Sheet 不存在
+    """
+    logger.info(
+        f"获取任务 {task_id} Sheet {sheet_id} 的窗口数据: "
+        f"rows={row_offset}+{row_limit}, cols={col_offset}+{col_limit}"
     )
+    
+    # 检查任务是否存在
+    task = await TaskService.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
+    
+    # 列式格式
+    media_type = negotiate_table_format(accept)
+    if media_type:
+        success, message, columnar = await TableService.get_table_window_columnar(
+            task_id, sheet_id, row_offset, row_limit, col_offset, col_limit,
+            binary=media_type == COLUMNAR_MSGPACK_MEDIA_TYPE
+        )
+        if not success:
+            logger.error(f"获取表格窗口数据失败: {message}")
+            raise HTTPException(status_code=400, detail=message)
+        return columnar_response(media_type, message, columnar)
+    
+    # 获取窗口数据
+    success, message, window = await TableService.get_table_window(
+        task_id, sheet_id, row_offset, row_limit, col_offset, col_limit
+    )
+    
+    if not success:
+        logger.error(f"获取表格窗口数据失败: {message}")
+        raise HTTPException(status_code=400, detail=message)
+    
+    return json_response(message, window, headers={'Vary': 'Accept'})
 
 
 @router.get(
@@ -115,22 +215,25 @@ async def get_table_metadata(
 )
 async def save_table_data(
     task_id: UUID = PathParam(..., description="任务 ID"),
-    table_data: TableDataResponse = Body(..., description="表格数据")
+    table_data: TableDataResponse = Body(..., description="表格数据"),
+    base_version: Optional[int] = Query(None, ge=0, description="数据所基于的版本号（不传则不校验，兼容旧客户端）")
 ):
     """
     保存编辑后的表格数据
     
-    将前端编辑后的表格数据保存，并重新生成 Excel 文件
+    将前端编辑后的表格数据保存（版本号递增），Excel 在下载时按新版本生成；
+    携带 base_version 时与增量保存一样校验版本，避免覆盖其他编辑者的修改
     
     Args:
         task_id: 任务 ID
         table_data: 完整的表格数据
+        base_version: 数据所基于的版本号
         
     Returns:
-        保存结果
+        保存结果（含保存后的版本号）
         
     Raises:
-        HTTPException: 任务不存在或保存失败
+        HTTPException: 任务不存在（404）、版本冲突（409）或保存失败（400）
     """
     logger.info(f"保存任务 {task_id} 的表格数据")
     
@@ -140,7 +243,11 @@ async def save_table_data(
         raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
     
     # 保存表格数据
-    success, message = await TableService.save_table_data(task_id, table_data)
+    try:
+        success, message, version = await TableService.save_table_data(task_id, table_data, base_version)
+    except TableVersionConflictError as e:
+        logger.warning(f"表格版本冲突: task_id={task_id}, {str(e)}")
+        raise HTTPException(status_code=409, detail=str(e))
     
     if not success:
         logger.error(f"保存表格数据失败: {message}")
@@ -149,5 +256,57 @@ async def save_table_data(
     return ResponseModel(
         success=True,
         message=message,
-        data={"task_id": str(task_id)}
+        data={"task_id": str(task_id), "version": version}
+    )
+
+
+@router.patch(
+    "/data/{task_id}",
+    response_model=ResponseModel,
+    summary="增量保存表格修改"
+)
+async def patch_table_data(
+    task_id: UUID = PathParam(..., description="任务 ID"),
+    patch: TablePatchRequest = Body(..., description="单元格区域修改"),
+    generate_excel: bool = Query(False, description="是否立即生成 Excel（默认在下载时按需生成）")
+):
+    """
+    增量保存表格修改
+    
+    只提交修改过的单元格区域，服务端在已保存的表格状态上应用修改，
+    请求与写入量与修改量成正比
+    
+    Args:
+        task_id: 任务 ID
+        patch: base_version 与单元格区域修改列表
+        generate_excel: 是否立即生成 Excel（默认只保存，下载时按新版本生成）
+        
+    Returns:
+        修改后的版本号与受影响的 Sheet
+        
+    Raises:
+        HTTPException: 任务不存在（404）、版本冲突（409）或修改无效（400）
+    """
+    logger.info(f"增量保存任务 {task_id} 的表格修改: base_version={patch.base_version}")
+    
+    # 检查任务是否存在
+    task = await TaskService.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
+    
+    # 应用修改
+    try:
+        success, message, result = await TableService.patch_table_data(task_id, patch, generate_excel)
+    except TableVersionConflictError as e:
+        logger.warning(f"表格版本冲突: task_id={task_id}, {str(e)}")
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if not success:
+        logger.error(f"增量保存表格失败: {message}")
+        raise HTTPException(status_code=400, detail=message)
+    
+    return ResponseModel(
+        success=True,
+        message=message,
+        data=result.model_dump()
     )
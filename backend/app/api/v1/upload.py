@@ -1,11 +1,13 @@
 """
 图片上传相关 API 路由
 """
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, File, UploadFile, HTTPException, Path as PathParam
+from fastapi import APIRouter, File, UploadFile, HTTPException, Path as PathParam, Query
 
 from app.services.upload_service import UploadService
 from app.services.task_service import TaskService
+from app.services.ocr_worker import get_ocr_worker_pool
 from app.schemas.upload import UploadResponse
 from app.schemas.common import ResponseModel
 from app.core.logging import logger
@@ -26,7 +28,7 @@ async def upload_image(
     """
     上传图片并与任务绑定
     
-    **存储位置**：`data/images/{task_id}.{ext}`
+    **存储位置**：`data/images/{sha256}.{ext}`（按内容寻址，相同图片只保存一份）
     
     **流程**：
     1. 验证任务是否存在
@@ -90,7 +92,7 @@ async def create_task_and_upload(
     1. 创建新任务
     2. 上传图片并绑定
     
-    **存储位置**：`data/images/{task_id}.{ext}`
+    **存储位置**：`data/images/{sha256}.{ext}`（按内容寻址，相同图片只保存一份）
     
     Args:
         file: 上传的图片文件
@@ -127,3 +129,60 @@ async def create_task_and_upload(
             message=message
         )
     )
+
+
+@router.post(
+    "/image-and-ocr",
+    response_model=ResponseModel[UploadResponse],
+    summary="创建任务、上传图片并提交 OCR"
+)
+async def create_task_upload_and_ocr(
+    file: UploadFile = File(..., description="图片文件"),
+    generate_excel: Optional[bool] = Query(None, description="OCR 完成后是否自动生成 Excel，默认使用配置")
+):
+    """
+    创建新任务、上传图片并提交 OCR（一站式接口）
+    
+    上传内容在保存到 `data/images/{sha256}.{ext}` 的同时直接转发给 OCR 服务创建 job，
+    之后由后台任务池轮询结果，前端通过 `GET /tasks/{task_id}` 查询进度
+    
+    Args:
+        file: 上传的图片文件
+        generate_excel: OCR 完成后是否自动生成 Excel
+    
+    Returns:
+        创建的任务信息和上传结果
+    """
+    logger.info(f"接收到创建任务+上传图片+OCR 请求: filename={file.filename}")
+    
+    # 1. 创建新任务
+    task = await TaskService.create_task()
+    logger.info(f"任务创建成功: task_id={task.task_id}")
+    
+    # 2. 上传图片并创建 OCR job
+    success, message = await UploadService.upload_and_start_ocr(task.task_id, file)
+    
+    if not success:
+        logger.error(f"图片上传失败: task_id={task.task_id}, error={message}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"任务已创建但图片上传失败: {message}"
+        )
+    
+    # 3. 提交到后台任务池（已创建 job 的任务直接轮询，否则从磁盘重新创建）
+    submitted, submit_message = await get_ocr_worker_pool().submit(task.task_id, generate_excel)
+    if not submitted:
+        logger.error(f"OCR 提交失败: task_id={task.task_id}, error={submit_message}")
+        raise HTTPException(status_code=400, detail=submit_message)
+    
+    task = await TaskService.get_task(task.task_id)
+    
+    return ResponseModel(
+        success=True,
+        message="任务创建并提交 OCR 成功",
+        data=UploadResponse(
+            task_id=task.task_id,
+            image_path=task.image_path,
+            message=message
+        )
+    )
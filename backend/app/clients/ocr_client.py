@@ -2,25 +2,42 @@
 OCR 服务客户端
 封装 PaddleOCR 表格识别服务的调用
 """
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, AsyncIterator
+import importlib.util
+import os
+import aiofiles
 import httpx
 from pathlib import Path
 
 from app.core.config import get_settings
 from app.core.logging import logger
 from app.utils.retry import with_retry, RetryConfig
+from app.utils.metrics import track_performance
 
 
 settings = get_settings()
 
 
 class OCRClient:
-    """OCR 服务客户端"""
+    """
+    OCR 服务客户端
+    
+    所有请求共用一个 httpx.AsyncClient（连接池 + keep-alive），
+    由应用生命周期（app.main.lifespan）负责启动与关闭
+    """
     
     def __init__(self):
         self.base_url = settings.ocr_base_url
         self.token = settings.ocr_token
-        self.timeout = 30.0  # 默认超时 30 秒
+        self.timeout = settings.ocr_result_timeout  # 默认超时
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stats: Dict[str, Any] = {
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "by_endpoint": {},
+        }
     
     def _get_headers(self) -> Dict[str, str]:
         """获取请求头"""
@@ -29,6 +46,105 @@ class OCRClient:
             headers["Authorization"] = f"Bearer {self.token}"
         return headers
     
+    def _timeout(self, read: float) -> httpx.Timeout:
+        """构造单个接口的超时配置（连接超时统一，读写超时按接口区分）"""
+        return httpx.Timeout(read, connect=settings.ocr_connect_timeout)
+    
+    @property
+    def http2_enabled(self) -> bool:
+        """是否启用 HTTP/2（配置开启且安装了 h2）"""
+        return settings.ocr_http2 and importlib.util.find_spec("h2") is not None
+    
+    async def start(self):
+        """创建共享的 HTTP 连接池"""
+        if self._client is not None and not self._client.is_closed:
+            return
+        
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self._get_headers(),
+            timeout=self._timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=settings.ocr_http_max_connections,
+                max_keepalive_connections=settings.ocr_http_max_keepalive,
+                keepalive_expiry=settings.ocr_http_keepalive_expiry
+            ),
+            http2=self.http2_enabled
+        )
+        logger.info(
+            f"OCR HTTP 连接池已创建: base_url={self.base_url}, "
+            f"max_connections={settings.ocr_http_max_connections}, http2={self.http2_enabled}"
+        )
+    
+    async def close(self):
+        """关闭共享的 HTTP 连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("OCR HTTP 连接池已关闭")
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        """获取共享客户端（未在生命周期中启动时按需创建）"""
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        return self._client
+    
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        通过共享连接池发送请求并记录统计信息
+        
+        Args:
+            endpoint: 统计用的接口名称
+            method: HTTP 方法
+            url: 相对 base_url 的路径
+        """
+        client = await self._get_client()
+        stats = self._stats
+        stats["requests"] += 1
+        stats["by_endpoint"][endpoint] = stats["by_endpoint"].get(endpoint, 0) + 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            return await client.request(method, url, **kwargs)
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息（用于调整连接池大小）
+        
+        Returns:
+            请求计数、并发数以及连接池中的连接状态
+        """
+        pool_info: Dict[str, Any] = {
+            "started": self._client is not None and not self._client.is_closed,
+            "http2": self.http2_enabled,
+            "max_connections": settings.ocr_http_max_connections,
+            "max_keepalive_connections": settings.ocr_http_max_keepalive,
+        }
+        
+        # httpx 未公开连接池状态，这里尽力读取 httpcore 连接池
+        try:
+            pool = self._client._transport._pool if pool_info["started"] else None
+            connections = list(getattr(pool, "connections", []))
+            pool_info["connections"] = len(connections)
+            pool_info["idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+        except Exception:
+            pool_info["connections"] = None
+            pool_info["idle_connections"] = None
+        
+        return {
+            **pool_info,
+            "requests": self._stats["requests"],
+            "errors": self._stats["errors"],
+            "in_flight": self._stats["in_flight"],
+            "max_in_flight": self._stats["max_in_flight"],
+            "by_endpoint": dict(self._stats["by_endpoint"]),
+        }
+    
     async def health_check(self) -> Tuple[bool, Optional[Dict[str, Any]]]:
         """
         健康检查
@@ -37,24 +153,101 @@ class OCRClient:
             tuple: (是否成功, 响应数据)
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/health",
-                    headers=self._get_headers()
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"OCR 服务健康检查成功: {data}")
-                    return True, data
-                else:
-                    logger.error(f"OCR 服务健康检查失败: status={response.status_code}")
-                    return False, None
-                    
+            response = await self._request(
+                "health",
+                "GET",
+                "/health",
+                timeout=self._timeout(settings.ocr_result_timeout)
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                logger.info(f"OCR 服务健康检查成功: {data}")
+                return True, data
+            else:
+                logger.error(f"OCR 服务健康检查失败: status={response.status_code}")
+                return False, None
+        
         except Exception as e:
             logger.error(f"OCR 服务健康检查异常: {str(e)}")
             return False, None
     
+    @staticmethod
+    def _multipart_envelope(filename: str, content_type: str) -> Tuple[str, bytes, bytes]:
+        """
+        构造单文件 multipart 请求体的头部与尾部（字段名 file）
+        
+        Returns:
+            tuple: (boundary, 头部字节, 尾部字节)
+        """
+        boundary = os.urandom(16).hex()
+        head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode('utf-8')
+        tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        return boundary, head, tail
+    
+    async def _post_job(
+        self,
+        filename: str,
+        chunks: AsyncIterator[bytes],
+        content_type: str,
+        size: Optional[int]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        以流式 multipart 请求体创建 OCR 任务
+        
+        Args:
+            filename: 上传的文件名
+            chunks: 文件内容分块（异步迭代）
+            content_type: 文件 MIME 类型
+            size: 文件大小（已知时设置 Content-Length，否则使用分块传输）
+        """
+        boundary, head, tail = self._multipart_envelope(filename, content_type)
+        sent = 0
+        
+        async def body():
+            nonlocal sent
+            yield head
+            async for chunk in chunks:
+                sent += len(chunk)
+                yield chunk
+            yield tail
+        
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        if size is not None:
+            headers["Content-Length"] = str(len(head) + size + len(tail))
+        
+        with track_performance("ocr_create") as span:
+            response = await self._request(
+                "create_job",
+                "POST",
+                "/jobs-from-uploading",
+                content=body(),
+                headers=headers,
+                timeout=self._timeout(settings.ocr_upload_timeout)
+            )
+            span['bytes'] = sent
+        
+        # 接受 200 或 201 作为成功状态码
+        if response.status_code in [200, 201]:
+            data = response.json()
+            job_id = data.get('job_id')
+            
+            if job_id:
+                logger.info(f"OCR 任务创建成功: job_id={job_id}, status={response.status_code}")
+                return True, job_id, None
+            else:
+                error_msg = "响应中未包含 job_id"
+                logger.error(f"OCR 任务创建失败: {error_msg}, response={data}")
+                return False, None, error_msg
+        else:
+            error_msg = f"HTTP {response.status_code}: {response.text}"
+            logger.error(f"OCR 任务创建失败: {error_msg}")
+            return False, None, error_msg
+    
     @with_retry(
         max_retries=RetryConfig.OCR_MAX_RETRIES,
         initial_delay=RetryConfig.OCR_INITIAL_DELAY,
@@ -62,7 +255,7 @@ class OCRClient:
         exceptions=(httpx.HTTPError, httpx.TimeoutException)
     )
     async def create_job_from_file(
-        self, 
+        self,
         image_path: str
     ) -> Tuple[bool, Optional[str], Optional[str]]:
         """
@@ -70,7 +263,7 @@ class OCRClient:
         
         Args:
             image_path: 图片文件路径
-            
+        
         Returns:
             tuple: (是否成功, job_id, 错误信息)
         """
@@ -82,44 +275,53 @@ class OCRClient:
                 logger.error(error_msg)
                 return False, None, error_msg
             
-            # 读取文件
-            with open(file_path, 'rb') as f:
-                files = {
-                    'file': (file_path.name, f, 'image/png')
-                }
-                
-                # 发送请求
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/jobs-from-uploading",
-                        headers=self._get_headers(),
-                        files=files
-                    )
-                    
-                    # 接受 200 或 201 作为成功状态码
-                    if response.status_code in [200, 201]:
-                        data = response.json()
-                        job_id = data.get('job_id')
-                        
-                        if job_id:
-                            logger.info(f"OCR 任务创建成功: job_id={job_id}, status={response.status_code}")
-                            return True, job_id, None
-                        else:
-                            error_msg = "响应中未包含 job_id"
-                            logger.error(f"OCR 任务创建失败: {error_msg}, response={data}")
-                            return False, None, error_msg
-                    else:
-                        error_msg = f"HTTP {response.status_code}: {response.text}"
-                        logger.error(f"OCR 任务创建失败: {error_msg}")
-                        return False, None, error_msg
-                        
+            # 异步分块读取文件并发送
+            async def read_chunks():
+                async with aiofiles.open(file_path, 'rb') as f:
+                    while chunk := await f.read(settings.upload_chunk_size):
+                        yield chunk
+            
+            return await self._post_job(
+                file_path.name,
+                read_chunks(),
+                'image/png',
+                file_path.stat().st_size
+            )
+        
+        except Exception as e:
+            error_msg = f"创建 OCR 任务异常: {str(e)}"
+            logger.error(error_msg)
+            return False, None, error_msg
+    
+    async def create_job_from_stream(
+        self,
+        filename: str,
+        chunks: AsyncIterator[bytes],
+        content_type: str = 'image/png',
+        size: Optional[int] = None
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        边接收边转发图片创建 OCR 任务（不重试，数据流只能消费一次）
+        
+        Args:
+            filename: 上传的文件名
+            chunks: 文件内容分块（异步迭代）
+            content_type: 文件 MIME 类型
+            size: 文件大小（未知时为 None）
+        
+        Returns:
+            tuple: (是否成功, job_id, 错误信息)
+        """
+        try:
+            return await self._post_job(filename, chunks, content_type, size)
+        
         except Exception as e:
             error_msg = f"创建 OCR 任务异常: {str(e)}"
             logger.error(error_msg)
             return False, None, error_msg
     
     async def get_job_status(
-        self, 
+        self,
         job_id: str,
         since_seq: int = 0,
         timeout_ms: int = 25000,
@@ -133,7 +335,7 @@ class OCRClient:
             since_seq: 起始序号
             timeout_ms: 超时时间（毫秒）
             max_events: 最大事件数
-            
+        
         Returns:
             tuple: (是否成功, 事件数据, 错误信息)
         """
@@ -144,22 +346,27 @@ class OCRClient:
                 'max_events': max_events
             }
             
-            async with httpx.AsyncClient(timeout=timeout_ms / 1000 + 5) as client:
-                response = await client.get(
-                    f"{self.base_url}/longpoll/jobs/{job_id}",
-                    headers=self._get_headers(),
-                    params=params
+            # 每次长轮询往返记录为一个 span（含等待时间）
+            with track_performance("ocr_longpoll") as span:
+                response = await self._request(
+                    "longpoll",
+                    "GET",
+                    f"/longpoll/jobs/{job_id}",
+                    params=params,
+                    timeout=self._timeout(timeout_ms / 1000 + 5)
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"获取 OCR 任务状态成功: job_id={job_id}, done={data.get('done')}")
-                    return True, data, None
-                else:
-                    error_msg = f"HTTP {response.status_code}: {response.text}"
-                    logger.error(f"获取 OCR 任务状态失败: {error_msg}")
-                    return False, None, error_msg
-                    
+                span['bytes'] = len(response.content)
+                data = response.json() if response.status_code == 200 else None
+                span['events'] = len(data.get('events') or ()) if data else 0
+            
+            if data is not None:
+                logger.info(f"获取 OCR 任务状态成功: job_id={job_id}, done={data.get('done')}")
+                return True, data, None
+            else:
+                error_msg = f"HTTP {response.status_code}: {response.text}"
+                logger.error(f"获取 OCR 任务状态失败: {error_msg}")
+                return False, None, error_msg
+        
         except Exception as e:
             error_msg = f"获取 OCR 任务状态异常: {str(e)}"
             logger.error(error_msg)
@@ -172,7 +379,7 @@ class OCRClient:
         exceptions=(httpx.HTTPError, httpx.TimeoutException)
     )
     async def get_job_result_json(
-        self, 
+        self,
         job_id: str
     ) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
         """
@@ -180,26 +387,29 @@ class OCRClient:
         
         Args:
             job_id: 任务 ID
-            
+        
         Returns:
             tuple: (是否成功, JSON 数据, 错误信息)
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/result/json/jobs/{job_id}",
-                    headers=self._get_headers()
+            with track_performance("ocr_fetch_json") as span:
+                response = await self._request(
+                    "result_json",
+                    "GET",
+                    f"/result/json/jobs/{job_id}",
+                    timeout=self._timeout(settings.ocr_result_timeout)
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"获取 OCR JSON 结果成功: job_id={job_id}")
-                    return True, data, None
-                else:
-                    error_msg = f"HTTP {response.status_code}: {response.text}"
-                    logger.error(f"获取 OCR JSON 结果失败: {error_msg}")
-                    return False, None, error_msg
-                    
+                span['bytes'] = len(response.content)
+                data = response.json() if response.status_code == 200 else None
+            
+            if data is not None:
+                logger.info(f"获取 OCR JSON 结果成功: job_id={job_id}")
+                return True, data, None
+            else:
+                error_msg = f"HTTP {response.status_code}: {response.text}"
+                logger.error(f"获取 OCR JSON 结果失败: {error_msg}")
+                return False, None, error_msg
+        
         except Exception as e:
             error_msg = f"获取 OCR JSON 结果异常: {str(e)}"
             logger.error(error_msg)
@@ -0,0 +1,214 @@
+"""
+OCR 任务状态多路复用器
+所有处理中的 OCR job 共用一个调度循环，按轮转顺序发起短长轮询，
+全局并发受信号量限制，收到的事件分发给等待该 job 的所有协程
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.clients.ocr_client import OCRClient, get_ocr_client
+from app.core.config import get_settings
+from app.core.logging import logger
+
+settings = get_settings()
+
+
+class _JobWatch:
+    """单个 OCR job 的轮询状态"""
+
+    __slots__ = ('job_id', 'since_seq', 'events', 'waiters', 'next_due')
+
+    def __init__(self, job_id: str, since_seq: int):
+        self.job_id = job_id
+        self.since_seq = since_seq
+        self.events: List[Dict[str, Any]] = []
+        self.waiters: List[asyncio.Future] = []
+        self.next_due = 0.0
+
+
+class OCRStatusMultiplexer:
+    """
+    OCR 任务状态多路复用器
+
+    - 调度循环从就绪队列中轮转取出 job，每个 job 同一时刻最多一个请求
+    - 同时在途的状态请求数不超过 max_concurrency，与处理中的 job 数无关
+    - 每个 job 两次请求之间至少间隔 min_interval 秒
+    """
+
+    def __init__(
+        self,
+        client: OCRClient,
+        max_concurrency: int,
+        poll_timeout_ms: int,
+        min_interval: float
+    ):
+        self.client = client
+        self.max_concurrency = max(max_concurrency, 1)
+        self.poll_timeout_ms = poll_timeout_ms
+        self.min_interval = min_interval
+        self._jobs: Dict[str, _JobWatch] = {}
+        self._ready: "asyncio.Queue[_JobWatch]" = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._polls: set = set()
+        self._scheduler: Optional[asyncio.Task] = None
+        self._requests = 0
+
+    @property
+    def running(self) -> bool:
+        return self._scheduler is not None and not self._scheduler.done()
+
+    def start(self):
+        """启动调度循环"""
+        if self.running:
+            return
+        self._scheduler = asyncio.create_task(self._schedule(), name="ocr-status-mux")
+        logger.info(
+            f"OCR 状态多路复用器已启动: max_concurrency={self.max_concurrency}, "
+            f"poll_timeout_ms={self.poll_timeout_ms}"
+        )
+
+    async def stop(self):
+        """停止调度循环，唤醒所有等待者"""
+        tasks = [t for t in [self._scheduler, *self._polls] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._scheduler = None
+        self._polls.clear()
+        for watch in list(self._jobs.values()):
+            self._finish(watch, (False, None, "OCR 状态多路复用器已停止"))
+        logger.info("OCR 状态多路复用器已停止")
+
+    async def wait_done(
+        self,
+        job_id: str,
+        since_seq: int = 0,
+        timeout: Optional[float] = None
+    ) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+        """
+        等待 OCR job 结束
+
+        同一 job 的多个等待者共享一次轮询
+
+        Args:
+            job_id: OCR 任务 ID
+            since_seq: 起始序号（仅在该 job 首次登记时生效）
+            timeout: 最大等待时间（秒），None 表示不限
+
+        Returns:
+            tuple: (是否成功, 状态数据 {done, events, last_seq}, 错误信息)
+            超时返回 (True, {done: False, ...}, None)
+        """
+        self.start()
+
+        watch = self._jobs.get(job_id)
+        if watch is None:
+            watch = _JobWatch(job_id, since_seq)
+            self._jobs[job_id] = watch
+            self._ready.put_nowait(watch)
+
+        future = asyncio.get_running_loop().create_future()
+        watch.waiters.append(future)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return True, self._snapshot(watch, done=False), None
+        finally:
+            if future in watch.waiters:
+                watch.waiters.remove(future)
+            # 没有等待者的 job 不再轮询
+            if not watch.waiters and self._jobs.get(job_id) is watch:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        """获取多路复用器统计信息"""
+        return {
+            "jobs": len(self._jobs),
+            "waiters": sum(len(w.waiters) for w in self._jobs.values()),
+            "in_flight": len(self._polls),
+            "max_concurrency": self.max_concurrency,
+            "requests": self._requests,
+        }
+
+    async def _schedule(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            watch = await self._ready.get()
+            if self._jobs.get(watch.job_id) is not watch:
+                continue
+
+            delay = watch.next_due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await self._slots.acquire()
+            poll = asyncio.create_task(self._poll(watch))
+            self._polls.add(poll)
+            poll.add_done_callback(self._polls.discard)
+
+    async def _poll(self, watch: _JobWatch):
+        try:
+            if self._jobs.get(watch.job_id) is not watch:
+                return
+
+            self._requests += 1
+            success, status_data, error_msg = await self.client.get_job_status(
+                watch.job_id,
+                since_seq=watch.since_seq,
+                timeout_ms=self.poll_timeout_ms
+            )
+            if not success:
+                self._finish(watch, (False, None, error_msg))
+                return
+
+            events = status_data.get('events', [])
+            for event in events:
+                logger.info(f"OCR 任务事件: job_id={watch.job_id}, event={event.get('type')}")
+            watch.events.extend(events)
+            watch.since_seq = status_data.get('last_seq', watch.since_seq)
+
+            if status_data.get('done', False):
+                self._finish(watch, (True, self._snapshot(watch, done=True), None))
+                return
+
+            watch.next_due = asyncio.get_running_loop().time() + self.min_interval
+            self._ready.put_nowait(watch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._finish(watch, (False, None, f"轮询 OCR 任务状态异常: {str(e)}"))
+        finally:
+            self._slots.release()
+
+    def _finish(self, watch: _JobWatch, result: Tuple[bool, Optional[Dict[str, Any]], Optional[str]]):
+        if self._jobs.get(watch.job_id) is watch:
+            del self._jobs[watch.job_id]
+        for future in watch.waiters:
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _snapshot(watch: _JobWatch, done: bool) -> Dict[str, Any]:
+        return {
+            'done': done,
+            'events': list(watch.events),
+            'last_seq': watch.since_seq,
+        }
+
+
+# 单例
+_ocr_status_mux = None
+
+
+def get_ocr_status_mux() -> OCRStatusMultiplexer:
+    """获取 OCR 状态多路复用器单例"""
+    global _ocr_status_mux
+    if _ocr_status_mux is None:
+        _ocr_status_mux = OCRStatusMultiplexer(
+            get_ocr_client(),
+            max_concurrency=settings.ocr_status_max_concurrency,
+            poll_timeout_ms=settings.ocr_status_poll_timeout_ms,
+            min_interval=settings.ocr_status_min_interval
+        )
+    return _ocr_status_mux
@@ -28,10 +28,69 @@ class Settings(BaseSettings):
     # OCR 服务配置
     ocr_base_url: str = "http://10.119.133.236:8806"
     ocr_token: str = ""
+    ocr_max_wait_seconds: int = 300  # 单个 OCR 任务最长等待时间
+    
+    # OCR HTTP 连接池配置
+    ocr_http_max_connections: int = 20  # 最大连接数
+    ocr_http_max_keepalive: int = 10  # 最大保活连接数
+    ocr_http_keepalive_expiry: float = 30.0  # 保活连接空闲过期时间（秒）
+    ocr_http2: bool = True  # 启用 HTTP/2（需安装 h2）
+    ocr_connect_timeout: float = 5.0  # 建立连接超时（秒）
+    ocr_upload_timeout: float = 60.0  # 上传图片创建任务超时（秒）
+    ocr_result_timeout: float = 30.0  # 获取结果 / 健康检查超时（秒）
+    
+    # OCR 状态轮询（多路复用）配置
+    ocr_status_max_concurrency: int = 8  # 同时在途的状态请求数上限（应小于最大连接数）
+    ocr_status_poll_timeout_ms: int = 5000  # 单次长轮询等待时间（毫秒）
+    ocr_status_min_interval: float = 1.0  # 同一 job 两次轮询的最小间隔（秒）
+    
+    # 后台 OCR 任务池配置
+    ocr_worker_concurrency: int = 4  # 同时处理的 OCR 任务数
+    ocr_worker_auto_excel: bool = False  # OCR 完成后是否自动生成 Excel（默认值）
+    ocr_poll_timeout: float = 300.0  # 轮询接口等待后台队列任务的最长时间（秒），超时返回当前状态
+    
+    # 批量上传配置
+    batch_max_files: int = 500  # 单个批次的最大图片数（含 zip 内的图片）
+    
+    # 文档（多页合并）配置
+    document_max_pages: int = 500  # 单个文档的最大页数
     
     # 文件存储配置
     data_dir: str = "../data"
     max_upload_size: int = 10485760  # 10MB
+    upload_chunk_size: int = 262144  # 上传保存 / 转发 OCR 时的分块大小（字节）
+    json_use_orjson: bool = True  # 已安装 orjson 时用于 JSON 文件读写
+    ocr_storage_format: str = "json"  # OCR 结果存储格式：json / packed（表格块单独压缩，按需读取）
+    ocr_packed_compress_level: int = 6  # packed 格式的 zlib 压缩级别
+    
+    # Excel 导出配置
+    excel_writer_engine: str = "write_only"  # 写入引擎：write_only（流式）/ openpyxl（整表内存，回退）
+    excel_process_workers: int = 2  # Excel 生成进程数（0 表示在当前进程的线程中生成）
+    excel_max_pending: int = 8  # 同时排队 + 生成的 Excel 任务上限
+    excel_queue_timeout: float = 30.0  # 等待生成名额的最长时间（秒），超时返回繁忙
+    excel_download_cache_control: str = "private, no-cache"  # 下载响应的 Cache-Control（no-cache：每次用 ETag 校验）
+    table_stitch_enabled: bool = True  # 导出时将跨页 / 跨块的续表拼接为一个 Sheet
+    table_stitch_edge_ratio: float = 0.15  # 跨页续表：上一片段须到达页面底部、当前片段须始于页面顶部的区域比例
+    table_stitch_gap_ratio: float = 0.05  # 同一页内续表：上下两个片段的最大间距（占页面高度的比例）
+    
+    # 表格解析配置
+    table_html_tokenizer: str = "regex"  # HTML 表格解析：regex（专用扫描器，无法识别的标记回退到 htmlparser）/ htmlparser
+    
+    # 请求剖析配置（仅 debug 模式启用）
+    profile_header: str = "X-Profile"  # 带该请求头时返回各阶段耗时（Server-Timing）；值为 cprofile / pyinstrument 时另存剖析结果到 data/profiles
+    
+    # 表格解析缓存配置
+    table_cache_max_bytes: int = 67108864  # 64MB
+    table_cache_spill_to_disk: bool = True  # 是否将解析结果落盘到 data/table_cache
+    
+    # 表格编辑状态配置
+    table_edit_cache_entries: int = 32  # 内存中保留编辑状态的任务数
+    table_edit_compact_every: int = 50  # 增量日志达到该行数时重写快照
+    
+    # 表格窗口（分页）查询配置
+    table_window_default_rows: int = 200  # 未指定行数时返回的行数
+    table_window_max_rows: int = 2000  # 单次请求的最大行数
+    table_window_max_cols: int = 500  # 单次请求的最大列数
     
     class Config:
         env_file = ".env"
@@ -54,6 +113,8 @@ class Settings(BaseSettings):
             "ocr_json": base_dir / "ocr_json",
             "excel": base_dir / "excel",
             "temp": base_dir / "temp",
+            "table_cache": base_dir / "table_cache",
+            "profiles": base_dir / "profiles",
         }
 
 
@@ -15,7 +15,7 @@ TORTOISE_ORM = {
     },
     "apps": {
         "models": {
-            "models": ["app.models.task", "aerich.models"],
+            "models": ["app.models.task", "app.models.image_blob", "app.models.batch", "app.models.document", "aerich.models"],
             "default_connection": "default",
         }
     },
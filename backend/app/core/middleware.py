@@ -1,14 +1,26 @@
 """
 中间件模块
 """
+import cProfile
 import time
 import uuid
-from typing import Callable
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.core.config import get_settings
 from app.core.logging import logger
+from app.utils.metrics import collect_spans, format_sizes, summarize_spans
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pyinstrument 为可选依赖
+    PyinstrumentProfiler = None
+
+
+settings = get_settings()
 
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
@@ -101,3 +113,92 @@ class ErrorTrackingMiddleware(BaseHTTPMiddleware):
                 )
         
         return response
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """
+    请求剖析中间件（仅调试模式注册）
+    
+    请求带有剖析请求头（配置 profile_header，默认 X-Profile）时：
+    - 收集本次请求中各阶段的 span（上传保存、OCR 请求、HTML 解析、合并单元格展开、工作簿构建与保存等），
+      按名称汇总为 Server-Timing 响应头（耗时、次数与尺寸）；Excel 生成子进程中的 span 由进程池带回
+    - 值为 cprofile / pyinstrument 时同时剖析整个请求，结果保存到 data/profiles/{请求 ID}.prof / .html，
+      文件路径通过 X-Profile-Output 响应头返回；未安装 pyinstrument 时使用 cProfile
+    
+    cProfile 剖析的是事件循环线程：同一时间只剖析一个请求，期间其他请求的协程也会被计入；
+    线程 / 子进程中的耗时只体现在 span 中
+    """
+    
+    # 正在进行的 cProfile 剖析（事件循环线程上同时只能启用一个）
+    _cprofile_active = False
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        mode = request.headers.get(settings.profile_header)
+        if mode is None:
+            return await call_next(request)
+        
+        request_id = getattr(request.state, 'request_id', None) or str(uuid.uuid4())[:8]
+        profiler = self._start_profiler(mode.strip().lower(), request_id)
+        try:
+            with collect_spans() as spans:
+                response = await call_next(request)
+        finally:
+            output = self._stop_profiler(profiler, request_id)
+        
+        server_timing = self.format_server_timing(spans)
+        if server_timing:
+            response.headers["Server-Timing"] = server_timing
+        if output:
+            response.headers["X-Profile-Output"] = output
+        logger.info(f"[{request_id}] 剖析: {len(spans)} 个 span | {server_timing or '-'}")
+        return response
+    
+    def _start_profiler(self, mode: str, request_id: str) -> Optional[Any]:
+        """按请求头的值启动剖析器，不需要剖析时返回 None"""
+        if mode == 'pyinstrument' and PyinstrumentProfiler is not None:
+            profiler = PyinstrumentProfiler(async_mode='enabled')
+            profiler.start()
+            return profiler
+        
+        if mode not in ('cprofile', 'pyinstrument'):
+            return None
+        if ProfilingMiddleware._cprofile_active:
+            logger.warning(f"[{request_id}] 已有请求正在 cProfile 剖析，本次只收集 span")
+            return None
+        
+        ProfilingMiddleware._cprofile_active = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    
+    def _stop_profiler(self, profiler: Optional[Any], request_id: str) -> Optional[str]:
+        """停止剖析器并保存结果，返回结果文件路径"""
+        if profiler is None:
+            return None
+        
+        profile_dir = Path(settings.data_paths["profiles"])
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            ProfilingMiddleware._cprofile_active = False
+            output_path = profile_dir / f"{request_id}.prof"
+            profiler.dump_stats(str(output_path))
+        else:
+            profiler.stop()
+            output_path = profile_dir / f"{request_id}.html"
+            output_path.write_text(profiler.output_html(), encoding="utf-8")
+        
+        return str(output_path)
+    
+    @staticmethod
+    def format_server_timing(spans: List[Dict[str, Any]]) -> str:
+        """
+        span 按名称汇总为 Server-Timing 头
+        
+        例：html_parse;dur=12.34;desc="3x bytes=40960 tokenizer=regex"
+        """
+        return ", ".join(
+            f'{name};dur={entry["duration"] * 1000:.2f};desc="{entry["count"]}x {format_sizes(entry["sizes"])}"'
+            for name, entry in summarize_spans(spans).items()
+        )
@@ -11,17 +11,22 @@ from pathlib import Path
 from app.core.config import get_settings
 from app.core.database import init_db, close_db
 from app.core.logging import logger
+from app.clients.ocr_client import get_ocr_client
+from app.clients.ocr_status_mux import get_ocr_status_mux
+from app.services.excel_pool import get_excel_pool
 from app.core.exceptions import (
     http_exception_handler,
     validation_exception_handler,
     general_exception_handler
 )
-from app.core.middleware import RequestLoggingMiddleware, ErrorTrackingMiddleware
+from app.core.middleware import RequestLoggingMiddleware, ErrorTrackingMiddleware, ProfilingMiddleware
 from app.api.v1 import task as task_router
 from app.api.v1 import upload as upload_router
 from app.api.v1 import ocr as ocr_router
 from app.api.v1 import excel as excel_router
 from app.api.v1 import table as table_router
+from app.api.v1 import batch as batch_router
+from app.api.v1 import document as document_router
 
 
 settings = get_settings()
@@ -46,12 +51,23 @@ async def lifespan(app: FastAPI):
         logger.error(f"数据库连接失败: {e}")
         raise
     
+    # 创建 OCR HTTP 连接池
+    await get_ocr_client().start()
+    
+    # 启动后台 OCR 任务池（恢复未完成的任务）
+    from app.services.ocr_worker import get_ocr_worker_pool
+    await get_ocr_worker_pool().start()
+    
     logger.info("应用启动完成")
     
     yield
     
     # 关闭时执行
     logger.info("应用关闭中...")
+    await get_ocr_worker_pool().stop()
+    get_excel_pool().shutdown()
+    await get_ocr_status_mux().stop()
+    await get_ocr_client().close()
     await close_db()
     logger.info("数据库连接已关闭")
 
@@ -76,10 +92,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 2. 错误追踪中间件
+# 2. 请求剖析中间件（仅调试模式；在请求日志中间件之内执行，可以使用其请求 ID）
+if settings.debug:
+    app.add_middleware(ProfilingMiddleware)
+
+# 3. 错误追踪中间件
 app.add_middleware(ErrorTrackingMiddleware)
 
-# 3. 请求日志中间件
+# 4. 请求日志中间件
 app.add_middleware(RequestLoggingMiddleware)
 
 # 配置异常处理器
@@ -94,6 +114,8 @@ app.include_router(upload_router.router, prefix="/api/v1")
 app.include_router(ocr_router.router, prefix="/api/v1")
 app.include_router(excel_router.router, prefix="/api/v1")
 app.include_router(table_router.router, prefix="/api/v1")
+app.include_router(batch_router.router, prefix="/api/v1")
+app.include_router(document_router.router, prefix="/api/v1")
 logger.info("API 路由已注册")
 
 
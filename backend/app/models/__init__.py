@@ -2,5 +2,8 @@
 数据模型模块
 """
 from app.models.task import Task
+from app.models.image_blob import ImageBlob
+from app.models.batch import Batch, BatchItem
+from app.models.document import Document, DocumentPage, DocumentLayout
 
-__all__ = ["Task"]
+__all__ = ["Task", "ImageBlob", "Batch", "BatchItem", "Document", "DocumentPage", "DocumentLayout"]
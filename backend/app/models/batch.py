@@ -0,0 +1,46 @@
+"""
+批量任务数据模型
+"""
+from tortoise import fields
+from tortoise.models import Model
+
+
+class Batch(Model):
+    """批量任务
+    
+    一次批量上传（多文件或 zip 压缩包）创建的一组任务，用于汇总进度与打包下载
+    """
+    # 主键
+    batch_id = fields.UUIDField(pk=True)
+    
+    # 基本信息
+    name = fields.CharField(max_length=255, null=True, description="批次名称（如压缩包文件名）")
+    total = fields.IntField(default=0, description="批次内的任务数")
+    
+    # 时间戳
+    created_at = fields.DatetimeField(auto_now_add=True, description="创建时间")
+    updated_at = fields.DatetimeField(auto_now=True, description="更新时间")
+    
+    class Meta:
+        table = "batches"
+        ordering = ["-created_at"]
+    
+    def __str__(self):
+        return f"Batch({self.batch_id}, total={self.total})"
+
+
+class BatchItem(Model):
+    """批次内的任务（保持上传顺序）"""
+    id = fields.IntField(pk=True)
+    batch = fields.ForeignKeyField("models.Batch", related_name="items", on_delete=fields.CASCADE)
+    task_id = fields.UUIDField(index=True, description="任务 ID")
+    position = fields.IntField(description="在批次中的序号（从 0 开始）")
+    filename = fields.CharField(max_length=255, description="原始文件名")
+    
+    class Meta:
+        table = "batch_items"
+        ordering = ["position"]
+        unique_together = (("batch", "position"),)
+    
+    def __str__(self):
+        return f"BatchItem({self.batch_id}#{self.position}, task_id={self.task_id})"
@@ -0,0 +1,58 @@
+"""
+文档数据模型
+"""
+from enum import Enum
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class DocumentLayout(str, Enum):
+    """文档工作簿布局"""
+    SHEETS = "sheets"    # 每个表格一个 Sheet
+    STACKED = "stacked"  # 所有表格在同一个 Sheet 中纵向排列
+
+
+class Document(Model):
+    """文档
+    
+    多页扫描件的每一页是一个任务，文档按页码把这些任务组织在一起，导出为一个工作簿
+    """
+    # 主键
+    document_id = fields.UUIDField(pk=True)
+    
+    # 基本信息
+    name = fields.CharField(max_length=255, null=True, description="文档名称")
+    layout = fields.CharEnumField(
+        DocumentLayout,
+        max_length=16,
+        default=DocumentLayout.SHEETS,
+        description="默认工作簿布局"
+    )
+    
+    # 时间戳
+    created_at = fields.DatetimeField(auto_now_add=True, description="创建时间")
+    updated_at = fields.DatetimeField(auto_now=True, description="更新时间")
+    
+    class Meta:
+        table = "documents"
+        ordering = ["-created_at"]
+    
+    def __str__(self):
+        return f"Document({self.document_id}, layout={self.layout})"
+
+
+class DocumentPage(Model):
+    """文档中的一页（对应一个任务）"""
+    id = fields.IntField(pk=True)
+    document = fields.ForeignKeyField("models.Document", related_name="pages", on_delete=fields.CASCADE)
+    task_id = fields.UUIDField(index=True, description="任务 ID")
+    page_no = fields.IntField(description="页码（从 1 开始）")
+    
+    class Meta:
+        table = "document_pages"
+        ordering = ["page_no"]
+        unique_together = (("document", "page_no"),)
+    
+    def __str__(self):
+        return f"DocumentPage({self.document_id}#{self.page_no}, task_id={self.task_id})"
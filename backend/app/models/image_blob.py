@@ -0,0 +1,32 @@
+"""
+图片内容索引模型
+"""
+from tortoise import fields
+from tortoise.models import Model
+
+
+class ImageBlob(Model):
+    """图片内容索引
+    
+    按图片内容的 SHA-256 存储一份图片文件，并记录该图片已有的 OCR JSON 结果，
+    重复上传相同图片时直接复用
+    """
+    # 主键：图片内容 SHA-256（十六进制）
+    content_hash = fields.CharField(max_length=64, pk=True, description="图片内容 SHA-256")
+    
+    # 文件信息
+    blob_path = fields.CharField(max_length=512, description="图片存储路径")
+    size = fields.BigIntField(default=0, description="图片大小（字节）")
+    
+    # OCR 结果
+    ocr_json_path = fields.CharField(max_length=512, null=True, description="已有的 OCR JSON 结果路径")
+    
+    # 时间戳
+    created_at = fields.DatetimeField(auto_now_add=True, description="创建时间")
+    updated_at = fields.DatetimeField(auto_now=True, description="更新时间")
+    
+    class Meta:
+        table = "image_blobs"
+    
+    def __str__(self):
+        return f"ImageBlob({self.content_hash}, ocr_json_path={self.ocr_json_path})"
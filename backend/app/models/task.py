@@ -9,6 +9,7 @@ from enum import Enum
 class TaskStatus(str, Enum):
     """任务状态枚举"""
     UPLOADED = "uploaded"                # 图片已上传
+    OCR_QUEUED = "ocr_queued"            # 已进入后台 OCR 队列
     OCR_PROCESSING = "ocr_processing"    # OCR 处理中
     OCR_DONE = "ocr_done"                # OCR 完成
     OCR_FAILED = "ocr_failed"            # OCR 失败
@@ -0,0 +1,48 @@
+"""
+批量任务相关 Schema 定义
+"""
+from typing import Optional, List
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+from app.models.task import TaskStatus
+
+
+class BatchItemInfo(BaseModel):
+    """批次内单个任务的状态"""
+    position: int = Field(..., description="在批次中的序号（从 0 开始）")
+    task_id: UUID
+    filename: str = Field(..., description="原始文件名")
+    status: Optional[TaskStatus] = Field(None, description="任务状态（任务已删除时为空）")
+    error_message: Optional[str] = None
+
+
+class BatchRejectedFile(BaseModel):
+    """批量上传中未被接受的文件"""
+    filename: str
+    reason: str
+
+
+class BatchCreateResponse(BaseModel):
+    """批量上传响应"""
+    batch_id: UUID
+    name: Optional[str] = None
+    total: int = Field(..., description="创建的任务数")
+    items: List[BatchItemInfo]
+    rejected: List[BatchRejectedFile] = Field(default_factory=list, description="被跳过的文件")
+
+
+class BatchProgress(BaseModel):
+    """批次汇总进度"""
+    batch_id: UUID
+    name: Optional[str] = None
+    total: int
+    queued: int = Field(..., description="等待 OCR 的任务数")
+    processing: int = Field(..., description="OCR 处理中的任务数")
+    done: int = Field(..., description="OCR 已完成的任务数")
+    failed: int = Field(..., description="失败的任务数")
+    percent: float = Field(..., description="已结束（完成或失败）的任务百分比")
+    finished: bool = Field(..., description="是否所有任务都已结束")
+    created_at: datetime
+    items: List[BatchItemInfo]
@@ -0,0 +1,36 @@
+"""
+文档相关 Schema 定义
+"""
+from typing import Optional, List
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+from app.models.document import DocumentLayout
+from app.models.task import TaskStatus
+
+
+class DocumentCreate(BaseModel):
+    """创建文档的请求模型（task_ids 与 batch_id 二选一）"""
+    name: Optional[str] = Field(None, max_length=255, description="文档名称")
+    task_ids: Optional[List[UUID]] = Field(None, description="按页顺序排列的任务 ID")
+    batch_id: Optional[UUID] = Field(None, description="使用批次内的任务（按上传顺序）作为各页")
+    layout: DocumentLayout = Field(DocumentLayout.SHEETS, description="默认工作簿布局")
+
+
+class DocumentPageInfo(BaseModel):
+    """文档中一页的状态"""
+    page_no: int = Field(..., description="页码（从 1 开始）")
+    task_id: UUID
+    status: Optional[TaskStatus] = Field(None, description="任务状态（任务已删除时为空）")
+
+
+class DocumentInfo(BaseModel):
+    """文档信息"""
+    document_id: UUID
+    name: Optional[str] = None
+    layout: DocumentLayout
+    total_pages: int
+    ready_pages: int = Field(..., description="OCR 已完成的页数")
+    created_at: datetime
+    pages: List[DocumentPageInfo]
@@ -46,6 +46,7 @@ class TableDataResponse(BaseModel):
     status: str = Field(description="任务状态")
     total_sheets: int = Field(description="Sheet 总数", ge=0)
     sheets: List[TableSheet] = Field(description="所有 Sheet 数据")
+    version: int = Field(default=0, description="数据版本号（0 表示未编辑的 OCR 结果，增量保存时作为 base_version）", ge=0)
     
     class Config:
         json_schema_extra = {
@@ -53,6 +54,7 @@ class TableDataResponse(BaseModel):
                 "task_id": "550e8400-e29b-41d4-a716-446655440000",
                 "status": "editable",
                 "total_sheets": 2,
+                "version": 3,
                 "sheets": [
                     {
                         "sheet_id": 1,
@@ -66,6 +68,66 @@ class TableDataResponse(BaseModel):
         }
 
 
+class TableWindow(BaseModel):
+    """单个 Sheet 的窗口数据（部分行列，用于大表格的按需加载）"""
+    task_id: str = Field(description="任务 ID")
+    sheet_id: int = Field(description="Sheet ID (从 1 开始)")
+    sheet_name: str = Field(description="Sheet 名称")
+    rows: int = Field(description="Sheet 总行数", ge=0)
+    cols: int = Field(description="Sheet 总列数", ge=0)
+    row_offset: int = Field(description="窗口起始行（从 0 开始）", ge=0)
+    col_offset: int = Field(description="窗口起始列（从 0 开始）", ge=0)
+    data: List[List[CellData]] = Field(description="窗口内的表格数据（二维数组，超出表格的部分被截断）")
+    version: int = Field(default=0, description="数据版本号（同 TableDataResponse.version）", ge=0)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "task_id": "550e8400-e29b-41d4-a716-446655440000",
+                "sheet_id": 1,
+                "sheet_name": "Table_1",
+                "rows": 5000,
+                "cols": 12,
+                "row_offset": 200,
+                "col_offset": 0,
+                "version": 3,
+                "data": []
+            }
+        }
+
+
+class CellRangePatch(BaseModel):
+    """单元格区域修改（以 (row, col) 为左上角的矩形区域）"""
+    sheet_id: int = Field(description="Sheet ID (从 1 开始)", ge=1)
+    row: int = Field(description="区域起始行（从 0 开始）", ge=0)
+    col: int = Field(description="区域起始列（从 0 开始）", ge=0)
+    values: List[List[Optional[str]]] = Field(description="区域内各单元格的新文本（按行），null 表示不修改")
+
+
+class TablePatchRequest(BaseModel):
+    """表格增量修改请求"""
+    base_version: int = Field(description="修改所基于的数据版本号", ge=0)
+    patches: List[CellRangePatch] = Field(description="单元格区域修改列表", min_length=1)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "base_version": 3,
+                "patches": [
+                    {"sheet_id": 1, "row": 2, "col": 1, "values": [["100", None, "200"]]}
+                ]
+            }
+        }
+
+
+class TablePatchResult(BaseModel):
+    """表格增量修改结果"""
+    task_id: str = Field(description="任务 ID")
+    version: int = Field(description="修改后的数据版本号", ge=0)
+    updated_sheets: List[int] = Field(description="受影响的 Sheet ID 列表")
+    updated_cells: int = Field(description="修改的单元格数量", ge=0)
+
+
 class TableMetadata(BaseModel):
     """表格元数据（轻量级，不包含完整数据）"""
     task_id: str = Field(description="任务 ID")
@@ -0,0 +1,395 @@
+"""
+批量任务服务层
+一次请求上传多张图片（或包含图片的 zip 压缩包），批量创建任务并提交后台 OCR，
+提供汇总进度，以及合并下载（所有任务的表格合并为一个多 Sheet 工作簿，或每个任务一个工作簿打包为 zip）
+"""
+import asyncio
+import hashlib
+import os
+import re
+import weakref
+import zipfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from fastapi import UploadFile
+from tortoise.transactions import in_transaction
+
+from app.models.batch import Batch, BatchItem
+from app.models.task import Task, TaskStatus
+from app.schemas.batch import BatchCreateResponse, BatchItemInfo, BatchProgress, BatchRejectedFile
+from app.models.document import DocumentLayout
+from app.services.document_service import DocumentService
+from app.services.excel_service import ExcelService
+from app.services.ocr_worker import get_ocr_worker_pool
+from app.services.task_service import OCR_RESULT_STATUSES
+from app.services.upload_service import UploadService
+from app.utils.json_store import dumps
+from app.core.config import get_settings
+from app.core.logging import logger
+
+settings = get_settings()
+
+# 等待 OCR 的任务状态（汇总进度用；完成见 OCR_RESULT_STATUSES，其余状态计为失败）
+QUEUED_STATUSES = (TaskStatus.UPLOADED, TaskStatus.OCR_QUEUED)
+
+# 批量下载格式
+BATCH_DOWNLOAD_XLSX = "xlsx"
+BATCH_DOWNLOAD_ZIP = "zip"
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed", "application/x-zip"}
+
+# 同一批次的合并文件串行生成
+_batch_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _batch_lock(batch_id: UUID) -> asyncio.Lock:
+    key = str(batch_id)
+    lock = _batch_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _batch_locks[key] = lock
+    return lock
+
+
+class BatchService:
+    """批量任务服务类"""
+
+    @staticmethod
+    def is_zip_upload(file: UploadFile) -> bool:
+        """上传的文件是否为 zip 压缩包"""
+        if file.filename and Path(file.filename).suffix.lower() == ".zip":
+            return True
+        return (file.content_type or "").lower() in ZIP_CONTENT_TYPES
+
+    @staticmethod
+    def decode_zip_entry_name(info: zipfile.ZipInfo) -> str:
+        """
+        获取压缩包内文件的名称（不含目录）
+
+        没有 UTF-8 标记的文件名按 cp437 解码，Windows 下压缩的中文文件名实际为 GBK，这里尝试还原
+        """
+        name = info.filename
+        if not info.flag_bits & 0x800:
+            try:
+                name = name.encode("cp437").decode("gbk")
+            except (UnicodeEncodeError, UnicodeDecodeError):
+                pass
+        return PurePosixPath(name.replace("\\", "/")).name
+
+    @staticmethod
+    def expand_zip(
+        file: UploadFile,
+        archive: zipfile.ZipFile
+    ) -> Tuple[List[UploadFile], List[BatchRejectedFile]]:
+        """
+        把压缩包中的图片包装为 UploadFile（按需解压，不整体解压到磁盘）
+
+        跳过目录、隐藏文件与 __MACOSX 元数据，解压后超过 max_upload_size 的文件被拒绝
+
+        Returns:
+            (图片文件列表, 被跳过的文件)
+        """
+        uploads, rejected = [], []
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            parts = PurePosixPath(info.filename.replace("\\", "/")).parts
+            if "__MACOSX" in parts or any(part.startswith(".") for part in parts):
+                continue
+
+            name = BatchService.decode_zip_entry_name(info)
+            display_name = f"{file.filename}/{name}"
+            if Path(name).suffix.lower() not in UploadService.ALLOWED_IMAGE_EXTENSIONS:
+                rejected.append(BatchRejectedFile(filename=display_name, reason="不支持的文件格式"))
+                continue
+            if info.file_size > settings.max_upload_size:
+                rejected.append(BatchRejectedFile(
+                    filename=display_name,
+                    reason=f"文件过大: {UploadService.format_file_size(info.file_size)}"
+                ))
+                continue
+
+            uploads.append(UploadFile(file=archive.open(info), filename=name, size=info.file_size))
+        return uploads, rejected
+
+    @staticmethod
+    async def create_batch(
+        files: List[UploadFile],
+        name: Optional[str] = None,
+        generate_excel: Optional[bool] = None
+    ) -> Tuple[bool, str, Optional[BatchCreateResponse]]:
+        """
+        批量上传图片并提交 OCR
+
+        流程：
+        1. 展开 zip 压缩包，校验图片数量
+        2. 逐个保存图片（按内容寻址，与单张上传一致）
+        3. 在一个事务中批量写入任务（直接为 ocr_queued 状态）与批次记录
+        4. 批量提交到后台 OCR 任务池（并发由 worker 数量控制）
+
+        Args:
+            files: 上传的图片或 zip 压缩包
+            name: 批次名称，默认使用第一个文件名
+            generate_excel: OCR 完成后是否自动生成 Excel，None 表示使用配置默认值
+
+        Returns:
+            Tuple[bool, str, Optional[BatchCreateResponse]]: (成功标志, 消息, 批次信息)
+        """
+        archives: List[zipfile.ZipFile] = []
+        uploads: List[UploadFile] = []
+        rejected: List[BatchRejectedFile] = []
+        try:
+            # 1. 展开压缩包
+            for file in files:
+                if not BatchService.is_zip_upload(file):
+                    uploads.append(file)
+                    continue
+                try:
+                    archive = await asyncio.to_thread(zipfile.ZipFile, file.file)
+                except zipfile.BadZipFile:
+                    rejected.append(BatchRejectedFile(filename=file.filename or "", reason="无效的 zip 文件"))
+                    continue
+                archives.append(archive)
+                entries, skipped = BatchService.expand_zip(file, archive)
+                uploads.extend(entries)
+                rejected.extend(skipped)
+
+            if not uploads:
+                return False, "没有可识别的图片文件", None
+            if len(uploads) > settings.batch_max_files:
+                return False, f"图片数量超过上限: {len(uploads)} > {settings.batch_max_files}", None
+
+            # 2. 保存图片
+            accepted: List[Tuple[UUID, str, str]] = []
+            for upload in uploads:
+                task_id = uuid4()
+                success, result, _ = await UploadService.save_uploaded_image(task_id, upload)
+                if success:
+                    accepted.append((task_id, upload.filename, result))
+                else:
+                    rejected.append(BatchRejectedFile(filename=upload.filename or "", reason=result))
+        finally:
+            for archive in archives:
+                archive.close()
+
+        if not accepted:
+            return False, f"所有文件均上传失败: {rejected[0].reason}", None
+
+        # 3. 批量写入任务与批次
+        batch_name = (name or files[0].filename or "")[:255] or None
+        async with in_transaction():
+            batch = await Batch.create(name=batch_name, total=len(accepted))
+            await Task.bulk_create([
+                Task(task_id=task_id, image_path=image_path, status=TaskStatus.OCR_QUEUED)
+                for task_id, _, image_path in accepted
+            ])
+            await BatchItem.bulk_create([
+                BatchItem(batch_id=batch.batch_id, task_id=task_id, position=position, filename=filename[:255])
+                for position, (task_id, filename, _) in enumerate(accepted)
+            ])
+
+        # 4. 提交 OCR
+        get_ocr_worker_pool().submit_queued([task_id for task_id, _, _ in accepted], generate_excel)
+        logger.info(
+            f"批量任务已创建: batch_id={batch.batch_id}, tasks={len(accepted)}, rejected={len(rejected)}"
+        )
+
+        items = [
+            BatchItemInfo(position=position, task_id=task_id, filename=filename, status=TaskStatus.OCR_QUEUED)
+            for position, (task_id, filename, _) in enumerate(accepted)
+        ]
+        message = f"批量上传成功，共 {len(accepted)} 个任务"
+        if rejected:
+            message += f"，跳过 {len(rejected)} 个文件"
+        return True, message, BatchCreateResponse(
+            batch_id=batch.batch_id,
+            name=batch.name,
+            total=len(accepted),
+            items=items,
+            rejected=rejected
+        )
+
+    @staticmethod
+    async def load_batch(batch_id: UUID) -> Optional[Tuple[Batch, List[BatchItem], Dict[UUID, Task]]]:
+        """
+        读取批次、批次内的任务（按上传顺序）及其当前状态
+
+        Returns:
+            (批次, 批次任务列表, {task_id: 任务})，批次不存在时返回 None
+        """
+        batch = await Batch.get_or_none(batch_id=batch_id)
+        if batch is None:
+            return None
+        items = await BatchItem.filter(batch_id=batch_id).order_by("position")
+        tasks = await Task.filter(task_id__in=[item.task_id for item in items])
+        return batch, items, {task.task_id: task for task in tasks}
+
+    @staticmethod
+    async def get_batch_progress(batch_id: UUID) -> Tuple[bool, str, Optional[BatchProgress]]:
+        """
+        获取批次汇总进度
+
+        Args:
+            batch_id: 批次 ID
+
+        Returns:
+            Tuple[bool, str, Optional[BatchProgress]]: (成功标志, 消息, 进度)
+        """
+        loaded = await BatchService.load_batch(batch_id)
+        if loaded is None:
+            return False, f"批次不存在: {batch_id}", None
+        batch, items, tasks = loaded
+
+        counts = {"queued": 0, "processing": 0, "done": 0, "failed": 0}
+        infos = []
+        for item in items:
+            task = tasks.get(item.task_id)
+            status = task.status if task else None
+            if status in QUEUED_STATUSES:
+                counts["queued"] += 1
+            elif status == TaskStatus.OCR_PROCESSING:
+                counts["processing"] += 1
+            elif status in OCR_RESULT_STATUSES:
+                counts["done"] += 1
+            else:
+                # 失败或任务已被删除
+                counts["failed"] += 1
+            infos.append(BatchItemInfo(
+                position=item.position,
+                task_id=item.task_id,
+                filename=item.filename,
+                status=status,
+                error_message=task.error_message if task else "任务已删除"
+            ))
+
+        total = len(items)
+        ended = counts["done"] + counts["failed"]
+        return True, "获取批次进度成功", BatchProgress(
+            batch_id=batch.batch_id,
+            name=batch.name,
+            total=total,
+            percent=round(ended * 100 / total, 1) if total else 100.0,
+            finished=ended == total,
+            created_at=batch.created_at,
+            items=infos,
+            **counts
+        )
+
+    @staticmethod
+    def get_batch_zip_path(batch_id: UUID, key: str) -> Path:
+        """
+        获取批次压缩包路径
+
+        存储规则：data/excel/batch_{batch_id}.{版本键}.zip（合并工作簿为同名的 .xlsx）
+        """
+        return Path(settings.data_dir) / "excel" / f"batch_{batch_id}.{key}.zip"
+
+    @staticmethod
+    def item_stem(item: BatchItem) -> str:
+        """批次任务在合并文件中的名称（序号_原文件名）"""
+        return f"{item.position + 1:03d}_{Path(item.filename).stem}"
+
+    @staticmethod
+    async def ensure_batch_download(
+        batch_id: UUID,
+        fmt: str,
+        partial: bool = False
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        获取批次的合并下载文件，不存在时生成
+
+        - xlsx：所有任务的表格流式合并为一个工作簿，Sheet 名称为 "序号_原文件名"（多个表格时追加表格序号）
+        - zip：每个任务当前版本的 Excel（见 ExcelService.ensure_excel）打包为 zip
+
+        合并文件按各任务的当前版本计算版本键，任务未变化时直接复用
+
+        Args:
+            batch_id: 批次 ID
+            fmt: 下载格式（xlsx / zip）
+            partial: 是否允许只包含已完成的任务（否则要求所有任务 OCR 完成）
+
+        Returns:
+            Tuple[bool, str, Optional[str]]: (成功标志, 消息, 文件路径)
+
+        Raises:
+            ExcelPoolBusyError: 生成队列已满
+        """
+        loaded = await BatchService.load_batch(batch_id)
+        if loaded is None:
+            return False, f"批次不存在: {batch_id}", None
+        _, items, tasks = loaded
+
+        ready = [
+            item for item in items
+            if item.task_id in tasks and tasks[item.task_id].status in OCR_RESULT_STATUSES
+            and tasks[item.task_id].ocr_json_path
+        ]
+        if not partial and len(ready) != len(items):
+            return False, f"批次尚未全部完成: {len(ready)}/{len(items)}", None
+        if not ready:
+            return False, "批次中没有已完成的任务", None
+
+        async with _batch_lock(batch_id):
+            if fmt == BATCH_DOWNLOAD_ZIP:
+                return await BatchService._ensure_batch_zip(batch_id, ready)
+            return await BatchService._ensure_batch_workbook(batch_id, ready, tasks)
+
+    @staticmethod
+    async def _ensure_batch_workbook(
+        batch_id: UUID,
+        items: List[BatchItem],
+        tasks: Dict[UUID, Task]
+    ) -> Tuple[bool, str, Optional[str]]:
+        # 每个表格一个 Sheet，逐个任务流式写入
+        return await DocumentService.ensure_merged_workbook(
+            f"batch_{batch_id}",
+            [(BatchService.item_stem(item), tasks[item.task_id]) for item in items],
+            DocumentLayout.SHEETS
+        )
+
+    @staticmethod
+    def write_zip(entries: List[Tuple[str, str]], output_path: Path):
+        """把 Excel 文件打包为 zip（xlsx 本身已压缩，不再压缩）"""
+        with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for path, arcname in entries:
+                archive.write(path, arcname=arcname)
+
+    @staticmethod
+    async def _ensure_batch_zip(batch_id: UUID, items: List[BatchItem]) -> Tuple[bool, str, Optional[str]]:
+        # 1. 获取每个任务当前版本的 Excel（产物路径中包含版本键）
+        entries = []
+        for item in items:
+            success, message, excel_path = await ExcelService.ensure_excel(item.task_id)
+            if not success:
+                return False, f"{item.filename}: {message}", None
+            entries.append((excel_path, f"{BatchService.item_stem(item)}.xlsx"))
+
+        key = hashlib.sha1(dumps([[Path(path).name, arcname] for path, arcname in entries])).hexdigest()[:12]
+        zip_path = BatchService.get_batch_zip_path(batch_id, key).resolve()
+        if zip_path.exists():
+            logger.info(f"复用批次压缩包: {zip_path}")
+            return True, "批次压缩包已是最新版本", str(zip_path)
+
+        # 2. 打包
+        tmp_path = zip_path.with_name(f"{zip_path.stem}.tmp.zip")
+        try:
+            await asyncio.to_thread(BatchService.write_zip, entries, tmp_path)
+            os.replace(tmp_path, zip_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        removed = await asyncio.to_thread(
+            DocumentService.remove_stale_merged_artifacts, f"batch_{batch_id}", zip_path
+        )
+        logger.info(f"批次压缩包已生成: {zip_path}, files={len(entries)}, 清理旧版本 {removed} 个")
+        return True, f"批次压缩包生成成功，包含 {len(entries)} 个 Excel", str(zip_path)
+
+    @staticmethod
+    def get_download_filename(batch: Batch, fmt: str) -> str:
+        """批次下载文件名（批次名称_创建时间）"""
+        stem = Path(batch.name).stem if batch.name else "batch"
+        stem = re.sub(r"[^A-Za-z0-9._-]+", "_", stem).strip("_") or "batch"
+        created_at = batch.created_at or datetime.utcnow()
+        return f"{stem}_{created_at.strftime('%Y%m%d_%H%M%S')}.{fmt}"
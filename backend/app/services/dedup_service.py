@@ -0,0 +1,161 @@
+"""
+图片去重服务层
+图片按内容 SHA-256 存储（data/images/{sha256}.{ext}），
+并记录每份图片已有的 OCR JSON 结果，相同图片重复上传时复用
+"""
+import os
+from pathlib import Path
+from typing import Optional
+from uuid import UUID
+
+from app.models.image_blob import ImageBlob
+from app.models.task import Task, TaskStatus
+from app.core.config import get_settings
+from app.core.logging import logger
+
+
+settings = get_settings()
+
+
+class DedupService:
+    """图片去重服务类"""
+
+    @staticmethod
+    def get_blob_storage_path(content_hash: str, file_extension: str) -> Path:
+        """
+        获取按内容寻址的图片存储路径
+
+        存储规则：data/images/{sha256}.{ext}
+
+        Args:
+            content_hash: 图片内容 SHA-256
+            file_extension: 文件扩展名（包含点，如 .png）
+
+        Returns:
+            Path: 图片存储的完整路径
+        """
+        return Path(settings.data_paths["images"]) / f"{content_hash}{file_extension}"
+
+    @staticmethod
+    def get_upload_temp_path(task_id: UUID, file_extension: str) -> Path:
+        """
+        获取上传过程中的临时文件路径（内容哈希在上传结束后才能确定）
+
+        存储规则：data/temp/{task_id}.{ext}.part
+        """
+        return Path(settings.data_paths["temp"]) / f"{task_id}{file_extension}.part"
+
+    @staticmethod
+    def get_content_hash(image_path: Optional[str]) -> Optional[str]:
+        """
+        从按内容寻址的图片路径中取出内容哈希
+
+        Returns:
+            str: SHA-256，旧的 data/images/{task_id}.{ext} 路径返回 None
+        """
+        if not image_path:
+            return None
+        stem = Path(image_path).stem
+        if len(stem) != 64:
+            return None
+        try:
+            int(stem, 16)
+        except ValueError:
+            return None
+        return stem
+
+    @staticmethod
+    async def get_blob(content_hash: str) -> Optional[ImageBlob]:
+        """
+        获取图片内容索引（文件已被删除时视为不存在）
+        """
+        blob = await ImageBlob.filter(content_hash=content_hash).first()
+        if blob is None or not Path(blob.blob_path).exists():
+            return None
+        return blob
+
+    @staticmethod
+    async def commit_blob(temp_path: Path, content_hash: str, file_extension: str, size: int) -> Path:
+        """
+        将上传完成的临时文件登记为内容寻址的图片
+
+        相同内容的图片已存在时删除临时文件并返回已有路径
+
+        Args:
+            temp_path: 上传的临时文件
+            content_hash: 图片内容 SHA-256
+            file_extension: 文件扩展名
+            size: 图片大小（字节）
+
+        Returns:
+            Path: 图片存储路径
+        """
+        blob = await DedupService.get_blob(content_hash)
+        if blob is not None:
+            temp_path.unlink(missing_ok=True)
+            logger.info(f"图片内容已存在，复用: hash={content_hash}, path={blob.blob_path}")
+            return Path(blob.blob_path)
+
+        blob_path = DedupService.get_blob_storage_path(content_hash, file_extension)
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, blob_path)
+        blob_path = blob_path.resolve()
+
+        await ImageBlob.update_or_create(
+            defaults={"blob_path": str(blob_path), "size": size},
+            content_hash=content_hash
+        )
+        return blob_path
+
+    @staticmethod
+    async def find_ocr_result(image_path: Optional[str]) -> Optional[str]:
+        """
+        查找图片已有的 OCR JSON 结果
+
+        Args:
+            image_path: 任务的图片路径
+
+        Returns:
+            str: OCR JSON 路径，没有可复用的结果时返回 None
+        """
+        content_hash = DedupService.get_content_hash(image_path)
+        if content_hash is None:
+            return None
+
+        blob = await ImageBlob.filter(content_hash=content_hash).first()
+        if blob is None or not blob.ocr_json_path:
+            return None
+        if not Path(blob.ocr_json_path).exists():
+            return None
+        return blob.ocr_json_path
+
+    @staticmethod
+    async def find_inflight_job(task: Task) -> Optional[str]:
+        """
+        查找相同图片正在处理中的 OCR job（并发上传相同图片时共用一个 job）
+
+        Returns:
+            str: OCR job_id，不存在时返回 None
+        """
+        if DedupService.get_content_hash(task.image_path) is None:
+            return None
+
+        other = await Task.filter(
+            image_path=task.image_path,
+            status=TaskStatus.OCR_PROCESSING,
+            ocr_job_id__isnull=False
+        ).exclude(task_id=task.task_id).first()
+        return other.ocr_job_id if other else None
+
+    @staticmethod
+    async def record_ocr_result(image_path: Optional[str], ocr_json_path: str):
+        """
+        记录图片的 OCR JSON 结果，供后续相同图片复用
+        """
+        content_hash = DedupService.get_content_hash(image_path)
+        if content_hash is None:
+            return
+
+        updated = await ImageBlob.filter(content_hash=content_hash).update(ocr_json_path=ocr_json_path)
+        if updated:
+            logger.info(f"登记图片 OCR 结果: hash={content_hash}, json_path={ocr_json_path}")
@@ -0,0 +1,291 @@
+"""
+文档服务层
+文档把多页扫描件对应的多个任务按页码组织在一起，合并导出为一个工作簿（见 document_writer）
+"""
+import asyncio
+import hashlib
+import os
+import re
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from tortoise.transactions import in_transaction
+
+from app.models.batch import BatchItem
+from app.models.document import Document, DocumentLayout, DocumentPage
+from app.models.task import Task
+from app.schemas.document import DocumentInfo, DocumentPageInfo
+from app.services.document_writer import DOCUMENT_WRITER_ENGINE, PageSource, write_document_workbook
+from app.services.excel_pool import get_excel_pool
+from app.services.excel_service import ExcelService
+from app.services.task_service import OCR_RESULT_STATUSES
+from app.utils.json_store import dumps
+from app.core.config import get_settings
+from app.core.logging import logger
+
+settings = get_settings()
+
+# 同一文档的工作簿串行生成
+_document_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _document_lock(document_id: UUID) -> asyncio.Lock:
+    key = str(document_id)
+    lock = _document_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _document_locks[key] = lock
+    return lock
+
+
+class DocumentService:
+    """文档服务类"""
+
+    @staticmethod
+    async def create_document(
+        task_ids: Optional[List[UUID]] = None,
+        batch_id: Optional[UUID] = None,
+        name: Optional[str] = None,
+        layout: DocumentLayout = DocumentLayout.SHEETS
+    ) -> Tuple[bool, str, Optional[DocumentInfo]]:
+        """
+        创建文档
+
+        Args:
+            task_ids: 按页顺序排列的任务 ID
+            batch_id: 使用批次内的任务（按上传顺序）作为各页，与 task_ids 二选一
+            name: 文档名称
+            layout: 默认工作簿布局
+
+        Returns:
+            Tuple[bool, str, Optional[DocumentInfo]]: (成功标志, 消息, 文档信息)
+        """
+        if (task_ids is None) == (batch_id is None):
+            return False, "task_ids 与 batch_id 必须且只能指定一个", None
+
+        if batch_id is not None:
+            items = await BatchItem.filter(batch_id=batch_id).order_by("position")
+            if not items:
+                return False, f"批次不存在或为空: {batch_id}", None
+            task_ids = [item.task_id for item in items]
+
+        if not task_ids:
+            return False, "文档至少需要一页", None
+        if len(task_ids) > settings.document_max_pages:
+            return False, f"页数超过上限: {len(task_ids)} > {settings.document_max_pages}", None
+        if len(set(task_ids)) != len(task_ids):
+            return False, "同一个任务不能重复出现在文档中", None
+
+        existing = set(await Task.filter(task_id__in=task_ids).values_list("task_id", flat=True))
+        missing = [str(task_id) for task_id in task_ids if task_id not in existing]
+        if missing:
+            return False, f"任务不存在: {', '.join(missing[:5])}", None
+
+        async with in_transaction():
+            document = await Document.create(name=name, layout=layout)
+            await DocumentPage.bulk_create([
+                DocumentPage(document_id=document.document_id, task_id=task_id, page_no=page_no)
+                for page_no, task_id in enumerate(task_ids, start=1)
+            ])
+
+        logger.info(f"文档已创建: document_id={document.document_id}, pages={len(task_ids)}")
+        return await DocumentService.get_document_info(document.document_id)
+
+    @staticmethod
+    async def load_document(document_id: UUID) -> Optional[Tuple[Document, List[DocumentPage], Dict[UUID, Task]]]:
+        """
+        读取文档、各页（按页码）及对应任务
+
+        Returns:
+            (文档, 页列表, {task_id: 任务})，文档不存在时返回 None
+        """
+        document = await Document.get_or_none(document_id=document_id)
+        if document is None:
+            return None
+        pages = await DocumentPage.filter(document_id=document_id).order_by("page_no")
+        tasks = await Task.filter(task_id__in=[page.task_id for page in pages])
+        return document, pages, {task.task_id: task for task in tasks}
+
+    @staticmethod
+    async def get_document_info(document_id: UUID) -> Tuple[bool, str, Optional[DocumentInfo]]:
+        """
+        获取文档信息与各页状态
+
+        Returns:
+            Tuple[bool, str, Optional[DocumentInfo]]: (成功标志, 消息, 文档信息)
+        """
+        loaded = await DocumentService.load_document(document_id)
+        if loaded is None:
+            return False, f"文档不存在: {document_id}", None
+        document, pages, tasks = loaded
+
+        infos = [
+            DocumentPageInfo(
+                page_no=page.page_no,
+                task_id=page.task_id,
+                status=tasks[page.task_id].status if page.task_id in tasks else None
+            )
+            for page in pages
+        ]
+        return True, "获取文档成功", DocumentInfo(
+            document_id=document.document_id,
+            name=document.name,
+            layout=document.layout,
+            total_pages=len(pages),
+            ready_pages=sum(1 for info in infos if info.status in OCR_RESULT_STATUSES),
+            created_at=document.created_at,
+            pages=infos
+        )
+
+    @staticmethod
+    def get_merged_artifact_path(prefix: str, key: str) -> Path:
+        """
+        获取合并工作簿路径
+
+        存储规则：data/excel/{prefix}.{版本键}.xlsx（prefix 如 document_{document_id}_{layout}、batch_{batch_id}）
+        """
+        return Path(settings.data_dir) / "excel" / f"{prefix}.{key}.xlsx"
+
+    @staticmethod
+    def remove_stale_merged_artifacts(prefix: str, current_path: Path) -> int:
+        """删除同一前缀、与 current_path 格式相同的旧版本文件"""
+        removed = 0
+        for path in current_path.parent.glob(f"{prefix}.*{current_path.suffix}"):
+            if path.name != current_path.name and ".tmp." not in path.name:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    @staticmethod
+    async def ensure_merged_workbook(
+        prefix: str,
+        entries: List[Tuple[str, Task]],
+        layout: DocumentLayout,
+        sheet_title: Optional[str] = None
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        获取多个任务合并后的工作簿，不存在时流式生成（调用方负责加锁）
+
+        各任务使用当前版本的数据（编辑过的使用编辑结果与编辑样式，与单任务导出一致），
+        版本键由各任务的 OCR 结果指纹、编辑版本与样式计算，任务未变化时直接复用
+
+        Args:
+            prefix: 文件名前缀
+            entries: [(页面名称, 任务)]，按页顺序，任务必须已完成 OCR
+            layout: 工作簿布局
+            sheet_title: stacked 布局的 Sheet 名称
+
+        Returns:
+            Tuple[bool, str, Optional[str]]: (成功标志, 消息, 文件路径)
+
+        Raises:
+            ExcelPoolBusyError: 生成队列已满
+        """
+        # 1. 确定各页的数据来源（只读取版本，表格在子进程中逐页加载）
+        sources = []
+        for title, task in entries:
+            fingerprint, version, style_name, _ = await ExcelService.resolve_excel_source(
+                task.task_id, task.ocr_json_path
+            )
+            sources.append((PageSource(
+                title=title,
+                task_id=str(task.task_id),
+                ocr_json_path=task.ocr_json_path,
+                fingerprint=fingerprint,
+                edited=version > 0,
+                style_name=style_name
+            ), version))
+
+        key = hashlib.sha1(dumps([
+            [
+                source.title, source.task_id, list(source.fingerprint) if source.fingerprint else None,
+                version, source.style_name
+            ]
+            for source, version in sources
+        ] + [
+            layout.value, sheet_title, DOCUMENT_WRITER_ENGINE, settings.table_stitch_enabled
+        ])).hexdigest()[:12]
+        excel_path = DocumentService.get_merged_artifact_path(prefix, key).resolve()
+        if excel_path.exists():
+            logger.info(f"复用合并工作簿: {excel_path}")
+            return True, "工作簿已是最新版本", str(excel_path)
+
+        # 2. 在进程池中流式生成
+        excel_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = excel_path.with_name(f"{excel_path.stem}.tmp.xlsx")
+        try:
+            n_tables = await get_excel_pool().run(
+                write_document_workbook,
+                [source for source, _ in sources],
+                str(tmp_path),
+                layout.value,
+                sheet_title,
+                settings.table_stitch_enabled
+            )
+            os.replace(tmp_path, excel_path)
+        except ValueError as e:
+            return False, str(e), None
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        removed = await asyncio.to_thread(DocumentService.remove_stale_merged_artifacts, prefix, excel_path)
+        logger.info(
+            f"合并工作簿已生成: {excel_path}, layout={layout.value}, "
+            f"pages={len(sources)}, tables={n_tables}, 清理旧版本 {removed} 个"
+        )
+        return True, f"工作簿生成成功，共 {len(sources)} 页、{n_tables} 个表格", str(excel_path)
+
+    @staticmethod
+    async def ensure_document_excel(
+        document_id: UUID,
+        layout: Optional[DocumentLayout] = None
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        获取文档的工作簿，不存在时生成（所有页必须已完成 OCR）
+
+        Args:
+            document_id: 文档 ID
+            layout: 工作簿布局，None 表示使用文档的默认布局
+
+        Returns:
+            Tuple[bool, str, Optional[str]]: (成功标志, 消息, 文件路径)
+
+        Raises:
+            ExcelPoolBusyError: 生成队列已满
+        """
+        loaded = await DocumentService.load_document(document_id)
+        if loaded is None:
+            return False, f"文档不存在: {document_id}", None
+        document, pages, tasks = loaded
+
+        entries = []
+        for page in pages:
+            task = tasks.get(page.task_id)
+            if task is None or task.status not in OCR_RESULT_STATUSES or not task.ocr_json_path:
+                return False, f"第 {page.page_no} 页尚未完成 OCR", None
+            entries.append((f"Page_{page.page_no}", task))
+
+        # 每种布局使用独立的前缀，交替下载不同布局时不会互相清理
+        layout = layout or document.layout
+        async with _document_lock(document_id):
+            return await DocumentService.ensure_merged_workbook(
+                f"document_{document_id}_{layout.value}",
+                entries,
+                layout,
+                document.name or "Document"
+            )
+
+    @staticmethod
+    def get_download_stem(document: Document) -> str:
+        """文档文件名（只保留安全字符）"""
+        stem = Path(document.name).stem if document.name else "document"
+        return re.sub(r"[^A-Za-z0-9._-]+", "_", stem).strip("_") or "document"
+
+    @staticmethod
+    def get_download_filename(document: Document) -> str:
+        """文档下载文件名（文档名称_创建时间）"""
+        created_at = document.created_at or datetime.utcnow()
+        return f"{DocumentService.get_download_stem(document)}_{created_at.strftime('%Y%m%d_%H%M%S')}.xlsx"
@@ -0,0 +1,189 @@
+"""
+多页文档工作簿的流式生成
+把多个任务（文档的各页、批次内的各图片）的表格写入同一个工作簿，只遍历一次：
+逐页读取表格 → 逐个写入只写模式的 Sheet → 释放，任何时刻只持有当前页的表格（拼接续表时另有未结束的表格），
+内存占用与页数无关（已写入的行由 openpyxl 暂存在临时文件中）
+
+在 Excel 生成进程池中执行，参数只包含路径、指纹等可跨进程传递的信息
+"""
+import logging
+from itertools import chain
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from openpyxl import Workbook
+
+from app.models.document import DocumentLayout
+from app.services.excel_writer import (
+    OCR_SHEET_STYLE,
+    SHEET_STYLES,
+    WriteOnlyExcelWriter,
+    add_table_sizes,
+    compute_column_widths,
+    make_sheet_title,
+    save_workbook,
+)
+from app.services.ocr_store import load_table_blocks
+from app.services.table_edit_store import get_table_edit_store
+from app.services.table_ir import parse_table_html_uncached
+from app.services.table_stitch import (
+    TableFragment,
+    align_edited_fragments,
+    blocks_to_fragments,
+    stitch_fragments,
+)
+from app.utils.metrics import track_performance
+
+logger = logging.getLogger(__name__)
+
+# 流式写入只使用只写引擎（整表内存引擎无法逐页释放）
+DOCUMENT_WRITER_ENGINE = WriteOnlyExcelWriter.name
+
+# 纵向排列时表格之间的空行数
+STACKED_GAP_ROWS = 1
+
+
+class PageSource(NamedTuple):
+    """一页的数据来源"""
+    title: str                                # 页面名称（Sheet 名称前缀）
+    task_id: str
+    ocr_json_path: str
+    fingerprint: Optional[Tuple[int, int]]    # OCR 结果指纹（读取编辑状态时校验）
+    edited: bool                              # 是否使用编辑后的数据
+    style_name: str                           # 样式方案（与单任务导出相同：编辑过的页面使用编辑样式）
+
+
+def load_page_fragments(page: PageSource, page_base: int) -> Tuple[List[TableFragment], int]:
+    """
+    读取一页的非空表格及其版面位置：编辑过的页面使用编辑后的中间表示，否则逐个解析 HTML（不经过解析缓存）
+
+    编辑状态已失效（OCR 结果变化）时回退到 OCR 结果（同时使用 OCR 样式）
+
+    Args:
+        page: 数据来源
+        page_base: 该任务第一页的页序号（文档内连续编号，用于识别跨任务的续表）
+
+    Returns:
+        (片段列表，label 为 (页面名称, 表格序号, 表格数, 样式方案名称)；OCR 结果的页面数)
+    """
+    blocks, n_pages = load_table_blocks(page.ocr_json_path)
+    irs = None
+    if page.edited:
+        state = get_table_edit_store().read(UUID(page.task_id), page.fingerprint)
+        if state is not None:
+            irs = list(state.irs)
+        else:
+            logger.warning(f"编辑状态已失效，使用 OCR 结果: task_id={page.task_id}")
+
+    if irs is not None:
+        fragments, n_tables = align_edited_fragments(blocks, irs, page_base), len(irs)
+        style_name = page.style_name
+    else:
+        fragments, n_tables = blocks_to_fragments(blocks, parse_table_html_uncached, page_base), len(blocks)
+        style_name = OCR_SHEET_STYLE.name
+    fragments = [
+        fragment._replace(label=(page.title, fragment.label, n_tables, style_name))
+        for fragment in fragments
+    ]
+    return fragments, max(n_pages, 1)
+
+
+def iter_page_fragments(pages: List[PageSource]) -> Iterator[List[TableFragment]]:
+    """逐页产出表格片段（页序号在文档内连续编号）"""
+    page_base = 0
+    for page in pages:
+        fragments, n_pages = load_page_fragments(page, page_base)
+        page_base += n_pages
+        yield fragments
+
+
+def write_document_workbook(
+    pages: List[PageSource],
+    output_path: str,
+    layout: str,
+    sheet_title: Optional[str] = None,
+    stitch: bool = False
+) -> int:
+    """
+    流式生成多页工作簿
+
+    - sheets：每个表格一个 Sheet，名称为 "页面名称"（一页多个表格时追加 "_表格序号"）
+    - stacked：所有表格按页顺序在同一个 Sheet 中纵向排列，表格之间空一行；
+      只写模式要求列宽先于数据设置，列宽按第一页的表格计算
+    - stitch：跨页 / 跨块的续表拼接为一个表格（见 table_stitch），名称取自续表的第一个片段；
+      拼接同样是流式的，只额外持有尚未结束的表格
+    - 样式按页面决定（PageSource.style_name），与单任务导出一致；拼接后的表格使用第一个片段的样式
+
+    Args:
+        pages: 各页数据来源（按页顺序）
+        output_path: 输出文件路径
+        layout: 布局（DocumentLayout 的值）
+        sheet_title: stacked 布局的 Sheet 名称
+        stitch: 是否拼接续表
+
+    Returns:
+        int: 写入的表格数
+
+    Raises:
+        ValueError: 没有可导出的表格
+    """
+    wb = Workbook(write_only=True)
+    registered: Dict[str, Tuple[str, str]] = {}
+
+    def named_styles(style_name: str) -> Tuple[str, str]:
+        """按需注册样式方案的命名样式，返回 (普通单元格, 表头单元格) 样式名称"""
+        if style_name not in registered:
+            body_style, header_style = SHEET_STYLES[style_name].named_styles()
+            wb.add_named_style(body_style)
+            wb.add_named_style(header_style)
+            registered[style_name] = (body_style.name, header_style.name)
+        return registered[style_name]
+
+    # 表格在写入过程中逐页读取、解析，workbook_build span 中包含各页的 html_parse / span_expansion
+    with track_performance("workbook_build", engine=DOCUMENT_WRITER_ENGINE, layout=layout) as span:
+        used_titles = set()
+        n_tables = 0
+        page_fragments = iter_page_fragments(pages)
+
+        if layout == DocumentLayout.STACKED.value:
+            # 第一页（有表格的页）的表格用于计算列宽
+            first_page = next((fragments for fragments in page_fragments if fragments), None)
+            if first_page is None:
+                raise ValueError("没有可导出的表格")
+            widths: Dict[int, float] = {}
+            for fragment in first_page:
+                size_empty_columns = SHEET_STYLES[fragment.label[3]].size_empty_columns
+                for col_idx, width in compute_column_widths(fragment.ir, size_empty_columns).items():
+                    widths[col_idx] = max(widths.get(col_idx, 0), width)
+            ws = wb.create_sheet(title=make_sheet_title(sheet_title or 'Document', used_titles))
+            WriteOnlyExcelWriter.set_column_widths(ws, widths)
+            page_fragments = chain([first_page], page_fragments)
+
+        fragments = chain.from_iterable(page_fragments)
+        tables = stitch_fragments(fragments) if stitch else ((fragment.label, fragment.ir) for fragment in fragments)
+
+        row_offset = 0
+        for (title, table_idx, page_tables, style_name), ir in tables:
+            style = SHEET_STYLES[style_name]
+            body_name, header_name = named_styles(style_name)
+            if layout == DocumentLayout.STACKED.value:
+                if row_offset:
+                    for _ in range(STACKED_GAP_ROWS):
+                        ws.append([])
+                    row_offset += STACKED_GAP_ROWS
+                WriteOnlyExcelWriter.append_table(ws, ir, style, body_name, header_name, row_offset)
+                row_offset += ir.n_rows
+            else:
+                if page_tables > 1:
+                    title = f"{title}_{table_idx + 1}"
+                ws = wb.create_sheet(title=make_sheet_title(title, used_titles))
+                WriteOnlyExcelWriter.set_column_widths(ws, compute_column_widths(ir, style.size_empty_columns))
+                WriteOnlyExcelWriter.append_table(ws, ir, style, body_name, header_name)
+            add_table_sizes(span, ir)
+            n_tables += 1
+
+    if n_tables == 0:
+        raise ValueError("没有可导出的表格")
+
+    save_workbook(wb, output_path)
+    return n_tables
@@ -0,0 +1,152 @@
+"""
+Excel 生成进程池
+openpyxl 构建工作簿与 wb.save() 都是纯 CPU 计算，放到独立进程中执行，避免阻塞事件循环。
+提交给子进程的是紧凑的表格中间表示（TableIR，数组 + 文本列表），而不是 pydantic 对象
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.table_ir import TableIR
+from app.services.excel_writer import write_workbook
+from app.utils.metrics import collect_spans, replay_spans
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ExcelPoolBusyError(RuntimeError):
+    """等待 Excel 生成名额超时"""
+
+
+def _run_with_spans(fn: Callable[..., Any], *args: Any) -> Tuple[Any, List[Dict[str, Any]]]:
+    """在子进程中执行生成函数，连同期间记录的 span 一起返回（由父进程汇总）"""
+    with collect_spans() as spans:
+        result = fn(*args)
+    return result, spans
+
+
+class ExcelGenerationPool:
+    """
+    Excel 生成进程池
+
+    - workers 个子进程并行生成（0 表示在当前进程的线程中生成）
+    - 同时排队 + 执行的任务数不超过 max_pending，超出时等待，
+      等待超过 queue_timeout 秒抛出 ExcelPoolBusyError
+    """
+
+    def __init__(self, workers: int, max_pending: int, queue_timeout: float):
+        self.workers = max(workers, 0)
+        self.max_pending = max(max_pending, 1)
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn：子进程不继承事件循环、数据库连接等父进程状态
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.info(f"Excel 生成进程池已创建: workers={self.workers}, max_pending={self.max_pending}")
+        return self._executor
+
+    async def write(
+        self,
+        sheets: List[Tuple[str, TableIR]],
+        output_path: str,
+        style_name: str
+    ) -> str:
+        """
+        在进程池中生成 Excel
+
+        Args:
+            sheets: [(Sheet 名称, 表格中间表示)]
+            output_path: 输出文件路径
+            style_name: 样式方案名称
+
+        Returns:
+            str: 实际使用的写入引擎名称
+
+        Raises:
+            ExcelPoolBusyError: 等待生成名额超时
+        """
+        return await self.run(write_workbook, sheets, output_path, style_name)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        在进程池中执行生成函数（与 write 共用排队名额）
+
+        Args:
+            fn: 模块级函数（子进程中按名称导入）
+            args: 可跨进程传递的参数
+
+        Raises:
+            ExcelPoolBusyError: 等待生成名额超时
+        """
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise ExcelPoolBusyError(f"Excel 生成任务过多，请稍后重试（当前排队 {self._pending} 个）")
+
+        self._pending += 1
+        try:
+            if self.workers == 0:
+                return await asyncio.to_thread(fn, *args)
+
+            loop = asyncio.get_running_loop()
+            try:
+                result, spans = await loop.run_in_executor(self._get_executor(), _run_with_spans, fn, *args)
+            except BrokenProcessPool:
+                # 子进程异常退出后进程池不可再用，下次提交时重建
+                logger.error("Excel 生成进程池已损坏，将重建")
+                self._executor = None
+                raise
+            replay_spans(spans)
+            return result
+        finally:
+            self._pending -= 1
+            self._completed += 1
+            self._slots.release()
+
+    def shutdown(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("Excel 生成进程池已关闭")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取进程池统计信息"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+
+# 单例
+_excel_pool = None
+
+
+def get_excel_pool() -> ExcelGenerationPool:
+    """获取 Excel 生成进程池单例"""
+    global _excel_pool
+    if _excel_pool is None:
+        _excel_pool = ExcelGenerationPool(
+            settings.excel_process_workers,
+            settings.excel_max_pending,
+            settings.excel_queue_timeout
+        )
+    return _excel_pool
@@ -1,89 +1,55 @@
 """
 Excel 生成服务层
 """
-import json
+import asyncio
+import hashlib
 import logging
+import os
+import weakref
 from pathlib import Path
 from typing import Optional, List, Tuple
 from uuid import UUID
-from html.parser import HTMLParser
-from io import StringIO
 
+import numpy as np
 import pandas as pd
-from openpyxl import Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.cell.cell import MergedCell
 
 from app.models.task import Task, TaskStatus
 from app.services.task_service import TaskService
+from app.services.table_service import TableService
+from app.services.table_ir import (
+    HTMLTableParser,
+    TableIR,
+    as_numpy,
+    parse_table_html,
+)
+from app.services.excel_writer import (
+    OCR_SHEET_STYLE,
+    EDITED_SHEET_STYLE,
+    write_workbook,
+)
+from app.services.excel_pool import ExcelPoolBusyError, get_excel_pool
+from app.services.ocr_store import load_table_blocks, load_table_html_blocks
+from app.services.table_stitch import align_edited_fragments, blocks_to_fragments, stitch_fragments
+from app.services.table_cache import Fingerprint, get_table_cache
+from app.services.table_edit_store import get_table_edit_store
+from app.utils.json_store import dumps
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 同一任务的 Excel 产物串行生成
+_artifact_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
-class HTMLTableParser(HTMLParser):
-    """HTML 表格解析器"""
-    
-    def __init__(self):
-        super().__init__()
-        self.in_table = False
-        self.in_row = False
-        self.in_cell = False
-        self.current_cell_content = []
-        self.current_row = []
-        self.rows = []
-        self.cell_tag = None  # 'td' or 'th'
-        self.rowspan = 1
-        self.colspan = 1
-        
-    def handle_starttag(self, tag, attrs):
-        if tag == 'table':
-            self.in_table = True
-            self.rows = []
-        elif tag == 'tr' and self.in_table:
-            self.in_row = True
-            self.current_row = []
-        elif tag in ('td', 'th') and self.in_row:
-            self.in_cell = True
-            self.cell_tag = tag
-            self.current_cell_content = []
-            # 获取 rowspan 和 colspan
-            attrs_dict = dict(attrs)
-            self.rowspan = int(attrs_dict.get('rowspan', '1'))
-            self.colspan = int(attrs_dict.get('colspan', '1'))
-    
-    def handle_endtag(self, tag):
-        if tag == 'table':
-            self.in_table = False
-        elif tag == 'tr' and self.in_row:
-            self.in_row = False
-            if self.current_row:
-                self.rows.append(self.current_row)
-        elif tag in ('td', 'th') and self.in_cell:
-            self.in_cell = False
-            cell_text = ''.join(self.current_cell_content).strip()
-            # 存储单元格内容及其跨度信息
-            cell_info = {
-                'text': cell_text,
-                'rowspan': self.rowspan,
-                'colspan': self.colspan,
-                'is_header': self.cell_tag == 'th'
-            }
-            self.current_row.append(cell_info)
-            # 重置
-            self.rowspan = 1
-            self.colspan = 1
-    
-    def handle_data(self, data):
-        if self.in_cell:
-            self.current_cell_content.append(data)
-    
-    def get_table_data(self) -> List[List[dict]]:
-        """获取解析后的表格数据"""
-        return self.rows
+
+def _artifact_lock(task_id: UUID) -> asyncio.Lock:
+    key = str(task_id)
+    lock = _artifact_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _artifact_locks[key] = lock
+    return lock
 
 
 class ExcelService:
@@ -100,66 +66,17 @@ class ExcelService:
         Returns:
             DataFrame: 表格数据
         """
-        parser = HTMLTableParser()
-        parser.feed(html_content)
-        rows_data = parser.get_table_data()
+        ir = parse_table_html(html_content)
         
-        if not rows_data:
+        if ir.is_empty:
             return pd.DataFrame()
         
-        # 处理合并单元格
-        # 首先计算最大列数
-        max_cols = 0
-        for row in rows_data:
-            col_count = sum(cell['colspan'] for cell in row)
-            max_cols = max(max_cols, col_count)
-        
-        # 创建二维数组来存储展开后的数据
-        expanded_rows = []
-        rowspan_tracker = {}  # 跟踪需要向下合并的单元格 {col_idx: (remaining_rows, text)}
-        
-        for row in rows_data:
-            expanded_row = [''] * max_cols
-            col_idx = 0
-            
-            # 首先处理之前行的 rowspan
-            for check_col in range(max_cols):
-                if check_col in rowspan_tracker:
-                    remaining, text = rowspan_tracker[check_col]
-                    expanded_row[check_col] = text
-                    remaining -= 1
-                    if remaining > 0:
-                        rowspan_tracker[check_col] = (remaining, text)
-                    else:
-                        del rowspan_tracker[check_col]
-            
-            # 处理当前行的单元格
-            for cell in row:
-                # 找到下一个空位置
-                while col_idx < max_cols and expanded_row[col_idx] != '':
-                    col_idx += 1
-                
-                if col_idx >= max_cols:
-                    break
-                
-                text = cell['text']
-                colspan = cell['colspan']
-                rowspan = cell['rowspan']
-                
-                # 填充 colspan
-                for i in range(colspan):
-                    if col_idx + i < max_cols:
-                        expanded_row[col_idx + i] = text if i == 0 else ''
-                
-                # 如果有 rowspan，记录到 tracker 中
-                if rowspan > 1:
-                    for i in range(colspan):
-                        if col_idx + i < max_cols:
-                            rowspan_tracker[col_idx + i] = (rowspan - 1, text if i == 0 else '')
-                
-                col_idx += colspan
-            
-            expanded_rows.append(expanded_row)
+        # 展开合并单元格：文本写在锚点列，rowspan 覆盖的行在锚点列重复文本，其余位置为空
+        grid = as_numpy(ir.grid).reshape(ir.n_rows, ir.n_cols)
+        cell_ids = np.maximum(grid, 0)
+        at_anchor_col = (grid >= 0) & (as_numpy(ir.anchor_cols)[cell_ids] == np.arange(ir.n_cols))
+        texts = np.array(ir.texts + [''], dtype=object)
+        expanded_rows = texts[np.where(at_anchor_col, cell_ids, len(ir.texts))]
         
         # 创建 DataFrame
         df = pd.DataFrame(expanded_rows)
@@ -178,29 +95,15 @@ class ExcelService:
             List[DataFrame]: 表格列表
         """
         try:
-            with open(ocr_json_path, 'r', encoding='utf-8') as f:
-                ocr_data = json.load(f)
-            
             tables = []
             
-            # 遍历所有页面
-            pages = ocr_data.get('pages', [])
-            for page in pages:
-                parsing_res_list = page.get('parsing_res_list', [])
-                
-                # 提取所有表格
-                for block in parsing_res_list:
-                    if block.get('block_label') == 'table':
-                        block_content = block.get('block_content', '')
-                        if block_content:
-                            # 清理转义的双引号（\" -> "）
-                            block_content = block_content.replace('\\"', '"')
-                            
-                            # 解析 HTML 表格
-                            df = ExcelService.parse_html_table(block_content)
-                            if not df.empty:
-                                tables.append(df)
-                                logger.info(f"提取到表格，形状: {df.shape}")
+            # 遍历所有表格块
+            for block_content in load_table_html_blocks(ocr_json_path):
+                # 解析 HTML 表格
+                df = ExcelService.parse_html_table(block_content)
+                if not df.empty:
+                    tables.append(df)
+                    logger.info(f"提取到表格，形状: {df.shape}")
             
             logger.info(f"从 OCR JSON 中共提取到 {len(tables)} 个表格")
             return tables
@@ -212,7 +115,8 @@ class ExcelService:
     @staticmethod
     def create_excel_with_merged_cells(
         html_contents: List[str],
-        output_path: str
+        output_path: str,
+        engine: Optional[str] = None
     ) -> str:
         """
         从 HTML 表格内容创建带合并单元格的 Excel 文件
@@ -220,6 +124,7 @@ class ExcelService:
         Args:
             html_contents: HTML 表格内容列表
             output_path: 输出文件路径
+            engine: 写入引擎名称，None 表示使用配置（失败时回退到 openpyxl 引擎）
             
         Returns:
             str: Excel 文件路径
@@ -227,129 +132,247 @@ class ExcelService:
         if not html_contents:
             raise ValueError("没有表格数据可以生成 Excel")
         
-        # 创建工作簿
-        wb = Workbook()
+        # 解析 HTML 表格（复用进程内已解析的中间表示），每个表格一个 Sheet
+        sheets = [
+            (f"Table_{table_idx + 1}", parse_table_html(html_content))
+            for table_idx, html_content in enumerate(html_contents)
+        ]
+        
+        engine_name = write_workbook(sheets, output_path, OCR_SHEET_STYLE.name, engine)
         
-        # 移除默认的 Sheet
-        if 'Sheet' in wb.sheetnames:
-            wb.remove(wb['Sheet'])
+        logger.info(f"Excel 文件已保存（带合并单元格，引擎: {engine_name}）: {output_path}")
         
-        # 为每个 HTML 表格创建一个 Sheet
-        for table_idx, html_content in enumerate(html_contents):
-            sheet_name = f"Table_{table_idx + 1}"
-            ws = wb.create_sheet(title=sheet_name)
+        return output_path
+    
+    @staticmethod
+    def load_ocr_sheets(ocr_json_path: str) -> List[Tuple[str, TableIR]]:
+        """
+        读取 OCR JSON 并解析其中的 HTML 表格
+        
+        启用续表拼接时跨页 / 跨块的续表合并为一个 Sheet（空表格不导出），
+        否则每个表格一个 Sheet（空表格保留为空 Sheet）
+        
+        Args:
+            ocr_json_path: OCR JSON 文件路径
             
-            # 解析 HTML 表格
-            parser = HTMLTableParser()
-            parser.feed(html_content)
-            rows_data = parser.get_table_data()
+        Returns:
+            [(Sheet 名称, 表格中间表示)]
+        """
+        if settings.table_stitch_enabled:
+            blocks, _ = load_table_blocks(ocr_json_path)
+            irs = [ir for _, ir in stitch_fragments(blocks_to_fragments(blocks, parse_table_html))]
+            logger.info(f"提取到表格 {len(blocks)} 个，拼接续表后 {len(irs)} 个")
+            return [(f"Table_{table_idx + 1}", ir) for table_idx, ir in enumerate(irs)]
+        
+        html_contents = load_table_html_blocks(ocr_json_path)
+        for block_content in html_contents:
+            logger.info(f"提取到表格，HTML 长度: {len(block_content)}")
+        
+        return [
+            (f"Table_{table_idx + 1}", parse_table_html(html_content))
+            for table_idx, html_content in enumerate(html_contents)
+        ]
+    
+    @staticmethod
+    def stitch_edited_sheets(
+        ocr_json_path: str,
+        sheets: List[Tuple[str, TableIR]]
+    ) -> List[Tuple[str, TableIR]]:
+        """
+        拼接编辑后表格中的续表（版面位置取自 OCR 结果）
+        
+        命名规则与 load_ocr_sheets 相同：拼接后按顺序重新编号为 Table_1, Table_2, ...，
+        编辑一个单元格不会改变导出的 Sheet 名称；整表保存时自定义的名称（不是默认的
+        Table_{序号}）沿用每组第一个表格的名称
+        
+        Args:
+            ocr_json_path: OCR JSON 文件路径
+            sheets: 编辑后的 Sheet
             
-            if not rows_data:
-                continue
+        Returns:
+            [(Sheet 名称, 表格中间表示)]
+        """
+        blocks, _ = load_table_blocks(ocr_json_path)
+        fragments = align_edited_fragments(blocks, [ir for _, ir in sheets])
+        stitched = []
+        for sheet_idx, (table_idx, ir) in enumerate(stitch_fragments(fragments)):
+            name = sheets[table_idx][0]
+            if name == f"Table_{table_idx + 1}":
+                name = f"Table_{sheet_idx + 1}"
+            stitched.append((name, ir))
+        return stitched
+    
+    @staticmethod
+    def get_excel_artifact_key(
+        fingerprint: Optional[Fingerprint],
+        version: int,
+        style_name: str,
+        engine: Optional[str] = None
+    ) -> str:
+        """
+        计算 Excel 产物的版本键
+        
+        Excel 是 (OCR 结果, 编辑版本, 写入选项) 的函数，任何一项变化都对应新的产物
+        
+        Args:
+            fingerprint: OCR JSON 指纹
+            version: 编辑版本号（0 表示未编辑）
+            style_name: 单元格样式名称
+            engine: 写入引擎名称，None 表示使用配置
             
-            # 写入数据并记录合并信息
-            current_row = 1
-            rowspan_tracker = {}  # {col_idx: (end_row, start_row)}
+        Returns:
+            12 位十六进制版本键
+        """
+        options = [
+            list(fingerprint) if fingerprint else None,
+            version,
+            style_name,
+            engine or settings.excel_writer_engine,
+            settings.table_stitch_enabled,
+        ]
+        return hashlib.sha1(dumps(options)).hexdigest()[:12]
+    
+    @staticmethod
+    def get_excel_artifact_path(task_id: UUID, version: int, key: str) -> Path:
+        """
+        获取 Excel 产物路径
+        
+        存储规则：data/excel/{task_id}.v{编辑版本}.{版本键}.xlsx
+        """
+        return Path(settings.data_dir) / 'excel' / f"{task_id}.v{version}.{key}.xlsx"
+    
+    @staticmethod
+    def remove_stale_artifacts(task_id: UUID, current_path: Path) -> int:
+        """
+        删除任务的旧版本 Excel 产物（包括旧的 {task_id}.xlsx）
+        
+        旧版编辑数据（{task_id}_edited.json）尚未迁移时保留 {task_id}.xlsx：它可能是旧编辑结果的唯一副本
+        
+        Returns:
+            删除的文件数
+        """
+        keep = {current_path.name}
+        legacy_path = current_path.parent / f"{task_id}.xlsx"
+        if legacy_path.exists() and get_table_edit_store().has_legacy_snapshot(task_id):
+            keep.add(legacy_path.name)
+        
+        removed = 0
+        for path in current_path.parent.glob(f"{task_id}*.xlsx"):
+            if path.name not in keep:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+    
+    @staticmethod
+    async def resolve_excel_source(
+        task_id: UUID,
+        ocr_json_path: str
+    ) -> Tuple[Optional[Fingerprint], int, str, Optional[List[Tuple[str, TableIR]]]]:
+        """
+        确定任务当前版本的 Excel 数据来源
+        
+        已编辑过的任务使用编辑后的数据（编辑状态在事件循环中读取，取得的是一致的快照），否则使用 OCR 结果
+        
+        Args:
+            task_id: 任务 ID
+            ocr_json_path: OCR JSON 文件路径
             
-            for row_data in rows_data:
-                current_col = 1
-                
-                for cell_info in row_data:
-                    # 跳过被 rowspan 占用的单元格
-                    while current_col in rowspan_tracker:
-                        end_row, start_row = rowspan_tracker[current_col]
-                        if current_row <= end_row:
-                            current_col += 1
-                        else:
-                            del rowspan_tracker[current_col]
-                            break
-                    
-                    text = cell_info['text']
-                    colspan = cell_info['colspan']
-                    rowspan = cell_info['rowspan']
-                    is_header = cell_info['is_header']
-                    
-                    # 写入单元格值
-                    cell = ws.cell(row=current_row, column=current_col)
-                    cell.value = text if text else ''
-                    
-                    # 应用合并
-                    if colspan > 1 or rowspan > 1:
-                        end_col = current_col + colspan - 1
-                        end_row = current_row + rowspan - 1
-                        
-                        # 合并单元格
-                        ws.merge_cells(
-                            start_row=current_row,
-                            start_column=current_col,
-                            end_row=end_row,
-                            end_column=end_col
-                        )
-                        
-                        # 记录 rowspan 信息
-                        if rowspan > 1:
-                            for col_offset in range(colspan):
-                                col_idx = current_col + col_offset
-                                rowspan_tracker[col_idx] = (end_row, current_row)
-                    
-                    # 设置样式
-                    for r in range(current_row, current_row + rowspan):
-                        for c in range(current_col, current_col + colspan):
-                            cell = ws.cell(row=r, column=c)
-                            
-                            # 表头样式
-                            if is_header or current_row == 1:
-                                cell.font = Font(bold=True)
-                                cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-                            
-                            # 对齐方式
-                            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                            
-                            # 边框
-                            thin_border = Border(
-                                left=Side(style='thin'),
-                                right=Side(style='thin'),
-                                top=Side(style='thin'),
-                                bottom=Side(style='thin')
-                            )
-                            cell.border = thin_border
-                    
-                    current_col += colspan
-                
-                current_row += 1
+        Returns:
+            (OCR JSON 指纹, 编辑版本号, 样式名称, 编辑后的 Sheet)；未编辑时 Sheet 为 None，需通过 load_ocr_sheets 读取
+        """
+        fingerprint = get_table_cache().fingerprint(ocr_json_path)
+        state = await TableService.load_edit_state(task_id, ocr_json_path)
+        if state is not None:
+            return fingerprint, state.version, EDITED_SHEET_STYLE.name, state.sheets
+        return fingerprint, 0, OCR_SHEET_STYLE.name, None
+    
+    @staticmethod
+    async def ensure_excel(task_id: UUID) -> Tuple[bool, str, Optional[str]]:
+        """
+        获取任务当前版本的 Excel 文件，不存在时生成
+        
+        已编辑过的任务使用编辑后的数据，否则使用 OCR 结果；
+        对应版本的产物已存在时直接返回，保存编辑不会触发生成，只在首次需要时生成
+        
+        Args:
+            task_id: 任务 ID
             
-            # 自动调整列宽
-            from openpyxl.cell.cell import MergedCell
-            from openpyxl.utils import get_column_letter
+        Returns:
+            Tuple[bool, str, Optional[str]]: (成功标志, 消息, Excel 路径)
             
-            for col_idx in range(1, ws.max_column + 1):
-                max_length = 0
-                for row_idx in range(1, ws.max_row + 1):
-                    cell = ws.cell(row=row_idx, column=col_idx)
-                    # 跳过合并单元格
-                    if isinstance(cell, MergedCell):
-                        continue
-                    try:
-                        if cell.value:
-                            max_length = max(max_length, len(str(cell.value)))
-                    except:
-                        pass
-                
-                if max_length > 0:
-                    adjusted_width = min(max_length + 2, 50)  # 最大宽度 50
-                    column_letter = get_column_letter(col_idx)
-                    ws.column_dimensions[column_letter].width = adjusted_width
+        Raises:
+            ExcelPoolBusyError: 生成队列已满
+        """
+        # 1. 获取任务
+        task = await TaskService.get_task(task_id)
+        if not task:
+            return False, f"任务不存在: {task_id}", None
         
-        # 保存 Excel 文件
-        wb.save(output_path)
-        logger.info(f"Excel 文件已保存（带合并单元格）: {output_path}")
+        # 2. 检查任务状态（允许 ocr_done / excel_generated / editable）
+        if task.status not in [TaskStatus.OCR_DONE, TaskStatus.EXCEL_GENERATED, TaskStatus.EDITABLE]:
+            return False, f"任务状态错误: {task.status}，期望 ocr_done / excel_generated / editable", None
         
-        return output_path
+        # 3. 检查 OCR JSON 路径
+        if not task.ocr_json_path:
+            return False, "OCR JSON 路径为空", None
+        
+        ocr_json_path = Path(task.ocr_json_path)
+        if not ocr_json_path.exists():
+            return False, f"OCR JSON 文件不存在: {ocr_json_path}", None
+        
+        async with _artifact_lock(task_id):
+            # 4. 确定当前版本
+            fingerprint, version, style_name, sheets = await ExcelService.resolve_excel_source(
+                task_id, str(ocr_json_path)
+            )
+            key = ExcelService.get_excel_artifact_key(fingerprint, version, style_name)
+            excel_path = ExcelService.get_excel_artifact_path(task_id, version, key).resolve()
+            
+            # 5. 已有对应版本的产物
+            if excel_path.exists():
+                logger.info(f"复用 Excel 产物: {excel_path}")
+                message = "Excel 已是最新版本"
+            else:
+                # 6. 生成 Excel（带合并单元格，在进程池中执行）
+                if sheets is None:
+                    logger.info(f"开始从 OCR JSON 提取表格: {ocr_json_path}")
+                    sheets = await asyncio.to_thread(ExcelService.load_ocr_sheets, str(ocr_json_path))
+                elif settings.table_stitch_enabled:
+                    sheets = await asyncio.to_thread(ExcelService.stitch_edited_sheets, str(ocr_json_path), sheets)
+                
+                if not sheets:
+                    return False, "未从 OCR JSON 中提取到表格", None
+                
+                excel_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = excel_path.with_name(f"{excel_path.stem}.tmp.xlsx")
+                
+                logger.info(f"开始生成 Excel 文件（带合并单元格）: {excel_path}")
+                try:
+                    engine_name = await get_excel_pool().write(sheets, str(tmp_path), style_name)
+                    os.replace(tmp_path, excel_path)
+                finally:
+                    tmp_path.unlink(missing_ok=True)
+                removed = await asyncio.to_thread(ExcelService.remove_stale_artifacts, task_id, excel_path)
+                logger.info(
+                    f"Excel 文件已保存（带合并单元格，引擎: {engine_name}）: {excel_path}, "
+                    f"version={version}, 清理旧版本 {removed} 个"
+                )
+                message = f"Excel 生成成功，包含 {len(sheets)} 个 Sheet"
+            
+            # 7. 更新任务
+            task = await TaskService.get_task(task_id)
+            if task.excel_path != str(excel_path) or task.status == TaskStatus.OCR_DONE:
+                task.excel_path = str(excel_path)
+                if task.status == TaskStatus.OCR_DONE:
+                    task.status = TaskStatus.EXCEL_GENERATED
+                await task.save()
+            
+            return True, message, str(excel_path)
     
     @staticmethod
     async def generate_excel_from_ocr(task_id: UUID) -> Tuple[bool, str, Optional[str]]:
         """
-        根据任务的 OCR JSON 生成 Excel 文件
+        生成任务的 Excel 文件（当前版本的产物已存在时直接复用）
         
         Args:
             task_id: 任务 ID
@@ -358,65 +381,11 @@ class ExcelService:
             Tuple[bool, str, Optional[str]]: (成功标志, 消息, Excel 路径)
         """
         try:
-            # 1. 获取任务
-            task = await TaskService.get_task(task_id)
-            if not task:
-                return False, f"任务不存在: {task_id}", None
-            
-            # 2. 检查任务状态（允许 ocr_done / excel_generated / editable）
-            if task.status not in [TaskStatus.OCR_DONE, TaskStatus.EXCEL_GENERATED, TaskStatus.EDITABLE]:
-                return False, f"任务状态错误: {task.status}，期望 ocr_done / excel_generated / editable", None
-            
-            # 3. 检查 OCR JSON 路径
-            if not task.ocr_json_path:
-                return False, "OCR JSON 路径为空", None
-            
-            ocr_json_path = Path(task.ocr_json_path)
-            if not ocr_json_path.exists():
-                return False, f"OCR JSON 文件不存在: {ocr_json_path}", None
-            
-            # 4. 提取 HTML 表格内容
-            logger.info(f"开始从 OCR JSON 提取表格: {ocr_json_path}")
-            
-            # 读取 OCR JSON 并提取 HTML 内容
-            with open(ocr_json_path, 'r', encoding='utf-8') as f:
-                ocr_data = json.load(f)
-            
-            html_contents = []
-            pages = ocr_data.get('pages', [])
-            for page in pages:
-                parsing_res_list = page.get('parsing_res_list', [])
-                for block in parsing_res_list:
-                    if block.get('block_label') == 'table':
-                        block_content = block.get('block_content', '')
-                        if block_content:
-                            # 清理转义的双引号（虽然保存时已清理，但保险起见）
-                            block_content = block_content.replace('\\"', '"')
-                            html_contents.append(block_content)
-                            logger.info(f"提取到表格，HTML 长度: {len(block_content)}")
-            
-            if not html_contents:
-                return False, "未从 OCR JSON 中提取到表格", None
-            
-            # 5. 生成 Excel（带合并单元格）
-            excel_dir = Path(settings.data_dir) / 'excel'
-            excel_dir.mkdir(parents=True, exist_ok=True)
-            
-            excel_filename = f"{task_id}.xlsx"
-            excel_path = excel_dir / excel_filename
-            
-            logger.info(f"开始生成 Excel 文件（带合并单元格）: {excel_path}")
-            ExcelService.create_excel_with_merged_cells(html_contents, str(excel_path))
-            
-            # 6. 更新任务状态
-            excel_path_abs = excel_path.resolve()
-            task.excel_path = str(excel_path_abs)
-            task.status = TaskStatus.EXCEL_GENERATED
-            await task.save()
-            
-            logger.info(f"Excel 生成成功，任务状态已更新为 excel_generated")
-            
-            return True, f"Excel 生成成功，包含 {len(html_contents)} 个 Sheet", str(excel_path_abs)
+            return await ExcelService.ensure_excel(task_id)
+        
+        except ExcelPoolBusyError as e:
+            logger.warning(f"Excel 生成繁忙: task_id={task_id}, {str(e)}")
+            return False, str(e), None
             
         except Exception as e:
             error_msg = f"生成 Excel 失败: {str(e)}"
@@ -433,106 +402,3 @@ class ExcelService:
                 logger.error(f"更新任务状态失败: {str(save_error)}")
             
             return False, error_msg, None
-    
-    @staticmethod
-    async def generate_excel_from_table_data(task_id: UUID, table_data) -> Tuple[bool, str, Optional[str]]:
-        """
-        从前端编辑的表格数据生成 Excel 文件
-        
-        Args:
-            task_id: 任务 ID
-            table_data: TableDataResponse 对象（编辑后的表格数据）
-            
-        Returns:
-            Tuple[bool, str, Optional[str]]: (成功标志, 消息, Excel 路径)
-        """
-        try:
-            # 1. 获取任务
-            task = await TaskService.get_task(task_id)
-            if not task:
-                return False, f"任务不存在: {task_id}", None
-            
-            # 2. 创建 Excel 工作簿
-            wb = Workbook()
-            wb.remove(wb.active)  # 删除默认的 Sheet
-            
-            # 3. 为每个 Sheet 创建工作表
-            for sheet_data in table_data.sheets:
-                ws = wb.create_sheet(title=sheet_data.sheet_name)
-                
-                # 4. 写入数据并处理合并单元格
-                # 记录已合并的区域，避免重复合并
-                merged_cells = set()
-                
-                for row_idx, row in enumerate(sheet_data.data, start=1):
-                    for col_idx, cell in enumerate(row, start=1):
-                        # 跳过已被合并覆盖的单元格
-                        excel_cell = ws.cell(row=row_idx, column=col_idx)
-                        if isinstance(excel_cell, MergedCell):
-                            continue
-
-                        # 写入单元格内容
-                        excel_cell.value = cell.text
-                        
-                        # 设置样式
-                        if cell.is_header:
-                            excel_cell.font = Font(bold=True)
-                            excel_cell.fill = PatternFill(start_color='F0F0F0', end_color='F0F0F0', fill_type='solid')
-                        
-                        excel_cell.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-                        excel_cell.border = Border(
-                            left=Side(style='thin', color='000000'),
-                            right=Side(style='thin', color='000000'),
-                            top=Side(style='thin', color='000000'),
-                            bottom=Side(style='thin', color='000000')
-                        )
-                        
-                        # 处理合并单元格
-                        if (cell.rowspan > 1 or cell.colspan > 1):
-                            start_cell = f"{get_column_letter(col_idx)}{row_idx}"
-                            end_cell = f"{get_column_letter(col_idx + cell.colspan - 1)}{row_idx + cell.rowspan - 1}"
-                            merge_range = f"{start_cell}:{end_cell}"
-                            
-                            if merge_range not in merged_cells:
-                                try:
-                                    ws.merge_cells(merge_range)
-                                    merged_cells.add(merge_range)
-                                except Exception as e:
-                                    logger.warning(f"合并单元格失败 {merge_range}: {e}")
-                
-                # 5. 调整列宽
-                for col_idx in range(1, ws.max_column + 1):
-                    max_length = 0
-                    for row_idx in range(1, ws.max_row + 1):
-                        cell = ws.cell(row=row_idx, column=col_idx)
-                        if isinstance(cell, MergedCell):
-                            continue
-                        try:
-                            if cell.value:
-                                max_length = max(max_length, len(str(cell.value)))
-                        except Exception:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    ws.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
-            
-            # 6. 保存 Excel 文件
-            excel_dir = Path(settings.data_dir) / 'excel'
-            excel_dir.mkdir(parents=True, exist_ok=True)
-            
-            excel_filename = f"{task_id}.xlsx"
-            excel_path = excel_dir / excel_filename
-            
-            wb.save(str(excel_path))
-            logger.info(f"Excel 生成成功: {excel_path}")
-            
-            # 7. 更新任务
-            excel_path_abs = excel_path.resolve()
-            task.excel_path = str(excel_path_abs)
-            await task.save()
-            
-            return True, f"Excel 生成成功，包含 {len(table_data.sheets)} 个 Sheet", str(excel_path_abs)
-            
-        except Exception as e:
-            error_msg = f"生成 Excel 失败: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            return False, error_msg, None
\ No newline at end of file
@@ -0,0 +1,427 @@
+"""
+Excel 写入引擎
+把表格中间表示（TableIR）写成 xlsx 文件，引擎可通过配置 excel_writer_engine 切换：
+- write_only：openpyxl 只写模式，按行顺序流式写入，所有单元格共用命名样式，内存占用与表格大小无关
+- openpyxl：整表内存模式，逐单元格写入并设置样式（原有实现，作为回退）
+"""
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+
+from app.services.table_ir import TableIR
+from app.utils.metrics import track_performance
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 列宽上限
+MAX_COLUMN_WIDTH = 50
+
+# Sheet 名称的长度上限与不允许的字符（Excel 限制）
+MAX_SHEET_TITLE_LENGTH = 31
+INVALID_SHEET_TITLE_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+class SheetStyle:
+    """工作表样式方案"""
+
+    __slots__ = (
+        'name', 'horizontal', 'header_fill', 'first_row_header',
+        'border_color', 'style_covered_cells', 'size_empty_columns'
+    )
+
+    def __init__(
+        self,
+        name: str,
+        horizontal: str,
+        header_fill: str,
+        first_row_header: bool,
+        border_color: Optional[str] = None,
+        style_covered_cells: bool = True,
+        size_empty_columns: bool = False
+    ):
+        self.name = name
+        self.horizontal = horizontal
+        self.header_fill = header_fill
+        self.first_row_header = first_row_header  # 第一行是否总是使用表头样式
+        self.border_color = border_color
+        self.style_covered_cells = style_covered_cells  # 合并区域内被覆盖的位置是否设置样式
+        self.size_empty_columns = size_empty_columns  # 没有文本的列是否也设置（最小）列宽
+
+    def header_font(self) -> Font:
+        return Font(bold=True)
+
+    def fill(self) -> PatternFill:
+        return PatternFill(start_color=self.header_fill, end_color=self.header_fill, fill_type="solid")
+
+    def alignment(self) -> Alignment:
+        return Alignment(horizontal=self.horizontal, vertical='center', wrap_text=True)
+
+    def border(self) -> Border:
+        return Border(
+            left=Side(style='thin', color=self.border_color),
+            right=Side(style='thin', color=self.border_color),
+            top=Side(style='thin', color=self.border_color),
+            bottom=Side(style='thin', color=self.border_color)
+        )
+
+    def named_styles(self) -> Tuple[NamedStyle, NamedStyle]:
+        """
+        构造 (普通单元格, 表头单元格) 两个命名样式
+        """
+        body = NamedStyle(name=f"{self.name}_body")
+        body.alignment = self.alignment()
+        body.border = self.border()
+
+        header = NamedStyle(name=f"{self.name}_header")
+        header.font = self.header_font()
+        header.fill = self.fill()
+        header.alignment = self.alignment()
+        header.border = self.border()
+        return body, header
+
+
+# OCR 识别结果导出样式：居中，表头（及第一行）加粗灰底，合并区域整体加边框
+OCR_SHEET_STYLE = SheetStyle('ocr', horizontal='center', header_fill='CCCCCC', first_row_header=True)
+
+# 编辑后数据导出样式：左对齐，表头加粗浅灰底，只为锚点单元格设置样式
+EDITED_SHEET_STYLE = SheetStyle(
+    'edited',
+    horizontal='left',
+    header_fill='F0F0F0',
+    first_row_header=False,
+    border_color='000000',
+    style_covered_cells=False,
+    size_empty_columns=True
+)
+
+SHEET_STYLES = {style.name: style for style in (OCR_SHEET_STYLE, EDITED_SHEET_STYLE)}
+
+
+def compute_column_widths(ir: TableIR, include_empty: bool = False) -> Dict[int, float]:
+    """
+    按锚点单元格文本长度计算列宽（与写入后扫描非合并单元格的结果一致）
+
+    只读取中间表示中的锚点列与文本，不访问 openpyxl 单元格
+
+    Args:
+        ir: 表格中间表示
+        include_empty: 没有文本的列是否也返回（最小）列宽
+
+    Returns:
+        {列号(从 1 开始): 列宽}
+    """
+    max_lengths = [0] * ir.n_cols
+    for col, length in zip(ir.anchor_cols, map(len, ir.texts)):
+        if length > max_lengths[col]:
+            max_lengths[col] = length
+    return {
+        col + 1: min(length + 2, MAX_COLUMN_WIDTH)
+        for col, length in enumerate(max_lengths)
+        if length > 0 or include_empty
+    }
+
+
+def make_sheet_title(name: str, used: Set[str]) -> str:
+    """
+    把任意名称转换为合法且不重复的 Sheet 名称（多个任务合并到一个工作簿时使用）
+
+    去掉 Excel 不允许的字符并截断到 31 个字符，与 used 中已有名称重复（不区分大小写）时追加序号
+
+    Args:
+        name: 原始名称
+        used: 已使用的名称（小写），返回的名称会加入其中
+
+    Returns:
+        str: Sheet 名称
+    """
+    base = INVALID_SHEET_TITLE_CHARS.sub('_', name).strip().strip("'") or 'Sheet'
+    title = base[:MAX_SHEET_TITLE_LENGTH]
+    index = 1
+    while title.lower() in used:
+        index += 1
+        suffix = f"~{index}"
+        title = base[:MAX_SHEET_TITLE_LENGTH - len(suffix)] + suffix
+    used.add(title.lower())
+    return title
+
+
+def add_table_sizes(span: Dict[str, Any], ir: TableIR):
+    """把表格尺寸累加到 workbook_build span（tables / rows / merges 累加，cols 取最大值）"""
+    span['tables'] = span.get('tables', 0) + 1
+    span['rows'] = span.get('rows', 0) + ir.n_rows
+    span['cols'] = max(span.get('cols', 0), ir.n_cols)
+    span['merges'] = span.get('merges', 0) + ir.merge_count
+
+
+def save_workbook(wb: Workbook, output_path: str):
+    """保存工作簿（记录为 workbook_save span，尺寸为输出文件的字节数）"""
+    with track_performance("workbook_save") as span:
+        wb.save(output_path)
+        span['bytes'] = os.path.getsize(output_path)
+
+
+class ExcelWriter:
+    """Excel 写入引擎基类"""
+
+    name = ''
+
+    def write(
+        self,
+        sheets: List[Tuple[str, TableIR]],
+        output_path: str,
+        style: SheetStyle = OCR_SHEET_STYLE
+    ) -> str:
+        """
+        写入 Excel 文件
+
+        Args:
+            sheets: [(Sheet 名称, 表格中间表示)]，空表格生成空 Sheet
+            output_path: 输出文件路径
+            style: 样式方案
+
+        Returns:
+            str: Excel 文件路径
+        """
+        raise NotImplementedError
+
+
+class OpenpyxlExcelWriter(ExcelWriter):
+    """整表内存模式（逐单元格写入与设置样式）"""
+
+    name = 'openpyxl'
+
+    def write(
+        self,
+        sheets: List[Tuple[str, TableIR]],
+        output_path: str,
+        style: SheetStyle = OCR_SHEET_STYLE
+    ) -> str:
+        wb = Workbook()
+        wb.remove(wb.active)
+
+        with track_performance("workbook_build", engine=self.name) as span:
+            for sheet_name, ir in sheets:
+                ws = wb.create_sheet(title=sheet_name)
+                if ir.is_empty:
+                    continue
+
+                add_table_sizes(span, ir)
+
+                # 按锚点写入数据并应用合并
+                for cell_id, row, col, rowspan, colspan in ir.iter_cells():
+                    current_row = row + 1
+                    current_col = col + 1
+                    text = ir.texts[cell_id]
+                    is_header = ir.headers[cell_id]
+
+                    # 写入单元格值
+                    cell = ws.cell(row=current_row, column=current_col)
+                    cell.value = text if text else ''
+
+                    # 应用合并
+                    if colspan > 1 or rowspan > 1:
+                        ws.merge_cells(
+                            start_row=current_row,
+                            start_column=current_col,
+                            end_row=current_row + rowspan - 1,
+                            end_column=current_col + colspan - 1
+                        )
+
+                    # 设置样式
+                    style_rows = rowspan if style.style_covered_cells else 1
+                    style_cols = colspan if style.style_covered_cells else 1
+                    for r in range(current_row, current_row + style_rows):
+                        for c in range(current_col, current_col + style_cols):
+                            cell = ws.cell(row=r, column=c)
+
+                            # 表头样式
+                            if is_header or (style.first_row_header and current_row == 1):
+                                cell.font = style.header_font()
+                                cell.fill = style.fill()
+
+                            cell.alignment = style.alignment()
+                            cell.border = style.border()
+
+                # 自动调整列宽（由中间表示计算，不再回扫单元格）
+                for col_idx, width in compute_column_widths(ir, style.size_empty_columns).items():
+                    ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        save_workbook(wb, output_path)
+        return output_path
+
+
+class WriteOnlyExcelWriter(ExcelWriter):
+    """
+    只写模式（按行流式写入）
+
+    - 列宽在写入前由中间表示计算（只写模式要求列设置先于数据）
+    - 合并区域内被覆盖的位置写入带样式的空单元格，保持边框完整
+    - 合并区域在 Sheet 末尾统一写出
+    """
+
+    name = 'write_only'
+
+    def write(
+        self,
+        sheets: List[Tuple[str, TableIR]],
+        output_path: str,
+        style: SheetStyle = OCR_SHEET_STYLE
+    ) -> str:
+        wb = Workbook(write_only=True)
+        body_style, header_style = style.named_styles()
+        wb.add_named_style(body_style)
+        wb.add_named_style(header_style)
+
+        with track_performance("workbook_build", engine=self.name) as span:
+            for sheet_name, ir in sheets:
+                ws = wb.create_sheet(title=sheet_name)
+                if ir.is_empty:
+                    continue
+
+                add_table_sizes(span, ir)
+                self.set_column_widths(ws, compute_column_widths(ir, style.size_empty_columns))
+                self.append_table(ws, ir, style, body_style.name, header_style.name)
+
+        save_workbook(wb, output_path)
+        return output_path
+
+    @staticmethod
+    def set_column_widths(ws, widths: Dict[int, float]):
+        """设置列宽（只写模式下必须在写入第一行之前设置）"""
+        for col_idx, width in widths.items():
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+    @staticmethod
+    def append_table(
+        ws,
+        ir: TableIR,
+        style: SheetStyle,
+        body_name: str,
+        header_name: str,
+        row_offset: int = 0
+    ):
+        """
+        在只写 Sheet 末尾追加一个表格
+
+        Args:
+            ws: 只写模式的 Sheet
+            ir: 表格中间表示
+            style: 样式方案
+            body_name / header_name: 已注册的命名样式
+            row_offset: Sheet 中已写入的行数（表格从第 row_offset + 1 行开始）
+        """
+        # 中间表示中的合并区域互不重叠，直接加入集合，
+        # 跳过 MultiCellRange.add 对已有区域的逐个包含检查（合并区域多时为平方复杂度）
+        merged_ranges = ws.merged_cells.ranges
+        for row, col, rowspan, colspan in ir.merges():
+            merged_ranges.add(CellRange(
+                min_row=row_offset + row + 1,
+                min_col=col + 1,
+                max_row=row_offset + row + rowspan,
+                max_col=col + colspan
+            ))
+
+        for row_values in WriteOnlyExcelWriter._iter_rows(ws, ir, style, body_name, header_name):
+            ws.append(row_values)
+
+    @staticmethod
+    def _iter_rows(ws, ir: TableIR, style: SheetStyle, body_name: str, header_name: str):
+        n_cols = ir.n_cols
+        grid = ir.grid
+        anchor_rows = ir.anchor_rows
+        anchor_cols = ir.anchor_cols
+        texts = ir.texts
+        headers = ir.headers
+
+        for row in range(ir.n_rows):
+            offset = row * n_cols
+            row_values = []
+            for col in range(n_cols):
+                cell_id = grid[offset + col]
+                if cell_id < 0:
+                    row_values.append(None)
+                    continue
+
+                anchor_row = anchor_rows[cell_id]
+                is_anchor = anchor_row == row and anchor_cols[cell_id] == col
+                if not is_anchor and not style.style_covered_cells:
+                    row_values.append(None)
+                    continue
+
+                cell = WriteOnlyCell(ws, value=(texts[cell_id] or '') if is_anchor else None)
+                if headers[cell_id] or (style.first_row_header and anchor_row == 0):
+                    cell.style = header_name
+                else:
+                    cell.style = body_name
+                row_values.append(cell)
+            yield row_values
+
+
+# 可用的写入引擎
+EXCEL_WRITERS = {
+    WriteOnlyExcelWriter.name: WriteOnlyExcelWriter,
+    OpenpyxlExcelWriter.name: OpenpyxlExcelWriter,
+}
+
+# 回退引擎
+FALLBACK_EXCEL_WRITER = OpenpyxlExcelWriter.name
+
+
+def get_excel_writer(engine: Optional[str] = None) -> ExcelWriter:
+    """
+    获取 Excel 写入引擎
+
+    Args:
+        engine: 引擎名称，None 表示使用配置 excel_writer_engine
+
+    Returns:
+        ExcelWriter: 写入引擎（未知名称时回退到 openpyxl 引擎）
+    """
+    engine = engine or settings.excel_writer_engine
+    writer_cls = EXCEL_WRITERS.get(engine)
+    if writer_cls is None:
+        logger.warning(f"未知的 Excel 写入引擎: {engine}，使用 {FALLBACK_EXCEL_WRITER}")
+        writer_cls = EXCEL_WRITERS[FALLBACK_EXCEL_WRITER]
+    return writer_cls()
+
+
+def write_workbook(
+    sheets: List[Tuple[str, TableIR]],
+    output_path: str,
+    style_name: str = OCR_SHEET_STYLE.name,
+    engine: Optional[str] = None
+) -> str:
+    """
+    使用配置的写入引擎生成 Excel，失败时回退到 openpyxl 引擎
+
+    参数均可跨进程传递（后台进程池直接调用本函数）
+
+    Args:
+        sheets: [(Sheet 名称, 表格中间表示)]
+        output_path: 输出文件路径
+        style_name: 样式方案名称（见 SHEET_STYLES）
+        engine: 引擎名称，None 表示使用配置 excel_writer_engine
+
+    Returns:
+        str: 实际使用的引擎名称
+    """
+    style = SHEET_STYLES[style_name]
+    writer = get_excel_writer(engine)
+    try:
+        writer.write(sheets, output_path, style)
+    except Exception as e:
+        if writer.name == FALLBACK_EXCEL_WRITER:
+            raise
+        logger.warning(f"Excel 写入引擎 {writer.name} 失败，回退到 {FALLBACK_EXCEL_WRITER}: {str(e)}")
+        writer = get_excel_writer(FALLBACK_EXCEL_WRITER)
+        writer.write(sheets, output_path, style)
+    return writer.name
@@ -2,15 +2,19 @@
 OCR 服务层
 封装 OCR 相关的业务逻辑
 """
+import asyncio
 from typing import Optional, Tuple
 from uuid import UUID
-import json
 from pathlib import Path
-import asyncio
 
 from app.clients.ocr_client import get_ocr_client
+from app.clients.ocr_status_mux import get_ocr_status_mux
 from app.services.task_service import TaskService
+from app.services.table_service import TableService
+from app.services.dedup_service import DedupService
 from app.models.task import TaskStatus
+from app.services.ocr_store import get_ocr_result_path, save_ocr_result
+from app.services.table_ir import extract_table_html_blocks
 from app.core.logging import logger
 from app.core.config import get_settings
 
@@ -28,8 +32,8 @@ class OCRService:
         流程：
         1. 获取任务信息
         2. 验证图片路径存在
-        3. 上传图片到 OCR 服务
-        4. 获取 job_id
+        3. 相同图片已有 OCR 结果（或正在识别）时直接复用
+        4. 上传图片到 OCR 服务，获取 job_id
         5. 更新任务的 ocr_job_id 和状态
         
         Args:
@@ -47,9 +51,30 @@ class OCRService:
         if not task.image_path:
             return False, "任务尚未上传图片"
         
+        # 3. 相同图片已有 OCR 结果时直接复用，不再调用 OCR 服务
+        reused_json_path = await DedupService.find_ocr_result(task.image_path)
+        if reused_json_path:
+            task.ocr_json_path = reused_json_path
+            task.ocr_job_id = None
+            task.status = TaskStatus.OCR_DONE
+            task.error_message = None
+            await task.save()
+            logger.info(f"复用相同图片的 OCR 结果: task_id={task_id}, json_path={reused_json_path}")
+            return True, f"复用已有 OCR 结果: {reused_json_path}"
+        
+        # 相同图片正在识别中时共用同一个 OCR job
+        inflight_job_id = await DedupService.find_inflight_job(task)
+        if inflight_job_id:
+            task.ocr_job_id = inflight_job_id
+            task.status = TaskStatus.OCR_PROCESSING
+            task.error_message = None
+            await task.save()
+            logger.info(f"共用相同图片处理中的 OCR job: task_id={task_id}, job_id={inflight_job_id}")
+            return True, f"共用处理中的 OCR 任务，job_id: {inflight_job_id}"
+        
         logger.info(f"开始 OCR 任务: task_id={task_id}, image_path={task.image_path}")
         
-        # 3. 上传图片到 OCR 服务
+        # 4. 上传图片到 OCR 服务
         ocr_client = get_ocr_client()
         success, job_id, error_msg = await ocr_client.create_job_from_file(task.image_path)
         
@@ -62,7 +87,7 @@ class OCRService:
             logger.error(f"{error_message}, task_id={task_id}")
             return False, error_message
         
-        # 4. 更新任务信息
+        # 5. 更新任务信息
         task.ocr_job_id = job_id
         task.status = TaskStatus.OCR_PROCESSING
         task.error_message = None  # 清除之前的错误信息
@@ -118,7 +143,7 @@ class OCRService:
         
         流程：
         1. 获取任务信息（包含 ocr_job_id）
-        2. 长轮询任务状态，直到完成或失败
+        2. 等待任务状态变为完成或失败（多个任务共享同一个轮询调度循环）
         3. 如果成功，获取 OCR JSON 结果
         4. 保存 JSON 到文件
         5. 更新任务状态为 ocr_done
@@ -135,68 +160,52 @@ class OCRService:
         if not task:
             return False, f"任务不存在: {task_id}"
         
+        # 已复用相同图片的 OCR 结果
+        if task.status == TaskStatus.OCR_DONE and task.ocr_json_path and Path(task.ocr_json_path).exists():
+            return True, f"OCR 结果已存在: {task.ocr_json_path}"
+        
         if not task.ocr_job_id:
             return False, "任务尚未创建 OCR job"
         
         job_id = task.ocr_job_id
         logger.info(f"开始轮询 OCR 任务: task_id={task_id}, job_id={job_id}")
         
-        # 2. 轮询任务状态
+        # 2. 等待任务结束（状态轮询由多路复用器统一调度）
         ocr_client = get_ocr_client()
-        since_seq = 0
-        start_time = asyncio.get_event_loop().time()
-        is_done = False
+        success, status_data, error_msg = await get_ocr_status_mux().wait_done(
+            job_id,
+            since_seq=0,
+            timeout=max_wait_seconds
+        )
+        
+        if not success:
+            error_message = f"获取 OCR 任务状态失败: {error_msg}"
+            task.status = TaskStatus.OCR_FAILED
+            task.error_message = error_message
+            await task.save()
+            logger.error(f"{error_message}: task_id={task_id}, job_id={job_id}")
+            return False, error_message
+        
+        # 检查超时
+        if not status_data.get('done', False):
+            error_msg = f"OCR 任务超时（{max_wait_seconds}秒）"
+            task.status = TaskStatus.OCR_FAILED
+            task.error_message = error_msg
+            await task.save()
+            logger.error(f"{error_msg}: task_id={task_id}, job_id={job_id}")
+            return False, error_msg
+        
+        # 解析事件
         is_success = False
         last_event_type = None
-        
-        while not is_done:
-            # 检查超时
-            elapsed = asyncio.get_event_loop().time() - start_time
-            if elapsed > max_wait_seconds:
-                error_msg = f"OCR 任务超时（{max_wait_seconds}秒）"
-                task.status = TaskStatus.OCR_FAILED
-                task.error_message = error_msg
-                await task.save()
-                logger.error(f"{error_msg}: task_id={task_id}, job_id={job_id}")
-                return False, error_msg
-            
-            # 长轮询获取状态
-            success, status_data, error_msg = await ocr_client.get_job_status(
-                job_id, 
-                since_seq=since_seq,
-                timeout_ms=25000
-            )
-            
-            if not success:
-                error_message = f"获取 OCR 任务状态失败: {error_msg}"
-                task.status = TaskStatus.OCR_FAILED
-                task.error_message = error_message
-                await task.save()
-                logger.error(f"{error_message}: task_id={task_id}, job_id={job_id}")
-                return False, error_message
-            
-            # 解析状态
-            is_done = status_data.get('done', False)
-            events = status_data.get('events', [])
-            last_seq = status_data.get('last_seq', since_seq)
-            
-            # 记录事件
-            for event in events:
-                event_type = event.get('type')
-                logger.info(f"OCR 任务事件: task_id={task_id}, job_id={job_id}, event={event_type}")
-                last_event_type = event_type
-                
-                if event_type == 'finished':
-                    is_success = True
-                elif event_type == 'failed':
-                    is_success = False
+        for event in status_data.get('events', []):
+            event_type = event.get('type')
+            last_event_type = event_type
             
-            # 更新序号，准备下次轮询
-            since_seq = last_seq
-            
-            # 如果未完成，短暂等待后继续（避免过于频繁）
-            if not is_done:
-                await asyncio.sleep(1)
+            if event_type == 'finished':
+                is_success = True
+            elif event_type == 'failed':
+                is_success = False
         
         # 3. 根据最终状态处理
         if not is_success:
@@ -220,12 +229,9 @@ class OCRService:
             logger.error(f"{error_message}: task_id={task_id}, job_id={job_id}")
             return False, error_message
         
-        # 5. 保存 JSON 到文件
-        ocr_json_dir = Path(settings.data_paths['ocr_json'])
-        ocr_json_dir.mkdir(parents=True, exist_ok=True)
-        
-        json_filename = f"{task_id}.json"
-        json_path = ocr_json_dir / json_filename
+        # 5. 保存 OCR 结果到文件（格式由配置 ocr_storage_format 决定）
+        json_path = get_ocr_result_path(task_id)
+        json_path.parent.mkdir(parents=True, exist_ok=True)
         
         # 转换为绝对路径
         json_path_abs = json_path.resolve()
@@ -241,9 +247,8 @@ class OCRService:
             logger.warning(f"清理转义字符时出错: {str(e)}")
         
         try:
-            with open(json_path_abs, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"OCR JSON 已保存: task_id={task_id}, path={json_path_abs}")
+            nbytes = await asyncio.to_thread(save_ocr_result, json_path_abs, json_data)
+            logger.info(f"OCR JSON 已保存: task_id={task_id}, path={json_path_abs}, bytes={nbytes}")
         except Exception as e:
             error_msg = f"保存 OCR JSON 失败: {str(e)}"
             task.status = TaskStatus.OCR_FAILED
@@ -252,6 +257,22 @@ class OCRService:
             logger.error(f"{error_msg}: task_id={task_id}")
             return False, error_msg
         
+        # 写入表格形状索引，供元数据接口快速返回（失败不影响主流程）
+        try:
+            await asyncio.to_thread(
+                TableService.write_shape_index,
+                str(json_path_abs),
+                extract_table_html_blocks(json_data)
+            )
+        except Exception as e:
+            logger.warning(f"写入表格形状索引失败: task_id={task_id}, error={str(e)}")
+        
+        # 登记图片的 OCR 结果，相同图片再次上传时直接复用（失败不影响主流程）
+        try:
+            await DedupService.record_ocr_result(task.image_path, str(json_path_abs))
+        except Exception as e:
+            logger.warning(f"登记图片 OCR 结果失败: task_id={task_id}, error={str(e)}")
+        
         # 6. 更新任务状态（保存绝对路径）
         task.ocr_json_path = str(json_path_abs)
         task.status = TaskStatus.OCR_DONE
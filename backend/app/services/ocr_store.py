@@ -0,0 +1,237 @@
+"""
+OCR 结果存储
+按配置 ocr_storage_format 选择存储格式：
+- json：data/ocr_json/{task_id}.json，紧凑 JSON
+- packed：data/ocr_json/{task_id}.ocrpack，每个表格块的 HTML 单独压缩，
+  文件头索引记录各表格块的位置；只需要表格时按偏移读取表格块，不解码整份结果
+
+packed 文件布局：
+    [magic "OCRP"][版本 1 字节][头部长度 4 字节][头部 JSON][表格块 ...][其余内容]
+头部 JSON：{"tables": [[页序号, 块序号, 偏移, 长度], ...], "doc": [偏移, 长度]}，
+偏移相对头部之后的数据区；其余内容为去掉表格 HTML 的完整 OCR 结果（压缩 JSON）
+
+两种格式的文件可以共存，读取时按扩展名识别
+"""
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+from uuid import UUID
+
+from app.services.table_ir import extract_table_html_blocks
+from app.utils.json_store import dumps, loads, read_json, write_bytes_atomic, write_json
+from app.utils.metrics import track_performance
+from app.core.config import get_settings
+
+settings = get_settings()
+
+PACKED_SUFFIX = '.ocrpack'
+PACKED_MAGIC = b'OCRP'
+PACKED_VERSION = 1
+
+# magic, 版本, 头部长度
+_PACKED_PREAMBLE = struct.Struct('<4sBI')
+
+PathLike = Union[str, Path]
+
+
+def _is_table_block(block: Dict[str, Any]) -> bool:
+    return block.get('block_label') == 'table' and bool(block.get('block_content'))
+
+
+def pack_ocr_result(ocr_data: Dict[str, Any]) -> bytes:
+    """
+    将 OCR 结果编码为 packed 格式
+
+    Args:
+        ocr_data: OCR JSON 数据
+
+    Returns:
+        bytes: packed 文件内容
+    """
+    level = settings.ocr_packed_compress_level
+    tables = []
+    blobs = []
+    offset = 0
+    pages = []
+
+    for page_idx, page in enumerate(ocr_data.get('pages', [])):
+        blocks = []
+        for block_idx, block in enumerate(page.get('parsing_res_list', [])):
+            if _is_table_block(block):
+                blob = zlib.compress(block['block_content'].encode('utf-8'), level)
+                tables.append([page_idx, block_idx, offset, len(blob)])
+                blobs.append(blob)
+                offset += len(blob)
+                # 保留键的位置，加载时原样填回
+                block = {**block, 'block_content': None}
+            blocks.append(block)
+        pages.append({**page, 'parsing_res_list': blocks})
+
+    doc = dict(ocr_data)
+    if 'pages' in ocr_data:
+        doc['pages'] = pages
+    doc_blob = zlib.compress(dumps(doc), level)
+
+    header = dumps({'tables': tables, 'doc': [offset, len(doc_blob)]})
+    return b''.join([
+        _PACKED_PREAMBLE.pack(PACKED_MAGIC, PACKED_VERSION, len(header)),
+        header,
+        *blobs,
+        doc_blob,
+    ])
+
+
+class PackedOCRResult:
+    """
+    packed 格式的 OCR 结果
+
+    打开时只读取头部索引，表格块与其余内容按需读取并解压
+    """
+
+    __slots__ = ('path', 'tables', 'doc', '_data_start')
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            magic, version, header_len = _PACKED_PREAMBLE.unpack(f.read(_PACKED_PREAMBLE.size))
+            if magic != PACKED_MAGIC or version != PACKED_VERSION:
+                raise ValueError(f"不是有效的 OCR 结果文件: {self.path}")
+            header = loads(f.read(header_len))
+        self.tables: List[List[int]] = header['tables']
+        self.doc: List[int] = header['doc']
+        self._data_start = _PACKED_PREAMBLE.size + header_len
+
+    def iter_table_html(self) -> Iterator[str]:
+        """按页面、块顺序读取所有表格块的 HTML（只解压表格块）"""
+        with open(self.path, 'rb') as f:
+            for _, _, offset, length in self.tables:
+                yield self._read_text(f, offset, length)
+
+    def load_pages_and_tables(self) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        读取页面（表格块不含 HTML）与所有表格块的 HTML
+
+        Returns:
+            (页面列表, 表格 HTML 列表)，表格顺序与 self.tables 一致
+        """
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_start + self.doc[0])
+            pages = loads(zlib.decompress(f.read(self.doc[1]))).get('pages', [])
+            html_contents = [self._read_text(f, offset, length) for _, _, offset, length in self.tables]
+        return pages, html_contents
+
+    def _read_text(self, f, offset: int, length: int) -> str:
+        f.seek(self._data_start + offset)
+        return zlib.decompress(f.read(length)).decode('utf-8')
+
+
+def is_packed(path: PathLike) -> bool:
+    """是否为 packed 格式的 OCR 结果文件"""
+    return Path(path).suffix == PACKED_SUFFIX
+
+
+def get_ocr_result_path(task_id: UUID) -> Path:
+    """
+    获取新保存的 OCR 结果路径（按配置 ocr_storage_format 决定扩展名）
+
+    存储规则：data/ocr_json/{task_id}.json 或 data/ocr_json/{task_id}.ocrpack
+    """
+    suffix = PACKED_SUFFIX if settings.ocr_storage_format == 'packed' else '.json'
+    return Path(settings.data_paths['ocr_json']) / f"{task_id}{suffix}"
+
+
+def save_ocr_result(path: PathLike, ocr_data: Dict[str, Any]) -> int:
+    """
+    保存 OCR 结果（格式由扩展名决定，临时文件 + 原子替换）
+
+    Returns:
+        int: 写入的字节数
+    """
+    with track_performance("ocr_json_write") as span:
+        if not is_packed(path):
+            span['bytes'] = write_json(path, ocr_data)
+            return span['bytes']
+
+        span['bytes'] = write_bytes_atomic(path, pack_ocr_result(ocr_data))
+        return span['bytes']
+
+
+def load_table_html_blocks(path: PathLike) -> List[str]:
+    """
+    读取 OCR 结果中所有表格块的 HTML 内容（按页面、块顺序）
+
+    packed 格式只读取并解压表格块，json 格式解码整份文件后提取
+    """
+    if is_packed(path):
+        return [
+            html_content.replace('\\"', '"')
+            for html_content in PackedOCRResult(path).iter_table_html()
+        ]
+    return extract_table_html_blocks(read_json(path))
+
+
+class TableBlock(NamedTuple):
+    """表格块及其版面位置（用于跨页 / 跨块拼接）"""
+    html: str
+    page_idx: int
+    bbox: Optional[Tuple[float, float, float, float]]  # (x0, y0, x1, y1)，像素坐标
+    page_height: Optional[float]
+
+
+def _block_bbox(block: Dict[str, Any]) -> Optional[Tuple[float, float, float, float]]:
+    bbox = block.get('block_bbox')
+    if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
+        try:
+            return tuple(float(value) for value in bbox)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _page_height(page: Dict[str, Any]) -> Optional[float]:
+    """
+    页面高度（与 bbox 同一坐标系）
+
+    部分结果的 width / height 与 bbox 坐标系不一致（如旋转过的图片），
+    记录的高度小于块的下边界时改用宽度，仍不够时使用最大的下边界
+    """
+    bottoms = [bbox[3] for bbox in map(_block_bbox, page.get('parsing_res_list', [])) if bbox is not None]
+    bottom = max(bottoms, default=0.0)
+    for key in ('height', 'width'):
+        value = page.get(key)
+        if isinstance(value, (int, float)) and value >= bottom:
+            return float(value)
+    return bottom or None
+
+
+def load_table_blocks(path: PathLike) -> Tuple[List[TableBlock], int]:
+    """
+    读取 OCR 结果中所有表格块的 HTML 及其页码、bbox、页面高度（按页面、块顺序）
+
+    Returns:
+        (表格块列表, 页面数量)
+    """
+    blocks = []
+    if is_packed(path):
+        packed = PackedOCRResult(path)
+        pages, html_contents = packed.load_pages_and_tables()
+        for (page_idx, block_idx, _, _), html_content in zip(packed.tables, html_contents):
+            page = pages[page_idx]
+            blocks.append(TableBlock(
+                html_content.replace('\\"', '"'),
+                page_idx,
+                _block_bbox(page['parsing_res_list'][block_idx]),
+                _page_height(page)
+            ))
+        return blocks, len(pages)
+
+    pages = read_json(path).get('pages', [])
+    for page_idx, page in enumerate(pages):
+        page_height = _page_height(page)
+        for block in page.get('parsing_res_list', []):
+            if _is_table_block(block):
+                blocks.append(TableBlock(
+                    block['block_content'].replace('\\"', '"'), page_idx, _block_bbox(block), page_height
+                ))
+    return blocks, len(pages)
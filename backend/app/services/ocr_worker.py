@@ -0,0 +1,233 @@
+"""
+后台 OCR 任务池
+在进程内用固定数量的 asyncio worker 驱动 OCR 全流程（创建 → 轮询 → 获取 JSON → 可选生成 Excel），
+队列状态持久化在 Task 表中（ocr_queued / ocr_processing），进程重启后自动恢复
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.services.task_service import TaskService
+from app.services.ocr_service import OCRService
+from app.services.excel_service import ExcelService
+from app.models.task import TaskStatus
+from app.core.logging import logger
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# 允许提交到后台队列的任务状态
+SUBMITTABLE_STATUSES = (
+    TaskStatus.UPLOADED,
+    TaskStatus.OCR_QUEUED,
+    TaskStatus.OCR_PROCESSING,
+    TaskStatus.OCR_FAILED,
+)
+
+
+class OCRWorkerPool:
+    """OCR 后台任务池"""
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(concurrency, 1)
+        self._queue: "asyncio.Queue[Tuple[UUID, bool]]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._active: Dict[str, asyncio.Event] = {}  # task_id -> 完成事件
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        """启动 worker 并恢复未完成的任务"""
+        if self.running:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(idx), name=f"ocr-worker-{idx}")
+            for idx in range(self.concurrency)
+        ]
+        logger.info(f"OCR 后台任务池已启动: concurrency={self.concurrency}")
+        await self.recover()
+
+    async def stop(self):
+        """停止所有 worker（未完成的任务保留在 Task 表中，下次启动时恢复）"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for event in self._active.values():
+            event.set()
+        self._active.clear()
+        logger.info("OCR 后台任务池已停止")
+
+    async def recover(self) -> int:
+        """
+        从 Task 表恢复排队中 / 处理中的任务
+
+        Returns:
+            int: 恢复的任务数
+        """
+        task_ids = await TaskService.get_task_ids_by_status(
+            [TaskStatus.OCR_QUEUED, TaskStatus.OCR_PROCESSING]
+        )
+        for task_id in task_ids:
+            self._enqueue(task_id, settings.ocr_worker_auto_excel)
+        if task_ids:
+            logger.info(f"从任务表恢复 OCR 任务: {len(task_ids)} 个")
+        return len(task_ids)
+
+    async def submit(self, task_id: UUID, generate_excel: Optional[bool] = None) -> Tuple[bool, str]:
+        """
+        提交任务到后台队列（立即返回）
+
+        Args:
+            task_id: 任务 ID
+            generate_excel: OCR 完成后是否生成 Excel，None 表示使用配置默认值
+
+        Returns:
+            tuple: (是否成功, 消息)
+        """
+        if generate_excel is None:
+            generate_excel = settings.ocr_worker_auto_excel
+
+        task = await TaskService.get_task(task_id)
+        if not task:
+            return False, f"任务不存在: {task_id}"
+
+        if not task.image_path:
+            return False, "任务尚未上传图片"
+
+        if self.is_active(task_id):
+            return True, "任务已在 OCR 队列中"
+
+        if task.status not in SUBMITTABLE_STATUSES:
+            return False, f"任务状态错误: {task.status}，无法提交 OCR"
+
+        # 持久化排队状态（处理中的任务保持原状态，由 worker 继续轮询）
+        if task.status != TaskStatus.OCR_PROCESSING:
+            task.status = TaskStatus.OCR_QUEUED
+            task.error_message = None
+            await task.save()
+
+        self._enqueue(task_id, generate_excel)
+        logger.info(f"OCR 任务已提交到后台队列: task_id={task_id}, queue_size={self._queue.qsize()}")
+        return True, "OCR 任务已提交，正在后台处理"
+
+    def submit_queued(self, task_ids: List[UUID], generate_excel: Optional[bool] = None) -> int:
+        """
+        批量提交已持久化为 ocr_queued 的任务（批量上传时使用，不再逐个查询 / 更新任务表）
+
+        并发仍由 worker 数量控制，任务按提交顺序处理
+
+        Args:
+            task_ids: 任务 ID 列表（状态已为 ocr_queued，且已绑定图片）
+            generate_excel: OCR 完成后是否生成 Excel，None 表示使用配置默认值
+
+        Returns:
+            int: 新进入队列的任务数
+        """
+        if generate_excel is None:
+            generate_excel = settings.ocr_worker_auto_excel
+
+        submitted = 0
+        for task_id in task_ids:
+            if not self.is_active(task_id):
+                self._enqueue(task_id, generate_excel)
+                submitted += 1
+        logger.info(f"批量提交 OCR 任务: {submitted} 个, queue_size={self._queue.qsize()}")
+        return submitted
+
+    def is_active(self, task_id: UUID) -> bool:
+        """任务是否正在队列中或处理中"""
+        return str(task_id) in self._active
+
+    async def wait(self, task_id: UUID, timeout: Optional[float] = None) -> bool:
+        """
+        等待任务处理结束
+
+        Returns:
+            bool: 是否在超时前结束
+        """
+        event = self._active.get(str(task_id))
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        """获取任务池统计信息"""
+        return {
+            "concurrency": self.concurrency,
+            "queued": self._queue.qsize(),
+            "active": len(self._active),
+        }
+
+    def _enqueue(self, task_id: UUID, generate_excel: bool):
+        key = str(task_id)
+        if key in self._active:
+            return
+        self._active[key] = asyncio.Event()
+        self._queue.put_nowait((task_id, generate_excel))
+
+    async def _worker(self, idx: int):
+        while True:
+            task_id, generate_excel = await self._queue.get()
+            try:
+                await self._process(task_id, generate_excel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error_msg = f"后台 OCR 处理异常: {str(e)}"
+                logger.error(f"{error_msg}: task_id={task_id}", exc_info=True)
+                await TaskService.update_task_status(task_id, TaskStatus.OCR_FAILED, error_msg)
+            finally:
+                event = self._active.pop(str(task_id), None)
+                if event is not None:
+                    event.set()
+                self._queue.task_done()
+
+    async def _process(self, task_id: UUID, generate_excel: bool):
+        task = await TaskService.get_task(task_id)
+        if not task:
+            logger.warning(f"后台 OCR 任务已不存在: task_id={task_id}")
+            return
+
+        # 1. 创建 OCR job（已在处理中的任务直接恢复轮询）
+        if task.status != TaskStatus.OCR_PROCESSING or not task.ocr_job_id:
+            success, message = await OCRService.start_ocr_job(task_id)
+            if not success:
+                logger.error(f"后台 OCR 任务创建失败: task_id={task_id}, error={message}")
+                return
+
+        # 2. 轮询状态并获取 JSON
+        success, message = await OCRService.poll_and_fetch_result(
+            task_id,
+            max_wait_seconds=settings.ocr_max_wait_seconds
+        )
+        if not success:
+            logger.error(f"后台 OCR 任务失败: task_id={task_id}, error={message}")
+            return
+
+        # 3. 可选生成 Excel
+        if generate_excel:
+            success, message, _ = await ExcelService.generate_excel_from_ocr(task_id)
+            if not success:
+                logger.error(f"后台生成 Excel 失败: task_id={task_id}, error={message}")
+                return
+
+        logger.info(f"后台 OCR 任务完成: task_id={task_id}, generate_excel={generate_excel}")
+
+
+# 单例
+_ocr_worker_pool = None
+
+
+def get_ocr_worker_pool() -> OCRWorkerPool:
+    """获取 OCR 后台任务池单例"""
+    global _ocr_worker_pool
+    if _ocr_worker_pool is None:
+        _ocr_worker_pool = OCRWorkerPool(settings.ocr_worker_concurrency)
+    return _ocr_worker_pool
@@ -0,0 +1,211 @@
+"""
+表格解析结果缓存
+按 task_id + OCR JSON 指纹（mtime/size）缓存已解析的表格，
+重复读取同一任务时跳过 JSON 解码与 HTML 解析
+"""
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.services.table_ir import TableIR
+from app.utils.json_store import read_json, write_json
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 展开后每个位置的估算内存占用（字节）：锚点单元格为独立 dict，空单元格共享常量
+CELL_OBJECT_BYTES = 128
+
+Fingerprint = Tuple[int, int]
+
+
+class CachedTables:
+    """单个任务的缓存条目"""
+
+    __slots__ = ('fingerprint', 'irs', 'sheets', 'nbytes')
+
+    def __init__(self, fingerprint: Fingerprint, irs: List[TableIR], sheets: Optional[list] = None):
+        self.fingerprint = fingerprint
+        self.irs = irs
+        self.sheets = sheets
+        self.nbytes = sum(ir.nbytes for ir in irs)
+        if sheets is not None:
+            self.nbytes += self.sheets_nbytes(irs)
+
+    @staticmethod
+    def sheets_nbytes(irs: List[TableIR]) -> int:
+        """展开后的单元格对象的估算内存占用"""
+        return sum(ir.n_rows * ir.n_cols for ir in irs) * CELL_OBJECT_BYTES
+
+
+class TableCache:
+    """
+    LRU 表格缓存
+
+    - 内存中按估算字节数控制容量，超出预算时淘汰最久未使用的条目
+    - 可选将中间表示落盘到 data/table_cache/{task_id}.json，进程重启后仍可命中
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[Path] = None):
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self._entries: "OrderedDict[str, CachedTables]" = OrderedDict()
+        self._total_bytes = 0
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def fingerprint(path: str) -> Optional[Fingerprint]:
+        """
+        计算文件指纹（修改时间 + 大小）
+
+        Returns:
+            (mtime_ns, size)，文件不存在时返回 None
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, task_id: UUID, fingerprint: Fingerprint) -> Optional[CachedTables]:
+        """
+        获取内存中的缓存条目（指纹不一致视为失效）
+        """
+        key = str(task_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.fingerprint == fingerprint:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            self._remove(key)
+        return None
+
+    def load_spilled(self, task_id: UUID, fingerprint: Fingerprint) -> Optional[List[TableIR]]:
+        """
+        从磁盘读取落盘的中间表示（指纹不一致时返回 None）
+        """
+        spill_path = self._spill_path(task_id)
+        if spill_path is None or not spill_path.exists():
+            self._misses += 1
+            return None
+
+        try:
+            data = read_json(spill_path)
+            if tuple(data.get('fingerprint', ())) != tuple(fingerprint):
+                self._misses += 1
+                return None
+            irs = [TableIR.from_dict(item) for item in data.get('tables', [])]
+        except Exception as e:
+            logger.warning(f"读取表格缓存文件失败: {spill_path}, error={e}")
+            self._misses += 1
+            return None
+
+        self._disk_hits += 1
+        return irs
+
+    def put(self, task_id: UUID, entry: CachedTables, spill: bool = True) -> CachedTables:
+        """
+        写入缓存条目，必要时淘汰旧条目并落盘
+        """
+        key = str(task_id)
+        self._remove(key)
+
+        if entry.nbytes <= self.max_bytes:
+            self._entries[key] = entry
+            self._total_bytes += entry.nbytes
+            while self._total_bytes > self.max_bytes and self._entries:
+                evicted_key, _ = next(iter(self._entries.items()))
+                self._remove(evicted_key)
+                logger.info(f"表格缓存淘汰: task_id={evicted_key}")
+        else:
+            logger.info(f"表格缓存条目超出内存预算，仅落盘: task_id={key}, bytes={entry.nbytes}")
+
+        if spill:
+            self.spill(task_id, entry)
+
+        return entry
+
+    def attach_sheets(self, task_id: UUID, entry: CachedTables, sheets: list):
+        """
+        为缓存条目补充展开后的单元格数据（只在需要完整数据时构建）
+
+        补充后超出内存预算的条目不保留单元格数据，只缓存中间表示
+        """
+        key = str(task_id)
+        if entry.sheets is not None or self._entries.get(key) is not entry:
+            return
+
+        added = entry.sheets_nbytes(entry.irs)
+        if entry.nbytes + added > self.max_bytes:
+            return
+
+        entry.sheets = sheets
+        entry.nbytes += added
+        self._total_bytes += added
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            evicted_key, _ = next(iter(self._entries.items()))
+            self._remove(evicted_key)
+            logger.info(f"表格缓存淘汰: task_id={evicted_key}")
+
+    def invalidate(self, task_id: UUID):
+        """使指定任务的缓存失效（内存与磁盘）"""
+        self._remove(str(task_id))
+        spill_path = self._spill_path(task_id)
+        if spill_path is not None and spill_path.exists():
+            spill_path.unlink()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            'entries': len(self._entries),
+            'total_bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self._hits,
+            'disk_hits': self._disk_hits,
+            'misses': self._misses,
+        }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.nbytes
+
+    def _spill_path(self, task_id: UUID) -> Optional[Path]:
+        if self.spill_dir is None:
+            return None
+        return self.spill_dir / f"{task_id}.json"
+
+    def spill(self, task_id: UUID, entry: CachedTables):
+        """将缓存条目的中间表示落盘（失败只记录日志）"""
+        spill_path = self._spill_path(task_id)
+        if spill_path is None:
+            return
+
+        try:
+            spill_path.parent.mkdir(parents=True, exist_ok=True)
+            write_json(spill_path, {
+                'fingerprint': list(entry.fingerprint),
+                'tables': [ir.to_dict() for ir in entry.irs],
+            })
+        except Exception as e:
+            logger.warning(f"表格缓存落盘失败: task_id={task_id}, error={e}")
+
+
+# 单例
+_table_cache = None
+
+
+def get_table_cache() -> TableCache:
+    """获取表格缓存单例"""
+    global _table_cache
+    if _table_cache is None:
+        spill_dir = settings.data_paths['table_cache'] if settings.table_cache_spill_to_disk else None
+        _table_cache = TableCache(settings.table_cache_max_bytes, spill_dir)
+    return _table_cache
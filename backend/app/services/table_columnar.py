@@ -0,0 +1,186 @@
+"""
+表格数据列式编码
+表格接口的可选响应格式，通过 Accept 头协商：
+- application/x-table-columnar+json：列式 JSON
+- application/x-table-columnar+msgpack：列式 msgpack（需安装 msgpack，未安装时回退为列式 JSON）
+
+每个 Sheet（或窗口）编码为三部分，代替逐单元格的 CellData 对象：
+- texts：按行展开的文本数组，长度为 窗口行数 × 窗口列数；
+  单元格文本只出现在它在窗口内的左上角位置（完整 Sheet 即锚点位置），其余位置为空字符串
+- merges：合并单元格稀疏列表 [[行, 列, rowspan, colspan], ...]，坐标为锚点在整张 Sheet 中的位置，
+  只包含与窗口相交的合并单元格
+- headers：表头位图，第 i 个位置对应 texts[i]，按字节从低位到高位排列；
+  JSON 中为 base64 字符串，msgpack 中为二进制
+"""
+import base64
+from typing import Any, Dict, List, Optional
+
+from fastapi.responses import Response
+
+from app.services.table_ir import TableIR
+from app.utils.responses import json_response
+
+try:
+    import msgpack
+except ImportError:  # msgpack 为可选依赖
+    msgpack = None
+
+
+COLUMNAR_JSON_MEDIA_TYPE = 'application/x-table-columnar+json'
+COLUMNAR_MSGPACK_MEDIA_TYPE = 'application/x-table-columnar+msgpack'
+
+
+def _parse_accept(accept: str) -> List[str]:
+    """解析 Accept 头，按 q 值从高到低返回媒体类型（q 值相同时保持原顺序）"""
+    ranges = []
+    for index, item in enumerate(accept.split(',')):
+        parts = [part.strip() for part in item.split(';')]
+        media_type = parts[0].lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            ranges.append((-quality, index, media_type))
+    return [media_type for _, _, media_type in sorted(ranges)]
+
+
+def negotiate_table_format(accept: Optional[str]) -> Optional[str]:
+    """
+    根据 Accept 头选择表格响应格式
+
+    Returns:
+        列式格式的媒体类型，使用默认 JSON（CellData）时返回 None
+    """
+    if not accept:
+        return None
+
+    for media_type in _parse_accept(accept):
+        if media_type == COLUMNAR_JSON_MEDIA_TYPE:
+            return COLUMNAR_JSON_MEDIA_TYPE
+        if media_type == COLUMNAR_MSGPACK_MEDIA_TYPE:
+            # 未安装 msgpack 时回退为列式 JSON
+            return COLUMNAR_MSGPACK_MEDIA_TYPE if msgpack is not None else COLUMNAR_JSON_MEDIA_TYPE
+        if media_type in ('application/json', 'application/*', '*/*'):
+            return None
+    return None
+
+
+def encode_columnar_window(
+    ir: TableIR,
+    row_start: int,
+    row_end: int,
+    col_start: int,
+    col_end: int,
+    binary: bool = False
+) -> Dict[str, Any]:
+    """
+    将表格中间表示的窗口 [row_start, row_end) × [col_start, col_end) 编码为列式结构
+
+    Args:
+        ir: 表格中间表示
+        row_start / row_end: 行范围（左闭右开，超出表格的部分被截断）
+        col_start / col_end: 列范围（左闭右开，超出表格的部分被截断）
+        binary: 表头位图是否保留为 bytes（msgpack），否则编码为 base64 字符串
+
+    Returns:
+        {"texts": [...], "merges": [[行, 列, rowspan, colspan], ...], "headers": 位图}
+    """
+    row_end = min(row_end, ir.n_rows)
+    col_end = min(col_end, ir.n_cols)
+    height = max(row_end - row_start, 0)
+    width = max(col_end - col_start, 0)
+
+    grid = ir.grid
+    n_cols = ir.n_cols
+    cell_texts = ir.texts
+    cell_headers = ir.headers
+    rowspans = ir.rowspans
+    colspans = ir.colspans
+
+    texts = [''] * (height * width)
+    headers = bytearray((height * width + 7) // 8)
+    merges = []
+    seen = set()
+
+    pos = 0
+    for row_idx in range(row_start, row_end):
+        base = row_idx * n_cols
+        for col_idx in range(col_start, col_end):
+            cell_id = grid[base + col_idx]
+            if cell_id != -1:
+                # 按行扫描时第一次遇到的位置即单元格在窗口内的左上角
+                if cell_id not in seen:
+                    seen.add(cell_id)
+                    texts[pos] = cell_texts[cell_id]
+                    if rowspans[cell_id] > 1 or colspans[cell_id] > 1:
+                        merges.append([
+                            ir.anchor_rows[cell_id],
+                            ir.anchor_cols[cell_id],
+                            rowspans[cell_id],
+                            colspans[cell_id],
+                        ])
+                if cell_headers[cell_id]:
+                    headers[pos >> 3] |= 1 << (pos & 7)
+            pos += 1
+
+    return {
+        'texts': texts,
+        'merges': merges,
+        'headers': bytes(headers) if binary else base64.b64encode(headers).decode('ascii'),
+    }
+
+
+def encode_columnar_sheet(
+    sheet_id: int,
+    sheet_name: str,
+    ir: TableIR,
+    row_offset: int = 0,
+    row_limit: Optional[int] = None,
+    col_offset: int = 0,
+    col_limit: Optional[int] = None,
+    binary: bool = False
+) -> Dict[str, Any]:
+    """
+    编码单个 Sheet（或其窗口），字段与 TableSheet / TableWindow 对应
+
+    rows / cols 为 Sheet 总行列数，window_rows / window_cols 为 texts 对应的窗口大小
+    """
+    row_end = ir.n_rows if row_limit is None else min(row_offset + row_limit, ir.n_rows)
+    col_end = ir.n_cols if col_limit is None else min(col_offset + col_limit, ir.n_cols)
+    return {
+        'sheet_id': sheet_id,
+        'sheet_name': sheet_name,
+        'rows': ir.n_rows,
+        'cols': ir.n_cols,
+        'row_offset': row_offset,
+        'col_offset': col_offset,
+        'window_rows': max(row_end - row_offset, 0),
+        'window_cols': max(col_end - col_offset, 0),
+        **encode_columnar_window(ir, row_offset, row_end, col_offset, col_end, binary),
+    }
+
+
+def columnar_response(media_type: str, message: str, data: Dict[str, Any]) -> Response:
+    """
+    构建列式格式响应（外层结构与 ResponseModel 一致）
+
+    Args:
+        media_type: negotiate_table_format 返回的媒体类型
+        message: 响应消息
+        data: 列式数据
+    """
+    if media_type != COLUMNAR_MSGPACK_MEDIA_TYPE:
+        return json_response(message, data, media_type, headers={'Vary': 'Accept'})
+
+    body = {'success': True, 'message': message, 'data': data}
+    return Response(
+        content=msgpack.packb(body, use_bin_type=True),
+        media_type=media_type,
+        headers={'Vary': 'Accept'}
+    )
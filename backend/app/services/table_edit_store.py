@@ -0,0 +1,276 @@
+"""
+编辑后表格状态存储
+每个任务的编辑结果保存为快照 + 增量日志：
+- 快照：data/edited/{task_id}_edited.json，整表保存或日志过长时重写
+- 增量日志：data/edited/{task_id}_edited.log，每次增量保存追加一行，写入量与修改量成正比
+
+状态带版本号，增量保存时客户端提交 base_version，与当前版本不一致时拒绝（乐观并发）
+
+旧版本的快照是整表保存的 TableDataResponse（没有版本号与指纹），读取时迁移为版本 1 的编辑状态
+"""
+import asyncio
+import logging
+import os
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.services.table_ir import TableIR, apply_text_edits
+from app.services.table_cache import Fingerprint
+from app.utils.json_store import dumps, loads, read_json, write_json
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 单条单元格修改：(Sheet 序号(从 0 开始), 行, 列, 新文本)
+CellEdit = Tuple[int, int, int, str]
+
+
+class TableVersionConflictError(RuntimeError):
+    """增量保存的 base_version 与服务端当前版本不一致"""
+
+    def __init__(self, current_version: int, base_version: int):
+        super().__init__(f"表格数据已被修改（当前版本 {current_version}，提交版本 {base_version}），请刷新后重试")
+        self.current_version = current_version
+        self.base_version = base_version
+
+
+class EditedTables:
+    """单个任务的编辑状态"""
+
+    __slots__ = ('version', 'fingerprint', 'names', 'irs', 'journal_length', 'persisted')
+
+    def __init__(
+        self,
+        version: int,
+        fingerprint: Optional[Fingerprint],
+        names: List[str],
+        irs: List[TableIR],
+        journal_length: int = 0
+    ):
+        self.version = version
+        self.fingerprint = fingerprint  # 编辑所基于的 OCR 结果指纹，OCR 结果变化后状态失效
+        self.names = names
+        self.irs = irs
+        self.journal_length = journal_length  # 快照之后追加的日志行数
+        self.persisted = False  # 是否已有对应的快照（没有快照时增量日志无法重放）
+
+    @property
+    def sheets(self) -> List[Tuple[str, TableIR]]:
+        return list(zip(self.names, self.irs))
+
+    def apply(self, edits: List[CellEdit]) -> List[int]:
+        """
+        应用单元格修改（只替换受影响 Sheet 的中间表示）
+
+        Returns:
+            受影响的 Sheet 序号列表
+
+        Raises:
+            ValueError: Sheet 不存在、位置越界或位于合并区域内
+        """
+        by_sheet: Dict[int, List[Tuple[int, int, str]]] = {}
+        for sheet_idx, row, col, text in edits:
+            if not 0 <= sheet_idx < len(self.irs):
+                raise ValueError(f"Sheet 不存在: {sheet_idx + 1}")
+            by_sheet.setdefault(sheet_idx, []).append((row, col, text))
+
+        # 先全部校验、构建，再统一替换，失败时状态不变
+        updated = {
+            sheet_idx: apply_text_edits(self.irs[sheet_idx], sheet_edits)
+            for sheet_idx, sheet_edits in by_sheet.items()
+        }
+        for sheet_idx, ir in updated.items():
+            self.irs[sheet_idx] = ir
+        return sorted(updated)
+
+
+class TableEditStore:
+    """
+    编辑状态存储
+
+    - 内存中保留最近使用的 max_entries 个任务的状态（只在事件循环中访问）
+    - 磁盘读写方法不访问内存状态，可在线程中执行
+    - 同一任务的修改通过 lock(task_id) 串行执行
+    """
+
+    def __init__(self, base_dir: Path, max_entries: int, compact_every: int):
+        self.base_dir = Path(base_dir)
+        self.max_entries = max(max_entries, 1)
+        self.compact_every = max(compact_every, 1)
+        self._entries: "OrderedDict[str, EditedTables]" = OrderedDict()
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def lock(self, task_id: UUID) -> asyncio.Lock:
+        """获取任务的编辑锁"""
+        key = str(task_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def get(self, task_id: UUID, fingerprint: Optional[Fingerprint]) -> Optional[EditedTables]:
+        """获取内存中的状态（OCR 结果指纹不一致视为不存在）"""
+        key = str(task_id)
+        state = self._entries.get(key)
+        if state is None or state.fingerprint != fingerprint:
+            return None
+        self._entries.move_to_end(key)
+        return state
+
+    def put(self, task_id: UUID, state: EditedTables):
+        """写入内存状态，超出容量时淘汰最久未使用的任务"""
+        key = str(task_id)
+        self._entries[key] = state
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, task_id: UUID):
+        """丢弃内存状态（下次从磁盘重新读取）"""
+        self._entries.pop(str(task_id), None)
+
+    def read(self, task_id: UUID, fingerprint: Optional[Fingerprint]) -> Optional[EditedTables]:
+        """
+        从磁盘读取编辑状态（快照 + 日志重放）
+
+        Returns:
+            编辑状态，不存在或已失效时返回 None
+        """
+        snapshot_path, journal_path = self._paths(task_id)
+        if not snapshot_path.exists():
+            return None
+
+        try:
+            data = read_json(snapshot_path)
+        except Exception as e:
+            logger.warning(f"读取编辑快照失败: {snapshot_path}, error={e}")
+            return None
+
+        # 旧版本保存的是完整的 TableDataResponse，没有版本与指纹信息：按当前 OCR 结果迁移
+        if 'version' not in data:
+            return self._migrate_legacy(task_id, data, fingerprint)
+        if tuple(data.get('fingerprint') or ()) != tuple(fingerprint or ()):
+            return None
+
+        state = EditedTables(
+            version=data['version'],
+            fingerprint=fingerprint,
+            names=[sheet['sheet_name'] for sheet in data['sheets']],
+            irs=[TableIR.from_dict(sheet['table']) for sheet in data['sheets']],
+        )
+        state.persisted = True
+
+        if journal_path.exists():
+            with open(journal_path, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = loads(line)
+                    if entry['version'] <= state.version:
+                        continue
+                    state.apply([tuple(edit) for edit in entry['edits']])
+                    state.version = entry['version']
+                    state.journal_length += 1
+
+        return state
+
+    def has_legacy_snapshot(self, task_id: UUID) -> bool:
+        """是否存在尚未迁移的旧版快照（无法读取时也视为存在，避免误删旧数据）"""
+        snapshot_path, _ = self._paths(task_id)
+        if not snapshot_path.exists():
+            return False
+        try:
+            return 'version' not in read_json(snapshot_path)
+        except Exception:
+            return True
+
+    def _migrate_legacy(
+        self,
+        task_id: UUID,
+        data: Dict,
+        fingerprint: Optional[Fingerprint]
+    ) -> Optional[EditedTables]:
+        """
+        将旧版快照（TableDataResponse）迁移为版本 1 的编辑状态，并重写为新格式快照
+
+        旧版快照没有指纹，视为基于当前的 OCR 结果；迁移失败时保留原文件，返回 None
+        """
+        from app.schemas.table import TableDataResponse
+        from app.services.table_service import TableService
+
+        try:
+            table_data = TableDataResponse.model_validate(data)
+            state = EditedTables(
+                version=1,
+                fingerprint=fingerprint,
+                names=[sheet.sheet_name for sheet in table_data.sheets],
+                irs=[TableService.cells_to_ir(sheet.data) for sheet in table_data.sheets],
+            )
+            self.write_snapshot(task_id, state)
+        except Exception as e:
+            logger.warning(f"迁移旧版编辑数据失败: task_id={task_id}, error={e}")
+            return None
+
+        logger.info(f"已迁移旧版编辑数据: task_id={task_id}, sheets={len(state.irs)}")
+        return state
+
+    def write_snapshot(self, task_id: UUID, state: EditedTables):
+        """写入完整快照并清空增量日志"""
+        snapshot_path, journal_path = self._paths(task_id)
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        write_json(snapshot_path, {
+            'version': state.version,
+            'fingerprint': list(state.fingerprint) if state.fingerprint else None,
+            'sheets': [
+                {'sheet_name': name, 'table': ir.to_dict()}
+                for name, ir in zip(state.names, state.irs)
+            ],
+        })
+        if journal_path.exists():
+            journal_path.unlink()
+        state.journal_length = 0
+        state.persisted = True
+
+    def append(self, task_id: UUID, state: EditedTables, edits: List[CellEdit]):
+        """
+        追加一次增量修改（state 已应用修改并更新版本号）
+
+        还没有快照或日志达到 compact_every 行时改为重写快照
+        """
+        if not state.persisted or state.journal_length + 1 >= self.compact_every:
+            self.write_snapshot(task_id, state)
+            return
+
+        _, journal_path = self._paths(task_id)
+        with open(journal_path, 'ab') as f:
+            f.write(dumps({'version': state.version, 'edits': edits}) + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        state.journal_length += 1
+
+    def _paths(self, task_id: UUID) -> Tuple[Path, Path]:
+        return (
+            self.base_dir / f"{task_id}_edited.json",
+            self.base_dir / f"{task_id}_edited.log",
+        )
+
+
+# 单例
+_table_edit_store = None
+
+
+def get_table_edit_store() -> TableEditStore:
+    """获取编辑状态存储单例"""
+    global _table_edit_store
+    if _table_edit_store is None:
+        _table_edit_store = TableEditStore(
+            Path(settings.data_dir) / "edited",
+            settings.table_edit_cache_entries,
+            settings.table_edit_compact_every
+        )
+    return _table_edit_store
@@ -0,0 +1,847 @@
+"""
+表格中间表示（Table IR）
+OCR 返回的 HTML 表格只解析一次，展开为紧凑的数组结构，
+供 TableService（前端预览/编辑）与 ExcelService（Excel 生成）共同读取
+"""
+import html
+import re
+import sys
+from array import array
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.metrics import track_performance
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# 进程内缓存的已解析表格数量上限
+IR_CACHE_SIZE = 512
+
+# 专用扫描器的标签与属性匹配（属性须整体匹配，否则回退到 HTMLTableParser）
+_TAG_RE = re.compile(r'<(/?)([A-Za-z][^\s/<>]*)([^<>]*)>')
+# 不含内嵌标签的单元格整体匹配（最常见的形式），其余按单个标签匹配
+_TOKEN_RE = re.compile(r'<(t[dh])((?:\s[^<>]*)?)>([^<]*)</t[dh]>|' + _TAG_RE.pattern)
+_TAG_SPLIT_RE = re.compile(r'<[^<>]*>')
+_ATTR_RE = re.compile(r'\s+([^\s"\'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'=<>`]+)))?')
+_ATTRS_RE = re.compile(r'(?:\s+[^\s"\'<>/=]+(?:\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s"\'=<>`]+))?)*\s*')
+_SIMPLE_SPANS_RE = re.compile(r' (rowspan|colspan)="(\d+)"(?: (rowspan|colspan)="(\d+)")?')
+# 表格结构标签；HTMLParser 按原始文本处理内容的标签（扫描器不支持）
+_STRUCTURE_TAGS = frozenset(('table', 'tr', 'td', 'th'))
+_RAWTEXT_TAGS = frozenset(('script', 'style'))
+
+
+class HTMLTableParser(HTMLParser):
+    """HTML 表格解析器"""
+
+    def __init__(self):
+        super().__init__()
+        self.in_table = False
+        self.in_row = False
+        self.in_cell = False
+        self.current_cell_content = []
+        self.current_row = []
+        self.rows = []
+        self.cell_tag = None  # 'td' or 'th'
+        self.rowspan = 1
+        self.colspan = 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self.in_table = True
+            self.rows = []
+        elif tag == 'tr' and self.in_table:
+            self.in_row = True
+            self.current_row = []
+        elif tag in ('td', 'th') and self.in_row:
+            self.in_cell = True
+            self.cell_tag = tag
+            self.current_cell_content = []
+            # 获取 rowspan 和 colspan
+            attrs_dict = dict(attrs)
+            self.rowspan = int(attrs_dict.get('rowspan', '1'))
+            self.colspan = int(attrs_dict.get('colspan', '1'))
+
+    def handle_endtag(self, tag):
+        if tag == 'table':
+            self.in_table = False
+        elif tag == 'tr' and self.in_row:
+            self.in_row = False
+            if self.current_row:
+                self.rows.append(self.current_row)
+        elif tag in ('td', 'th') and self.in_cell:
+            self.in_cell = False
+            cell_text = ''.join(self.current_cell_content).strip()
+            # 存储单元格内容及其跨度信息
+            cell_info = {
+                'text': cell_text,
+                'rowspan': self.rowspan,
+                'colspan': self.colspan,
+                'is_header': self.cell_tag == 'th'
+            }
+            self.current_row.append(cell_info)
+            # 重置
+            self.rowspan = 1
+            self.colspan = 1
+
+    def handle_data(self, data):
+        if self.in_cell:
+            self.current_cell_content.append(data)
+
+    def get_table_data(self) -> List[List[dict]]:
+        """获取解析后的表格数据"""
+        return self.rows
+
+
+class TableIR:
+    """
+    表格中间表示
+
+    - grid: 行优先的单元格 ID 网格（长度 n_rows * n_cols，-1 表示空位）
+    - 单元格表：按单元格 ID 存储文本、锚点坐标、跨度和表头标记
+
+    合并单元格覆盖的所有位置都指向同一个单元格 ID，
+    只有锚点（左上角）位置才是单元格真正所在的位置。
+    实例在进程内共享，构建完成后视为只读。
+    """
+
+    __slots__ = (
+        'n_rows', 'n_cols', 'grid', 'texts',
+        'anchor_rows', 'anchor_cols', 'rowspans', 'colspans', 'headers'
+    )
+
+    def __init__(
+        self,
+        n_rows: int,
+        n_cols: int,
+        grid: array,
+        texts: List[str],
+        anchor_rows: array,
+        anchor_cols: array,
+        rowspans: array,
+        colspans: array,
+        headers: bytearray
+    ):
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.grid = grid
+        self.texts = texts
+        self.anchor_rows = anchor_rows
+        self.anchor_cols = anchor_cols
+        self.rowspans = rowspans
+        self.colspans = colspans
+        self.headers = headers
+
+    @property
+    def n_cells(self) -> int:
+        """单元格数量（每个合并区域只计一次）"""
+        return len(self.texts)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.n_rows == 0 or self.n_cols == 0
+
+    @property
+    def nbytes(self) -> int:
+        """估算占用的内存字节数（用于缓存容量控制）"""
+        array_bytes = sum(
+            arr.itemsize * len(arr)
+            for arr in (self.grid, self.anchor_rows, self.anchor_cols, self.rowspans, self.colspans)
+        )
+        return array_bytes + len(self.headers) + sum(sys.getsizeof(text) for text in self.texts)
+
+    def cell_id_at(self, row: int, col: int) -> int:
+        """获取指定位置的单元格 ID（-1 表示空位）"""
+        return self.grid[row * self.n_cols + col]
+
+    def is_anchor(self, cell_id: int, row: int, col: int) -> bool:
+        """判断指定位置是否为该单元格的锚点（左上角）"""
+        return self.anchor_rows[cell_id] == row and self.anchor_cols[cell_id] == col
+
+    def iter_cells(self) -> Iterator[Tuple[int, int, int, int, int]]:
+        """
+        按行优先顺序遍历所有单元格
+
+        Yields:
+            (单元格 ID, 锚点行, 锚点列, rowspan, colspan)
+        """
+        for cell_id in range(len(self.texts)):
+            yield (
+                cell_id,
+                self.anchor_rows[cell_id],
+                self.anchor_cols[cell_id],
+                self.rowspans[cell_id],
+                self.colspans[cell_id],
+            )
+
+    def merges(self) -> List[Tuple[int, int, int, int]]:
+        """
+        获取合并区域列表
+
+        Returns:
+            [(起始行, 起始列, rowspan, colspan)]，坐标从 0 开始
+        """
+        rowspans = as_numpy(self.rowspans)
+        colspans = as_numpy(self.colspans)
+        merged = np.flatnonzero((rowspans > 1) | (colspans > 1))
+        return list(zip(
+            as_numpy(self.anchor_rows)[merged].tolist(),
+            as_numpy(self.anchor_cols)[merged].tolist(),
+            rowspans[merged].tolist(),
+            colspans[merged].tolist(),
+        ))
+
+    @property
+    def merge_count(self) -> int:
+        """合并区域数量"""
+        return int(np.count_nonzero((as_numpy(self.rowspans) > 1) | (as_numpy(self.colspans) > 1)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为紧凑的字典（数组转为列表，便于落盘）"""
+        return {
+            'n_rows': self.n_rows,
+            'n_cols': self.n_cols,
+            'grid': self.grid.tolist(),
+            'texts': self.texts,
+            'anchor_rows': self.anchor_rows.tolist(),
+            'anchor_cols': self.anchor_cols.tolist(),
+            'rowspans': self.rowspans.tolist(),
+            'colspans': self.colspans.tolist(),
+            'headers': list(self.headers),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TableIR':
+        """从 to_dict() 的结果还原"""
+        return cls(
+            n_rows=data['n_rows'],
+            n_cols=data['n_cols'],
+            grid=array('i', data['grid']),
+            texts=list(data['texts']),
+            anchor_rows=array('i', data['anchor_rows']),
+            anchor_cols=array('i', data['anchor_cols']),
+            rowspans=array('i', data['rowspans']),
+            colspans=array('i', data['colspans']),
+            headers=bytearray(data['headers']),
+        )
+
+
+def build_table_ir(rows_data: List[List[Dict[str, Any]]]) -> TableIR:
+    """
+    根据 HTMLTableParser 的行数据构建表格中间表示（规则见 build_table_ir_from_cells）
+
+    Args:
+        rows_data: HTMLTableParser.get_table_data() 的返回值
+
+    Returns:
+        TableIR: 表格中间表示
+    """
+    return build_table_ir_from_cells(*table_data_to_cells(rows_data))
+
+
+def table_data_to_cells(
+    rows_data: List[List[Dict[str, Any]]]
+) -> Tuple[List[int], List[str], List[int], List[int], bytearray]:
+    """HTMLTableParser 的行数据转为 build_table_ir_from_cells 的输入（与 scan_table_cells 的返回值相同）"""
+    cells = [cell for row in rows_data for cell in row]
+    return (
+        [len(row) for row in rows_data],
+        [cell['text'] for cell in cells],
+        [cell['rowspan'] for cell in cells],
+        [cell['colspan'] for cell in cells],
+        bytearray(1 if cell['is_header'] else 0 for cell in cells)
+    )
+
+
+def build_table_ir_from_cells(
+    row_lengths: List[int],
+    cell_texts: List[str],
+    cell_rowspans: List[int],
+    cell_colspans: List[int],
+    cell_headers: bytearray
+) -> TableIR:
+    """
+    根据按行排列的单元格（HTML 中的顺序）构建表格中间表示
+
+    规则：
+    - 列数取各行 colspan 之和的最大值，超出的单元格被丢弃、超出的 colspan 被截断
+    - 单元格依次放入当前行的下一个空位，被上方 rowspan 占用的位置会被跳过
+    - rowspan 超出最后一行时自动补齐行数
+
+    实现（NumPy）：
+    - 没有被上方 rowspan 占用的行，单元格的起始列就是本行 colspan 的前缀和，所有这样的行一次性计算
+    - 其余行按顺序处理，按列记录占用截止行（占用位图），由位图求出空位后只遍历单元格、不逐列扫描
+    - 网格最后按各单元格的覆盖范围一次性填充
+
+    Args:
+        row_lengths: 每行的单元格数
+        cell_texts / cell_rowspans / cell_colspans / cell_headers: 各单元格的文本、跨度（HTML 属性原值）与表头标记
+
+    Returns:
+        TableIR: 表格中间表示
+    """
+    n_data_rows = len(row_lengths)
+    row_lengths = np.array(row_lengths, dtype=np.int64)
+    row_starts = np.cumsum(row_lengths) - row_lengths
+    raw_colspans = np.array(cell_colspans, dtype=np.int64)
+
+    # 列数：各行 colspan 之和的最大值
+    colspan_sums = np.concatenate(([0], np.cumsum(raw_colspans)))
+    n_cols = int((colspan_sums[row_starts + row_lengths] - colspan_sums[row_starts]).max(initial=0))
+
+    if n_cols <= 0:
+        return TableIR(0, 0, array('i'), [], array('i'), array('i'), array('i'), array('i'), bytearray())
+
+    cell_rows = np.repeat(np.arange(n_data_rows, dtype=np.int64), row_lengths)
+    max_colspans = np.maximum(raw_colspans, 1)
+    cell_rowspans = np.maximum(np.array(cell_rowspans, dtype=np.int64), 1)
+
+    # 1. 假设没有被占用的列：起始列为本行之前单元格的 colspan 之和，超出列数的单元格被丢弃
+    offsets = np.cumsum(max_colspans) - max_colspans
+    cell_cols = offsets - np.repeat(np.append(offsets, 0)[row_starts], row_lengths)
+    cell_colspans = np.minimum(max_colspans, n_cols - cell_cols)
+    kept = cell_cols < n_cols
+
+    # 2. 被上方 rowspan 覆盖的行按顺序重新放置（覆盖范围按所有 rowspan 单元格估算，被丢弃的单元格只会多算）
+    spanning = np.flatnonzero(cell_rowspans > 1)
+    if len(spanning):
+        coverage = np.zeros(n_data_rows + 1, dtype=np.int64)
+        np.add.at(coverage, cell_rows[spanning] + 1, 1)
+        np.add.at(coverage, np.minimum(cell_rows[spanning] + cell_rowspans[spanning], n_data_rows), -1)
+        covered_rows = np.flatnonzero(np.cumsum(coverage)[:n_data_rows] > 0).tolist()
+
+        busy_until = np.zeros(n_cols, dtype=np.int64)
+        spanning_list = spanning.tolist()
+        next_spanning = 0
+        for row_idx in covered_rows:
+            # 应用之前各行的 rowspan（按行顺序，已放置的位置已确定）
+            while next_spanning < len(spanning_list) and cell_rows[spanning_list[next_spanning]] < row_idx:
+                cell_idx = spanning_list[next_spanning]
+                if kept[cell_idx]:
+                    col_idx = cell_cols[cell_idx]
+                    busy_until[col_idx:col_idx + cell_colspans[cell_idx]] = (
+                        cell_rows[cell_idx] + cell_rowspans[cell_idx]
+                    )
+                next_spanning += 1
+            _place_row(
+                busy_until, row_idx, int(row_starts[row_idx]), int(row_lengths[row_idx]),
+                max_colspans, cell_cols, cell_colspans, kept
+            )
+
+    # 3. 保留的单元格（按行优先的锚点顺序编号）
+    if kept.all():
+        texts, headers = cell_texts, cell_headers
+    else:
+        kept_idx = np.flatnonzero(kept)
+        texts = [cell_texts[cell_idx] for cell_idx in kept_idx.tolist()]
+        headers = bytearray(np.frombuffer(cell_headers, dtype=np.uint8)[kept_idx].tobytes())
+        cell_rows, cell_cols = cell_rows[kept_idx], cell_cols[kept_idx]
+        cell_rowspans, cell_colspans = cell_rowspans[kept_idx], cell_colspans[kept_idx]
+    n_rows = max(n_data_rows, int((cell_rows + cell_rowspans).max(initial=0)))
+
+    anchor_rows = from_numpy(cell_rows)
+    anchor_cols = from_numpy(cell_cols)
+    rowspans = from_numpy(cell_rowspans)
+    colspans = from_numpy(cell_colspans)
+    grid = expand_cell_grid(n_rows, n_cols, anchor_rows, anchor_cols, rowspans, colspans)
+    return TableIR(n_rows, n_cols, grid, texts, anchor_rows, anchor_cols, rowspans, colspans, headers)
+
+
+def _place_row(
+    busy_until: np.ndarray,
+    row_idx: int,
+    first_cell: int,
+    n_row_cells: int,
+    max_colspans: np.ndarray,
+    cell_cols: np.ndarray,
+    cell_colspans: np.ndarray,
+    kept: np.ndarray
+) -> None:
+    """
+    在有被占用列的行中放置单元格：依次放入下一个空位，colspan 截断到连续的空位
+    （结果写回 cell_cols / cell_colspans / kept）
+    """
+    free = np.flatnonzero(busy_until <= row_idx)
+    end_cell = first_cell + n_row_cells
+    if len(free) == 0:
+        kept[first_cell:end_cell] = False
+        return
+
+    # 从每个空位开始的连续空位数
+    run_ends = np.flatnonzero(np.append(np.diff(free) != 1, True))
+    positions = np.arange(len(free))
+    runs = (run_ends[np.searchsorted(run_ends, positions)] - positions + 1).tolist()
+    free_cols = free.tolist()
+
+    cols, spans = [], []
+    slot = 0
+    for max_colspan in max_colspans[first_cell:end_cell].tolist():
+        if slot >= len(free_cols):
+            break
+        span = min(max_colspan, runs[slot])
+        cols.append(free_cols[slot])
+        spans.append(span)
+        slot += span
+
+    n_placed = len(cols)
+    cell_cols[first_cell:first_cell + n_placed] = cols
+    cell_colspans[first_cell:first_cell + n_placed] = spans
+    kept[first_cell:first_cell + n_placed] = True
+    kept[first_cell + n_placed:end_cell] = False
+
+
+def expand_cell_grid(
+    n_rows: int,
+    n_cols: int,
+    anchor_rows: array,
+    anchor_cols: array,
+    rowspans: array,
+    colspans: array
+) -> array:
+    """
+    按单元格表填充网格（各单元格覆盖的区域互不重叠）
+
+    每个单元格覆盖 rowspan × colspan 个位置，所有位置的坐标一次性向量化计算后写入
+
+    Returns:
+        行优先的单元格 ID 网格（-1 表示空位）
+    """
+    grid = np.full(n_rows * n_cols, -1, dtype=np.intc)
+    n_cells = len(anchor_rows)
+    if n_cells:
+        cell_rowspans = as_numpy(rowspans)
+        cell_colspans = as_numpy(colspans).astype(np.int64)
+        sizes = cell_rowspans * cell_colspans
+        # 每个覆盖位置所属的单元格及其在单元格内的序号
+        cell_ids = np.repeat(np.arange(n_cells, dtype=np.intc), sizes)
+        local = np.arange(len(cell_ids)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        spans = cell_colspans[cell_ids]
+        rows = as_numpy(anchor_rows)[cell_ids] + local // spans
+        cols = as_numpy(anchor_cols)[cell_ids] + local % spans
+        grid[rows * n_cols + cols] = cell_ids
+    return from_numpy(grid)
+
+
+def as_numpy(values: array) -> np.ndarray:
+    """array('i') 的 NumPy 只读视图（不复制）"""
+    return np.frombuffer(values, dtype=np.intc) if len(values) else np.zeros(0, dtype=np.intc)
+
+
+def from_numpy(values: np.ndarray) -> array:
+    """NumPy 整数数组转为 array('i')"""
+    result = array('i')
+    result.frombytes(np.ascontiguousarray(values, dtype=np.intc).tobytes())
+    return result
+
+
+def build_table_ir_from_grid(rows: List[List[Tuple[str, int, int, bool]]]) -> TableIR:
+    """
+    根据展开后的单元格网格构建表格中间表示（TableService.ir_to_cells 的逆过程）
+
+    规则（与按位置逐格写入 Excel 再合并的结果一致）：
+    - 已被之前的合并区域覆盖的位置跳过，其余位置都是锚点
+    - 合并区域截断到不与已有单元格重叠的范围
+    - 合并区域超出数据范围时自动扩展行列数
+
+    Args:
+        rows: 每个位置为 (文本, rowspan, colspan, 是否表头)
+
+    Returns:
+        TableIR: 表格中间表示
+    """
+    occupied: Dict[Tuple[int, int], int] = {}
+    texts: List[str] = []
+    anchor_rows = array('i')
+    anchor_cols = array('i')
+    rowspans = array('i')
+    colspans = array('i')
+    headers = bytearray()
+    n_rows = len(rows)
+    n_cols = 0
+
+    for row_idx, row in enumerate(rows):
+        n_cols = max(n_cols, len(row))
+        for col_idx, (text, max_rowspan, max_colspan, is_header) in enumerate(row):
+            if (row_idx, col_idx) in occupied:
+                continue
+
+            colspan = 1
+            while colspan < max_colspan and (row_idx, col_idx + colspan) not in occupied:
+                colspan += 1
+            rowspan = 1
+            while rowspan < max_rowspan and all(
+                (row_idx + rowspan, col_idx + c) not in occupied for c in range(colspan)
+            ):
+                rowspan += 1
+
+            cell_id = len(texts)
+            texts.append(text)
+            anchor_rows.append(row_idx)
+            anchor_cols.append(col_idx)
+            rowspans.append(rowspan)
+            colspans.append(colspan)
+            headers.append(1 if is_header else 0)
+
+            for r in range(row_idx, row_idx + rowspan):
+                for c in range(col_idx, col_idx + colspan):
+                    occupied[(r, c)] = cell_id
+            n_rows = max(n_rows, row_idx + rowspan)
+            n_cols = max(n_cols, col_idx + colspan)
+
+    grid = array('i', [-1]) * (n_rows * n_cols)
+    for (r, c), cell_id in occupied.items():
+        grid[r * n_cols + c] = cell_id
+
+    return TableIR(n_rows, n_cols, grid, texts, anchor_rows, anchor_cols, rowspans, colspans, headers)
+
+
+def apply_text_edits(ir: TableIR, edits: Iterable[Tuple[int, int, str]]) -> TableIR:
+    """
+    修改指定位置的单元格文本，返回新的中间表示（原实例只读，不被修改）
+
+    规则：
+    - 锚点位置：替换该单元格的文本，只复制文本列表，其余数组与原实例共享
+    - 空位：新建 1×1 单元格（单元格表按行优先顺序重新编号）
+    - 合并区域内被覆盖的位置不可编辑
+
+    Args:
+        ir: 表格中间表示
+        edits: [(行, 列, 新文本)]，坐标从 0 开始
+
+    Returns:
+        TableIR: 修改后的中间表示
+
+    Raises:
+        ValueError: 位置越界或位于合并区域内
+    """
+    n_cols = ir.n_cols
+    texts = list(ir.texts)
+    new_cells: Dict[Tuple[int, int], str] = {}
+
+    for row, col, text in edits:
+        if not (0 <= row < ir.n_rows and 0 <= col < n_cols):
+            raise ValueError(f"单元格位置越界: ({row}, {col})")
+        cell_id = ir.grid[row * n_cols + col]
+        if cell_id < 0:
+            new_cells[(row, col)] = text
+        elif ir.is_anchor(cell_id, row, col):
+            texts[cell_id] = text
+        else:
+            raise ValueError(f"单元格 ({row}, {col}) 位于合并区域内，请修改合并区域左上角的单元格")
+
+    # 空位写入空文本不需要新建单元格
+    new_cells = {pos: text for pos, text in new_cells.items() if text}
+    if not new_cells:
+        return TableIR(
+            ir.n_rows, n_cols, ir.grid, texts,
+            ir.anchor_rows, ir.anchor_cols, ir.rowspans, ir.colspans, ir.headers
+        )
+
+    # 行优先遍历时锚点总是先于其覆盖的位置出现，可以边遍历边重新编号
+    grid = array('i', ir.grid)
+    new_ids: Dict[int, int] = {}
+    out_texts: List[str] = []
+    anchor_rows = array('i')
+    anchor_cols = array('i')
+    rowspans = array('i')
+    colspans = array('i')
+    headers = bytearray()
+
+    for pos, cell_id in enumerate(ir.grid):
+        row, col = divmod(pos, n_cols)
+        if cell_id >= 0:
+            if cell_id not in new_ids:
+                new_ids[cell_id] = len(out_texts)
+                out_texts.append(texts[cell_id])
+                anchor_rows.append(row)
+                anchor_cols.append(col)
+                rowspans.append(ir.rowspans[cell_id])
+                colspans.append(ir.colspans[cell_id])
+                headers.append(ir.headers[cell_id])
+            grid[pos] = new_ids[cell_id]
+        elif (row, col) in new_cells:
+            grid[pos] = len(out_texts)
+            out_texts.append(new_cells[(row, col)])
+            anchor_rows.append(row)
+            anchor_cols.append(col)
+            rowspans.append(1)
+            colspans.append(1)
+            headers.append(0)
+
+    return TableIR(ir.n_rows, n_cols, grid, out_texts, anchor_rows, anchor_cols, rowspans, colspans, headers)
+
+
+def concat_table_irs(parts: List[Tuple[TableIR, int]]) -> TableIR:
+    """
+    纵向拼接列数相同的多个表格（跨页拼接使用）
+
+    单元格 ID 按锚点行优先顺序编号，被跳过的行中的单元格是 ID 的前缀，
+    拼接时只需整体平移 ID 与行号，总耗时与单元格数量成正比
+
+    Args:
+        parts: [(表格中间表示, 跳过的起始行数)]，被跳过的行中不能有跨到后续行的单元格（如重复的表头行）
+
+    Returns:
+        TableIR: 拼接后的中间表示
+    """
+    n_cols = parts[0][0].n_cols
+    grid = array('i')
+    texts: List[str] = []
+    anchor_rows = array('i')
+    anchor_cols = array('i')
+    rowspans = array('i')
+    colspans = array('i')
+    headers = bytearray()
+    n_rows = 0
+
+    for ir, skip_rows in parts:
+        if ir.n_cols != n_cols:
+            raise ValueError(f"列数不一致，无法拼接: {ir.n_cols} != {n_cols}")
+
+        first_cell = 0
+        while first_cell < ir.n_cells and ir.anchor_rows[first_cell] < skip_rows:
+            first_cell += 1
+        id_offset = len(texts) - first_cell
+        row_offset = n_rows - skip_rows
+
+        grid.extend(
+            cell_id + id_offset if cell_id >= 0 else -1
+            for cell_id in ir.grid[skip_rows * n_cols:]
+        )
+        texts.extend(ir.texts[first_cell:])
+        anchor_rows.extend(row + row_offset for row in ir.anchor_rows[first_cell:])
+        anchor_cols.extend(ir.anchor_cols[first_cell:])
+        rowspans.extend(ir.rowspans[first_cell:])
+        colspans.extend(ir.colspans[first_cell:])
+        headers.extend(ir.headers[first_cell:])
+        n_rows += ir.n_rows - skip_rows
+
+    return TableIR(n_rows, n_cols, grid, texts, anchor_rows, anchor_cols, rowspans, colspans, headers)
+
+
+@lru_cache(maxsize=IR_CACHE_SIZE)
+def parse_table_html(html_content: str) -> TableIR:
+    """
+    解析 HTML 表格为中间表示（进程内按内容缓存，同一段 HTML 只解析一次）
+
+    Args:
+        html_content: HTML 表格内容
+
+    Returns:
+        TableIR: 表格中间表示（只读，调用方不得修改）
+    """
+    return parse_table_html_uncached(html_content)
+
+
+def parse_table_html_uncached(html_content: str) -> TableIR:
+    """
+    解析 HTML 表格为中间表示（不经过缓存）
+
+    用于一次性的流式处理（如多页文档合并），解析结果用完即释放，不占用缓存；
+    配置为 regex 时先使用专用扫描器（scan_table_cells），无法处理的标记回退到 HTMLTableParser；
+    解析（html_parse）与合并单元格展开（span_expansion）分别记录为 span
+    """
+    with track_performance("html_parse", bytes=len(html_content)) as span:
+        cells, span['tokenizer'] = _extract_table_cells(html_content)
+
+    with track_performance("span_expansion") as span:
+        ir = build_table_ir_from_cells(*cells)
+        span.update(rows=ir.n_rows, cols=ir.n_cols, cells=len(ir.texts), merges=ir.merge_count)
+    return ir
+
+
+def _extract_table_cells(
+    html_content: str
+) -> Tuple[Tuple[List[int], List[str], List[int], List[int], bytearray], str]:
+    """
+    提取按行排列的单元格：配置为 regex 时先使用专用扫描器，无法处理的标记回退到 HTMLTableParser
+
+    Returns:
+        (build_table_ir_from_cells 的输入, 实际使用的扫描器名称)
+    """
+    cells = scan_table_cells(html_content) if settings.table_html_tokenizer == 'regex' else None
+    if cells is not None:
+        return cells, 'regex'
+    parser = HTMLTableParser()
+    parser.feed(html_content)
+    return table_data_to_cells(parser.get_table_data()), 'htmlparser'
+
+
+def scan_table_cells(html_content: str) -> Optional[Tuple[List[int], List[str], List[int], List[int], bytearray]]:
+    """
+    专用的 HTML 表格扫描器（OCR 表格只使用 table / tr / td / th 及 rowspan / colspan 的规整子集）
+
+    用编译好的正则逐个匹配标签，单元格直接输出为 build_table_ir_from_cells 的输入，
+    不经过 HTMLParser 的逐字符状态机、也不为每个单元格创建属性字典。
+    结果与 HTMLTableParser 一致；遇到子集之外的标记（注释、脚本、未闭合或错误嵌套的
+    行 / 单元格、多个表格、无法识别的属性等）返回 None，由调用方回退到 HTMLTableParser
+
+    Args:
+        html_content: HTML 表格内容
+
+    Returns:
+        (每行单元格数, 文本, rowspan, colspan, 表头标记)；无法处理时返回 None
+    """
+    if '<!' in html_content or '<?' in html_content:
+        return None
+
+    row_lengths: List[int] = []
+    texts: List[str] = []
+    rowspans: List[int] = []
+    colspans: List[int] = []
+    headers = bytearray()
+
+    seen_table = in_table = in_row = in_cell = False
+    row_start = cell_start = 0
+    n_tags = 0
+
+    for match in _TOKEN_RE.finditer(html_content):
+        cell_tag, attrs, text, is_end, tag, tag_attrs = match.groups()
+        if cell_tag is not None:
+            # 完整的单元格：开始标签 + 文本 + 结束标签
+            n_tags += 2
+            if not in_row:
+                continue
+            if in_cell:
+                return None
+            if attrs:
+                spans = _cell_spans(attrs) if _ATTRS_RE.fullmatch(attrs) else None
+                if spans is None:
+                    return None
+            else:
+                spans = (1, 1)
+            rowspans.append(spans[0])
+            colspans.append(spans[1])
+            headers.append(1 if cell_tag == 'th' else 0)
+            texts.append((html.unescape(text) if '&' in text else text).strip())
+            continue
+
+        n_tags += 1
+        tag = tag.lower()
+        attrs = tag_attrs
+        if tag in _RAWTEXT_TAGS:
+            return None
+        if attrs:
+            if attrs[-1] == '/':
+                # 自闭合：表格结构标签不支持，其余（如 <br/>）与普通标签一样忽略
+                if tag in _STRUCTURE_TAGS:
+                    return None
+                attrs = attrs[:-1]
+            if not _SIMPLE_SPANS_RE.fullmatch(attrs) and not _ATTRS_RE.fullmatch(attrs):
+                return None
+
+        if tag == 'td' or tag == 'th':
+            if is_end:
+                if in_cell:
+                    texts.append(_cell_text(html_content[cell_start:match.start()]))
+                    in_cell = False
+            elif in_row:
+                if in_cell:
+                    return None
+                spans = _cell_spans(attrs) if attrs else (1, 1)
+                if spans is None:
+                    return None
+                rowspans.append(spans[0])
+                colspans.append(spans[1])
+                headers.append(1 if tag == 'th' else 0)
+                in_cell = True
+                cell_start = match.end()
+        elif tag == 'tr':
+            if is_end:
+                if in_cell:
+                    return None
+                if in_row:
+                    if len(rowspans) > row_start:
+                        row_lengths.append(len(rowspans) - row_start)
+                    in_row = False
+            elif in_table:
+                if in_row:
+                    return None
+                in_row = True
+                row_start = len(rowspans)
+        elif tag == 'table':
+            if is_end:
+                if in_row or in_cell:
+                    return None
+                in_table = False
+            else:
+                if seen_table:
+                    return None
+                seen_table = in_table = True
+
+    # 没有匹配为标签的 "<"（HTMLParser 可能按文本或注释处理）、未闭合的行 / 单元格
+    if n_tags != html_content.count('<') or in_row or in_cell:
+        return None
+    return row_lengths, texts, rowspans, colspans, headers
+
+
+def _cell_spans(attrs: str) -> Optional[Tuple[int, int]]:
+    """读取单元格的 (rowspan, colspan)（同名属性以最后一个为准）；取值不是十进制整数时返回 None"""
+    simple = _SIMPLE_SPANS_RE.fullmatch(attrs)
+    if simple is not None:
+        # 常见形式：colspan="2" / rowspan="3" colspan="2"
+        name, value, second_name, second_value = simple.groups()
+        spans = {name: int(value)}
+        if second_name is not None:
+            spans[second_name] = int(second_value)
+        return spans.get('rowspan', 1), spans.get('colspan', 1)
+
+    spans = {'rowspan': 1, 'colspan': 1}
+    for match in _ATTR_RE.finditer(attrs):
+        name = match.group(1).lower()
+        if name in spans:
+            value = next((group for group in match.groups()[1:] if group is not None), None)
+            value = value.strip() if value is not None else ''
+            if not (value.isascii() and value.isdigit()):
+                return None
+            spans[name] = int(value)
+    return spans['rowspan'], spans['colspan']
+
+
+def _cell_text(content: str) -> str:
+    """单元格文本：去掉其中的标签，按标签分段解码字符引用（与 HTMLParser 一致），去掉首尾空白"""
+    chunks = _TAG_SPLIT_RE.split(content) if '<' in content else (content,)
+    return ''.join(html.unescape(chunk) if '&' in chunk else chunk for chunk in chunks).strip()
+
+
+def scan_table_shape(html_content: str) -> Tuple[int, int]:
+    """
+    获取表格形状（行数、列数），不经过缓存、不记录 span
+
+    与 parse_table_html 使用相同的扫描 / 回退与放置规则，直接取 TableIR 的 n_rows / n_cols，
+    重复属性、未闭合标签、嵌套或多个表格等情况下的结果也与解析一致
+
+    Args:
+        html_content: HTML 表格内容
+
+    Returns:
+        (行数, 列数)
+    """
+    cells, _ = _extract_table_cells(html_content)
+    ir = build_table_ir_from_cells(*cells)
+    return ir.n_rows, ir.n_cols
+
+
+def extract_table_html_blocks(ocr_data: Dict[str, Any]) -> List[str]:
+    """
+    从 OCR JSON 数据中提取所有表格块的 HTML 内容
+
+    Args:
+        ocr_data: OCR JSON 数据
+
+    Returns:
+        HTML 表格内容列表（按页面、块顺序）
+    """
+    html_contents = []
+    for page in ocr_data.get('pages', []):
+        for block in page.get('parsing_res_list', []):
+            if block.get('block_label') != 'table':
+                continue
+            block_content = block.get('block_content', '')
+            if block_content:
+                # 清理转义的双引号（虽然保存时已清理，但保险起见）
+                html_contents.append(block_content.replace('\\"', '"'))
+    return html_contents
@@ -1,22 +1,56 @@
 """
 表格数据服务层
-直接从 OCR JSON 提取表格数据，转换为前端需要的格式
+直接从 OCR JSON 提取表格数据，转换为前端需要的格式；编辑后的数据按版本保存
 """
-import json
+import asyncio
 import logging
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Any, Dict, Optional, List, Tuple
 from uuid import UUID
 
+import numpy as np
+
 from app.models.task import Task, TaskStatus
 from app.services.task_service import TaskService
-from app.services.excel_service import HTMLTableParser  # 复用 HTML 解析器
-from app.schemas.table import CellData, TableSheet, TableDataResponse, TableMetadata
+from app.services.table_ir import (
+    TableIR,
+    as_numpy,
+    build_table_ir_from_grid,
+    parse_table_html,
+    scan_table_shape,
+)
+from app.services.table_cache import CachedTables, get_table_cache
+from app.services.ocr_store import load_table_html_blocks
+from app.services.table_columnar import encode_columnar_sheet
+from app.services.excel_pool import ExcelPoolBusyError
+from app.services.table_edit_store import (
+    CellEdit,
+    EditedTables,
+    TableVersionConflictError,
+    get_table_edit_store,
+)
+from app.schemas.table import (
+    CellData,
+    CellRangePatch,
+    TableSheet,
+    TableDataResponse,
+    TableMetadata,
+    TablePatchRequest,
+    TablePatchResult,
+)
+from app.utils.json_store import read_json, write_json
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 展开表格时共享的空单元格（只读）
+_EMPTY_CELL = {"text": "", "rowspan": 1, "colspan": 1, "is_header": False}
+_EMPTY_HEADER_CELL = {"text": "", "rowspan": 1, "colspan": 1, "is_header": True}
+
+# 表格形状索引格式版本（形状规则变化时递增，旧索引视为过期并重新扫描）
+SHAPE_INDEX_VERSION = 2
+
 
 class TableService:
     """表格数据服务类"""
@@ -32,110 +66,212 @@ class TableService:
         Returns:
             (展开后的单元格数组, 行数, 列数)
         """
-        # 使用 HTMLTableParser 解析
-        parser = HTMLTableParser()
-        parser.feed(html_content)
-        rows_data = parser.get_table_data()
+        # 复用进程内已解析的中间表示
+        ir = parse_table_html(html_content)
         
-        if not rows_data:
+        if ir.is_empty:
             return [], 0, 0
         
-        # 计算最大列数（考虑 colspan）
-        max_cols = 0
-        for row in rows_data:
-            col_count = sum(cell['colspan'] for cell in row)
-            max_cols = max(max_cols, col_count)
-        
-        # 展开合并单元格为二维数组
-        expanded_rows = []
-        rowspan_tracker = {}  # {col_idx: (remaining_rows, CellData)}
-        
-        for row_idx, row in enumerate(rows_data):
-            expanded_row = [None] * max_cols  # 先初始化为 None
-            
-            # 1. 首先填充之前行的 rowspan
-            cols_to_delete = []
-            for col_idx, (remaining, cell_data) in rowspan_tracker.items():
-                expanded_row[col_idx] = cell_data
-                if remaining > 1:
-                    rowspan_tracker[col_idx] = (remaining - 1, cell_data)
-                else:
-                    cols_to_delete.append(col_idx)
-            
-            # 删除已完成的 rowspan
-            for col_idx in cols_to_delete:
-                del rowspan_tracker[col_idx]
-            
-            # 2. 处理当前行的单元格
-            col_idx = 0
-            for cell in row:
-                # 找到下一个空位置
-                while col_idx < max_cols and expanded_row[col_idx] is not None:
-                    col_idx += 1
-                
-                if col_idx >= max_cols:
-                    break
-                
-                # 创建 CellData 对象
-                cell_data = CellData(
-                    text=cell['text'],
-                    rowspan=cell['rowspan'],
-                    colspan=cell['colspan'],
-                    is_header=cell['is_header']
-                )
-                
-                # 填充 colspan（主单元格）
-                expanded_row[col_idx] = cell_data
-                
-                # 填充 colspan（后续位置用相同数据，但标记为合并单元格的一部分）
-                for i in range(1, cell['colspan']):
-                    if col_idx + i < max_cols:
-                        # 合并单元格的后续列，保留原始单元格引用但文本为空
-                        expanded_row[col_idx + i] = CellData(
-                            text="",  # 合并单元格的后续位置不显示文本
-                            rowspan=1,
-                            colspan=1,
-                            is_header=cell['is_header']
-                        )
-                
-                # 记录 rowspan（如果大于 1）
-                if cell['rowspan'] > 1:
-                    for i in range(cell['colspan']):
-                        if col_idx + i < max_cols:
-                            rowspan_tracker[col_idx + i] = (cell['rowspan'] - 1, cell_data)
-                
-                col_idx += cell['colspan']
-            
-            # 3. 填充剩余的空单元格
-            for i in range(max_cols):
-                if expanded_row[i] is None:
-                    expanded_row[i] = CellData(text="", rowspan=1, colspan=1, is_header=False)
+        return TableService.ir_to_cells(ir), ir.n_rows, ir.n_cols
+    
+    @staticmethod
+    def ir_to_cells(ir: TableIR) -> List[List[CellData]]:
+        """
+        将表格中间表示展开为单元格二维数组
+        
+        - 锚点位置：原单元格（携带 rowspan / colspan）
+        - 同一行中 colspan 覆盖的后续位置：空文本单元格
+        - rowspan 覆盖的后续行：引用原单元格
+        - 空位：空文本单元格
+        
+        数据来自已解析的中间表示，使用 model_construct 跳过校验
+        
+        Args:
+            ir: 表格中间表示
             
-            expanded_rows.append(expanded_row)
+        Returns:
+            展开后的单元格数组
+        """
+        return TableService.ir_window_to_cells(ir, 0, ir.n_rows, 0, ir.n_cols)
+    
+    @staticmethod
+    def ir_window_to_cells(
+        ir: TableIR,
+        row_start: int,
+        row_end: int,
+        col_start: int,
+        col_end: int
+    ) -> List[List[CellData]]:
+        """
+        展开表格中间表示的一个窗口为 CellData 数组（规则同 ir_window_to_rows）
+        """
+        constructed = {}
         
-        # 继续处理剩余的 rowspan
-        while rowspan_tracker:
-            expanded_row = [None] * max_cols
-            cols_to_delete = []
+        def to_model(cell: Dict[str, Any]) -> CellData:
+            model = constructed.get(id(cell))
+            if model is None:
+                model = constructed[id(cell)] = CellData.model_construct(**cell)
+            return model
+        
+        return [
+            [to_model(cell) for cell in row]
+            for row in TableService.ir_window_to_rows(ir, row_start, row_end, col_start, col_end)
+        ]
+    
+    @staticmethod
+    def ir_window_to_rows(
+        ir: TableIR,
+        row_start: int,
+        row_end: int,
+        col_start: int,
+        col_end: int
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        展开表格中间表示的一个窗口 [row_start, row_end) × [col_start, col_end)（读取接口使用）
+        
+        单元格为与 CellData 字段一致的 dict，直接编码为 JSON，不经过 pydantic；
+        结果与 ir_to_cells 展开后截取同一窗口一致。同一单元格的各位置共享同一个 dict，
+        空单元格共享模块级常量，调用方不能修改返回的单元格
+        
+        Args:
+            ir: 表格中间表示
+            row_start / row_end: 行范围（左闭右开，超出表格的部分被截断）
+            col_start / col_end: 列范围（左闭右开，超出表格的部分被截断）
             
-            for col_idx, (remaining, cell_data) in rowspan_tracker.items():
-                expanded_row[col_idx] = cell_data
-                if remaining > 1:
-                    rowspan_tracker[col_idx] = (remaining - 1, cell_data)
-                else:
-                    cols_to_delete.append(col_idx)
+        Returns:
+            窗口内的单元格数组
+        """
+        row_end = min(row_end, ir.n_rows)
+        col_end = min(col_end, ir.n_cols)
+        if row_start >= row_end:
+            return []
+        if col_start >= col_end or ir.n_cells == 0:
+            return [[_EMPTY_CELL] * max(col_end - col_start, 0) for _ in range(row_start, row_end)]
+        
+        window = as_numpy(ir.grid).reshape(ir.n_rows, ir.n_cols)[row_start:row_end, col_start:col_end]
+        cell_ids = np.maximum(window, 0)
+        
+        # 候选对象：各单元格（只为窗口内出现的单元格创建 dict）+ 两种空单元格
+        empty_idx, empty_header_idx = ir.n_cells, ir.n_cells + 1
+        cells = np.empty(ir.n_cells + 2, dtype=object)
+        cells[empty_idx] = _EMPTY_CELL
+        cells[empty_header_idx] = _EMPTY_HEADER_CELL
+        in_window = np.zeros(ir.n_cells, dtype=bool)
+        in_window[window[window >= 0]] = True
+        for cell_id in np.flatnonzero(in_window).tolist():
+            cells[cell_id] = {
+                "text": ir.texts[cell_id],
+                "rowspan": ir.rowspans[cell_id],
+                "colspan": ir.colspans[cell_id],
+                "is_header": bool(ir.headers[cell_id])
+            }
+        
+        # 合并单元格在锚点行的后续列，文本为空
+        colspan_tail = (
+            (window >= 0)
+            & (as_numpy(ir.anchor_rows)[cell_ids] == np.arange(row_start, row_end)[:, None])
+            & (as_numpy(ir.anchor_cols)[cell_ids] != np.arange(col_start, col_end))
+        )
+        is_header = np.frombuffer(ir.headers, dtype=np.uint8)[cell_ids]
+        index = np.where(window >= 0, window, empty_idx)
+        index = np.where(colspan_tail, np.where(is_header, empty_header_idx, empty_idx), index)
+        
+        return cells[index].tolist()
+    
+    @staticmethod
+    def cells_to_ir(data: List[List[CellData]]) -> TableIR:
+        """
+        将单元格二维数组（如前端编辑后的数据）还原为表格中间表示
+        
+        合并单元格覆盖的位置以锚点的 rowspan / colspan 为准，其内容被忽略
+        
+        Args:
+            data: 单元格二维数组
             
-            for col_idx in cols_to_delete:
-                del rowspan_tracker[col_idx]
+        Returns:
+            TableIR: 表格中间表示
+        """
+        return build_table_ir_from_grid([
+            [(cell.text, cell.rowspan, cell.colspan, cell.is_header) for cell in row]
+            for row in data
+        ])
+    
+    @staticmethod
+    def extract_table_irs(ocr_json_path: str) -> List[TableIR]:
+        """
+        从 OCR JSON 文件中提取所有非空表格的中间表示
+        
+        Args:
+            ocr_json_path: OCR JSON 文件路径
             
-            # 填充空单元格
-            for i in range(max_cols):
-                if expanded_row[i] is None:
-                    expanded_row[i] = CellData(text="", rowspan=1, colspan=1, is_header=False)
+        Returns:
+            TableIR 列表（读取失败时返回空列表）
+        """
+        try:
+            html_contents = load_table_html_blocks(ocr_json_path)
+        except Exception as e:
+            logger.error(f"读取 OCR JSON 失败: {e}")
+            return []
+        
+        irs = []
+        
+        # 遍历所有表格块（block_label == 'table'）
+        for html_content in html_contents:
+            try:
+                ir = parse_table_html(html_content)
+                if not ir.is_empty:
+                    irs.append(ir)
+            except Exception as e:
+                logger.error(f"解析表格失败: {e}")
+                continue
+        
+        return irs
+    
+    @staticmethod
+    def build_sheets(irs: List[TableIR], names: Optional[List[str]] = None) -> List[TableSheet]:
+        """
+        将表格中间表示转换为 TableSheet 列表（Sheet ID 从 1 开始）
+        
+        Args:
+            irs: 表格中间表示列表
+            names: Sheet 名称列表，None 表示使用 Table_{Sheet ID}
             
-            expanded_rows.append(expanded_row)
+        Returns:
+            TableSheet 列表
+        """
+        return [
+            TableSheet.model_construct(
+                sheet_id=sheet_id,
+                sheet_name=names[sheet_id - 1] if names else f"Table_{sheet_id}",
+                rows=ir.n_rows,
+                cols=ir.n_cols,
+                data=TableService.ir_to_cells(ir)
+            )
+            for sheet_id, ir in enumerate(irs, start=1)
+        ]
+    
+    @staticmethod
+    def build_sheet_payloads(irs: List[TableIR], names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        将表格中间表示转换为与 TableSheet 字段一致的 dict 列表（读取接口直接编码为 JSON）
         
-        return expanded_rows, len(expanded_rows), max_cols
+        Args:
+            irs: 表格中间表示列表
+            names: Sheet 名称列表，None 表示使用 Table_{Sheet ID}
+            
+        Returns:
+            Sheet dict 列表
+        """
+        return [
+            {
+                "sheet_id": sheet_id,
+                "sheet_name": names[sheet_id - 1] if names else f"Table_{sheet_id}",
+                "rows": ir.n_rows,
+                "cols": ir.n_cols,
+                "data": TableService.ir_window_to_rows(ir, 0, ir.n_rows, 0, ir.n_cols)
+            }
+            for sheet_id, ir in enumerate(irs, start=1)
+        ]
     
     @staticmethod
     def extract_tables_from_ocr_json(ocr_json_path: str) -> List[TableSheet]:
@@ -148,56 +284,216 @@ class TableService:
         Returns:
             TableSheet 列表
         """
+        return TableService.build_sheets(TableService.extract_table_irs(ocr_json_path))
+    
+    @staticmethod
+    async def load_cached_tables(task_id: UUID, ocr_json_path: str) -> Optional[CachedTables]:
+        """
+        获取任务的已解析表格（优先命中缓存）
+        
+        查找顺序：内存 LRU → 磁盘落盘文件 → 重新读取 OCR JSON 并解析
+        文件读取、解析与落盘在线程中执行，缓存本身只在事件循环中访问
+        
+        Args:
+            task_id: 任务 ID
+            ocr_json_path: OCR JSON 文件路径
+            
+        Returns:
+            缓存条目，OCR JSON 不存在时返回 None
+        """
+        cache = get_table_cache()
+        fingerprint = cache.fingerprint(ocr_json_path)
+        if fingerprint is None:
+            return None
+        
+        entry = cache.get(task_id, fingerprint)
+        if entry is not None:
+            return entry
+        
+        entry, spilled = await asyncio.to_thread(
+            TableService._load_tables, task_id, ocr_json_path, fingerprint
+        )
+        cache.put(task_id, entry, spill=False)
+        if not spilled and entry.irs:
+            await asyncio.to_thread(cache.spill, task_id, entry)
+        return entry
+    
+    @staticmethod
+    def _load_tables(task_id: UUID, ocr_json_path: str, fingerprint) -> Tuple[CachedTables, bool]:
+        """
+        从落盘文件或 OCR JSON 加载表格（同步，在线程中调用）
+        
+        Returns:
+            (缓存条目, 是否来自落盘文件)
+        """
+        irs = get_table_cache().load_spilled(task_id, fingerprint)
+        spilled = irs is not None
+        if not spilled:
+            irs = TableService.extract_table_irs(ocr_json_path)
+        return CachedTables(fingerprint, irs), spilled
+    
+    @staticmethod
+    async def load_edit_state(task_id: UUID, ocr_json_path: str) -> Optional[EditedTables]:
+        """
+        获取任务的编辑状态（内存 → 磁盘快照 + 增量日志）
+        
+        Args:
+            task_id: 任务 ID
+            ocr_json_path: OCR JSON 文件路径（OCR 结果变化后编辑状态失效）
+            
+        Returns:
+            编辑状态，尚未编辑过时返回 None
+        """
+        store = get_table_edit_store()
+        fingerprint = get_table_cache().fingerprint(ocr_json_path)
+        state = store.get(task_id, fingerprint)
+        if state is None:
+            state = await asyncio.to_thread(store.read, task_id, fingerprint)
+            if state is not None:
+                store.put(task_id, state)
+        return state
+    
+    @staticmethod
+    def flatten_patches(patches: List[CellRangePatch]) -> List[CellEdit]:
+        """
+        将单元格区域修改展开为逐单元格修改（跳过值为 null 的位置）
+        
+        Returns:
+            [(Sheet 序号(从 0 开始), 行, 列, 新文本)]
+        """
+        return [
+            (patch.sheet_id - 1, patch.row + row_offset, patch.col + col_offset, text)
+            for patch in patches
+            for row_offset, row_values in enumerate(patch.values)
+            for col_offset, text in enumerate(row_values)
+            if text is not None
+        ]
+    
+    @staticmethod
+    def get_shape_index_path(ocr_json_path: str) -> Path:
+        """
+        获取表格形状索引（sidecar）路径
+        
+        存储规则：data/ocr_json/{task_id}.meta.json
+        """
+        path = Path(ocr_json_path)
+        return path.with_name(f"{path.stem}.meta.json")
+    
+    @staticmethod
+    def scan_table_shapes(html_contents: List[str]) -> List[Tuple[int, int]]:
+        """
+        扫描所有非空表格的形状（不创建单元格）
+        
+        Args:
+            html_contents: 表格块 HTML 内容列表
+            
+        Returns:
+            [(行数, 列数)] 列表，顺序与 Sheet ID 一致
+        """
+        shapes = []
+        for html_content in html_contents:
+            try:
+                rows, cols = scan_table_shape(html_content)
+            except Exception as e:
+                logger.error(f"扫描表格形状失败: {e}")
+                continue
+            if rows > 0 and cols > 0:
+                shapes.append((rows, cols))
+        return shapes
+    
+    @staticmethod
+    def write_shape_index(ocr_json_path: str, html_contents: List[str]) -> List[Tuple[int, int]]:
+        """
+        写入表格形状索引（在 OCR JSON 保存后调用）
+        
+        Args:
+            ocr_json_path: 已保存的 OCR JSON 文件路径
+            html_contents: 表格块 HTML 内容列表
+            
+        Returns:
+            表格形状列表
+        """
+        shapes = TableService.scan_table_shapes(html_contents)
+        fingerprint = get_table_cache().fingerprint(ocr_json_path)
+        index_path = TableService.get_shape_index_path(ocr_json_path)
+        write_json(index_path, {
+            "version": SHAPE_INDEX_VERSION,
+            "fingerprint": list(fingerprint) if fingerprint else None,
+            "tables": [{"rows": rows, "cols": cols} for rows, cols in shapes]
+        })
+        logger.info(f"表格形状索引已保存: {index_path}, 表格数={len(shapes)}")
+        return shapes
+    
+    @staticmethod
+    async def load_table_shapes(task_id: UUID, ocr_json_path: str) -> List[Tuple[int, int]]:
+        """
+        获取任务所有表格的形状（元数据快速路径，不创建单元格）
+        
+        查找顺序：内存缓存 → 形状索引 sidecar → 扫描 OCR JSON 并补写索引
+        
+        Args:
+            task_id: 任务 ID
+            ocr_json_path: OCR JSON 文件路径
+            
+        Returns:
+            [(行数, 列数)] 列表
+        """
+        cache = get_table_cache()
+        fingerprint = cache.fingerprint(ocr_json_path)
+        if fingerprint is None:
+            return []
+        
+        # 1. 内存缓存
+        entry = cache.get(task_id, fingerprint)
+        if entry is not None:
+            return [(ir.n_rows, ir.n_cols) for ir in entry.irs]
+        
+        # 2~3. 形状索引 / 扫描 OCR JSON（在线程中执行）
+        return await asyncio.to_thread(TableService.read_table_shapes, ocr_json_path, fingerprint)
+    
+    @staticmethod
+    def read_table_shapes(ocr_json_path: str, fingerprint) -> List[Tuple[int, int]]:
+        """
+        从形状索引 sidecar 读取表格形状，索引缺失、过期或版本不符时扫描 OCR JSON 并补写索引
+        
+        Args:
+            ocr_json_path: OCR JSON 文件路径
+            fingerprint: OCR JSON 当前指纹
+            
+        Returns:
+            [(行数, 列数)] 列表
+        """
+        # 1. 形状索引
+        index_path = TableService.get_shape_index_path(ocr_json_path)
+        if index_path.exists():
+            try:
+                index = read_json(index_path)
+                if (index.get("version") == SHAPE_INDEX_VERSION
+                        and tuple(index.get("fingerprint") or ()) == fingerprint):
+                    return [(table["rows"], table["cols"]) for table in index.get("tables", [])]
+            except Exception as e:
+                logger.warning(f"读取表格形状索引失败: {index_path}, error={e}")
+        
+        # 2. 扫描 OCR JSON
         try:
-            with open(ocr_json_path, 'r', encoding='utf-8') as f:
-                ocr_data = json.load(f)
+            html_contents = load_table_html_blocks(ocr_json_path)
         except Exception as e:
             logger.error(f"读取 OCR JSON 失败: {e}")
             return []
         
-        sheets = []
-        sheet_id = 1
-        
-        # 遍历所有页面
-        pages = ocr_data.get('pages', [])
-        for page in pages:
-            parsing_res_list = page.get('parsing_res_list', [])
-            
-            # 筛选 block_label == 'table' 的内容
-            for block in parsing_res_list:
-                if block.get('block_label') != 'table':
-                    continue
-                
-                html_content = block.get('block_content', '')
-                if not html_content:
-                    continue
-                
-                # 解析 HTML 表格为单元格数组
-                try:
-                    cells, rows, cols = TableService.parse_html_table_to_cells(html_content)
-                    
-                    if rows > 0 and cols > 0:
-                        sheet = TableSheet(
-                            sheet_id=sheet_id,
-                            sheet_name=f"Table_{sheet_id}",
-                            rows=rows,
-                            cols=cols,
-                            data=cells
-                        )
-                        sheets.append(sheet)
-                        sheet_id += 1
-                        
-                except Exception as e:
-                    logger.error(f"解析表格失败: {e}")
-                    continue
-        
-        return sheets
+        try:
+            return TableService.write_shape_index(ocr_json_path, html_contents)
+        except Exception as e:
+            logger.warning(f"写入表格形状索引失败: {e}")
+            return TableService.scan_table_shapes(html_contents)
     
     @staticmethod
-    async def get_table_data(task_id: UUID) -> Tuple[bool, str, Optional[TableDataResponse]]:
+    async def get_table_data(task_id: UUID) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
         """
         获取任务的表格数据（供前端预览/编辑）
         
+        返回与 TableDataResponse 字段一致的 dict，由路由直接编码，不经过 pydantic
+        
         Args:
             task_id: 任务 ID
             
@@ -222,9 +518,20 @@ class TableService:
         if not task.ocr_json_path or not Path(task.ocr_json_path).exists():
             return False, f"OCR JSON 文件不存在: {task.ocr_json_path}", None
         
-        # 4. 提取表格数据
+        # 4. 提取表格数据（已编辑过的任务返回编辑后的数据）
         try:
-            sheets = TableService.extract_tables_from_ocr_json(task.ocr_json_path)
+            version = 0
+            state = await TableService.load_edit_state(task_id, task.ocr_json_path)
+            if state is not None:
+                version = state.version
+                sheets = await asyncio.to_thread(TableService.build_sheet_payloads, state.irs, state.names)
+            else:
+                cached = await TableService.load_cached_tables(task_id, task.ocr_json_path)
+                sheets = cached.sheets if cached else []
+                if cached and sheets is None:
+                    # 完整数据按需展开（窗口请求只需要中间表示）
+                    sheets = await asyncio.to_thread(TableService.build_sheet_payloads, cached.irs)
+                    get_table_cache().attach_sheets(task_id, cached, sheets)
             
             if not sheets:
                 return False, "未找到表格数据", None
@@ -236,12 +543,13 @@ class TableService:
                 logger.info(f"任务 {task_id} 状态更新为 editable")
             
             # 6. 构建响应
-            response = TableDataResponse(
-                task_id=str(task.task_id),
-                status=task.status.value,
-                total_sheets=len(sheets),
-                sheets=sheets
-            )
+            response = {
+                "task_id": str(task.task_id),
+                "status": task.status.value,
+                "total_sheets": len(sheets),
+                "sheets": sheets,
+                "version": version
+            }
             
             return True, f"成功获取 {len(sheets)} 个表格", response
             
@@ -249,6 +557,219 @@ class TableService:
             logger.error(f"获取表格数据失败: {e}", exc_info=True)
             return False, f"获取表格数据失败: {str(e)}", None
     
+    @staticmethod
+    async def load_readable_tables(
+        task_id: UUID
+    ) -> Tuple[bool, str, Optional[Tuple[Task, List[str], List[TableIR], int]]]:
+        """
+        获取可读取表格的任务及其表格中间表示（已编辑过的任务使用编辑后的数据）
+        
+        Args:
+            task_id: 任务 ID
+            
+        Returns:
+            (成功标志, 消息, (任务, Sheet 名称列表, 中间表示列表, 数据版本号))
+        """
+        # 1. 获取任务
+        task = await TaskService.get_task(task_id)
+        if not task:
+            return False, f"任务不存在: {task_id}", None
+        
+        # 2. 检查任务状态
+        allowed_statuses = [
+            TaskStatus.OCR_DONE,
+            TaskStatus.EXCEL_GENERATED,
+            TaskStatus.EDITABLE
+        ]
+        if task.status not in allowed_statuses:
+            return False, f"任务状态错误: {task.status}，需要 OCR 完成后才能获取表格数据", None
+        
+        # 3. 检查 OCR JSON 是否存在
+        if not task.ocr_json_path or not Path(task.ocr_json_path).exists():
+            return False, f"OCR JSON 文件不存在: {task.ocr_json_path}", None
+        
+        # 4. 读取中间表示
+        state = await TableService.load_edit_state(task_id, task.ocr_json_path)
+        if state is not None:
+            return True, "", (task, state.names, state.irs, state.version)
+        
+        cached = await TableService.load_cached_tables(task_id, task.ocr_json_path)
+        irs = cached.irs if cached else []
+        if not irs:
+            return False, "未找到表格数据", None
+        names = [f"Table_{sheet_id}" for sheet_id in range(1, len(irs) + 1)]
+        return True, "", (task, names, irs, 0)
+    
+    @staticmethod
+    def clamp_window(
+        ir: TableIR,
+        row_limit: Optional[int] = None,
+        col_limit: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """
+        将窗口行列数限制在配置范围内
+        
+        Returns:
+            (行数, 列数)；行数默认 table_window_default_rows，列数默认到最后一列
+        """
+        if row_limit is None:
+            row_limit = settings.table_window_default_rows
+        row_limit = min(row_limit, settings.table_window_max_rows)
+        col_limit = min(
+            col_limit if col_limit is not None else ir.n_cols,
+            settings.table_window_max_cols
+        )
+        return row_limit, col_limit
+    
+    @staticmethod
+    async def get_table_window(
+        task_id: UUID,
+        sheet_id: int,
+        row_offset: int = 0,
+        row_limit: Optional[int] = None,
+        col_offset: int = 0,
+        col_limit: Optional[int] = None
+    ) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        """
+        获取单个 Sheet 的窗口数据（供前端虚拟滚动按视口加载）
+        
+        直接从缓存的中间表示展开窗口内的单元格，不构建整表数据；
+        返回与 TableWindow 字段一致的 dict
+        
+        Args:
+            task_id: 任务 ID
+            sheet_id: Sheet ID（从 1 开始）
+            row_offset: 起始行（从 0 开始）
+            row_limit: 行数，None 表示 table_window_default_rows
+            col_offset: 起始列（从 0 开始）
+            col_limit: 列数，None 表示到最后一列
+            
+        Returns:
+            (成功标志, 消息, 窗口数据)
+        """
+        try:
+            success, message, tables = await TableService.load_readable_tables(task_id)
+            if not success:
+                return False, message, None
+            task, names, irs, version = tables
+            
+            if not 1 <= sheet_id <= len(irs):
+                return False, f"Sheet 不存在: {sheet_id}（共 {len(irs)} 个）", None
+            
+            # 展开窗口（行列数限制在配置范围内）
+            ir = irs[sheet_id - 1]
+            row_limit, col_limit = TableService.clamp_window(ir, row_limit, col_limit)
+            data = await asyncio.to_thread(
+                TableService.ir_window_to_rows,
+                ir,
+                row_offset, row_offset + row_limit,
+                col_offset, col_offset + col_limit
+            )
+            
+            window = {
+                "task_id": str(task.task_id),
+                "sheet_id": sheet_id,
+                "sheet_name": names[sheet_id - 1],
+                "rows": ir.n_rows,
+                "cols": ir.n_cols,
+                "row_offset": row_offset,
+                "col_offset": col_offset,
+                "data": data,
+                "version": version
+            }
+            
+            return True, f"成功获取第 {row_offset + 1}~{row_offset + len(data)} 行", window
+            
+        except Exception as e:
+            logger.error(f"获取表格窗口数据失败: {e}", exc_info=True)
+            return False, f"获取表格窗口数据失败: {str(e)}", None
+    
+    @staticmethod
+    async def get_table_data_columnar(
+        task_id: UUID,
+        binary: bool = False
+    ) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        """
+        获取任务的表格数据（列式编码，字段说明见 table_columnar）
+        
+        Args:
+            task_id: 任务 ID
+            binary: 表头位图是否保留为 bytes（msgpack 响应）
+            
+        Returns:
+            (成功标志, 消息, 列式表格数据)
+        """
+        try:
+            success, message, tables = await TableService.load_readable_tables(task_id)
+            if not success:
+                return False, message, None
+            task, names, irs, version = tables
+            
+            sheets = await asyncio.to_thread(lambda: [
+                encode_columnar_sheet(sheet_id, names[sheet_id - 1], ir, binary=binary)
+                for sheet_id, ir in enumerate(irs, start=1)
+            ])
+            
+            if task.status != TaskStatus.EDITABLE:
+                task.status = TaskStatus.EDITABLE
+                await task.save()
+                logger.info(f"任务 {task_id} 状态更新为 editable")
+            
+            data = {
+                "task_id": str(task.task_id),
+                "status": task.status.value,
+                "total_sheets": len(sheets),
+                "version": version,
+                "sheets": sheets
+            }
+            
+            return True, f"成功获取 {len(sheets)} 个表格", data
+            
+        except Exception as e:
+            logger.error(f"获取表格数据失败: {e}", exc_info=True)
+            return False, f"获取表格数据失败: {str(e)}", None
+    
+    @staticmethod
+    async def get_table_window_columnar(
+        task_id: UUID,
+        sheet_id: int,
+        row_offset: int = 0,
+        row_limit: Optional[int] = None,
+        col_offset: int = 0,
+        col_limit: Optional[int] = None,
+        binary: bool = False
+    ) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        """
+        获取单个 Sheet 的窗口数据（列式编码，参数同 get_table_window）
+        
+        Returns:
+            (成功标志, 消息, 列式窗口数据)
+        """
+        try:
+            success, message, tables = await TableService.load_readable_tables(task_id)
+            if not success:
+                return False, message, None
+            task, names, irs, version = tables
+            
+            if not 1 <= sheet_id <= len(irs):
+                return False, f"Sheet 不存在: {sheet_id}（共 {len(irs)} 个）", None
+            
+            ir = irs[sheet_id - 1]
+            row_limit, col_limit = TableService.clamp_window(ir, row_limit, col_limit)
+            data = await asyncio.to_thread(
+                encode_columnar_sheet,
+                sheet_id, names[sheet_id - 1], ir,
+                row_offset, row_limit, col_offset, col_limit, binary
+            )
+            data["task_id"] = str(task.task_id)
+            data["version"] = version
+            
+            return True, f"成功获取第 {row_offset + 1}~{row_offset + data['window_rows']} 行", data
+            
+        except Exception as e:
+            logger.error(f"获取表格窗口数据失败: {e}", exc_info=True)
+            return False, f"获取表格窗口数据失败: {str(e)}", None
+    
     @staticmethod
     async def get_table_metadata(task_id: UUID) -> Tuple[bool, str, Optional[TableMetadata]]:
         """
@@ -278,88 +799,198 @@ class TableService:
         if not task.ocr_json_path or not Path(task.ocr_json_path).exists():
             return False, f"OCR JSON 文件不存在", None
         
-        # 4. 提取表格元数据
+        # 4. 提取表格元数据（编辑过的任务取编辑状态中的名称与形状，否则使用形状索引）
         try:
-            sheets = TableService.extract_tables_from_ocr_json(task.ocr_json_path)
-            
-            if not sheets:
+            state = await TableService.load_edit_state(task_id, task.ocr_json_path)
+            if state is not None:
+                names = state.names
+                shapes = [(ir.n_rows, ir.n_cols) for ir in state.irs]
+            else:
+                shapes = await TableService.load_table_shapes(task_id, task.ocr_json_path)
+                names = [f"Table_{sheet_id}" for sheet_id in range(1, len(shapes) + 1)]
+            
+            if not shapes:
                 return False, "未找到表格数据", None
             
             # 构建轻量级元数据
             sheets_info = [
                 {
-                    "sheet_id": sheet.sheet_id,
-                    "sheet_name": sheet.sheet_name,
-                    "rows": sheet.rows,
-                    "cols": sheet.cols
+                    "sheet_id": sheet_id,
+                    "sheet_name": name,
+                    "rows": rows,
+                    "cols": cols
                 }
-                for sheet in sheets
+                for sheet_id, (name, (rows, cols)) in enumerate(zip(names, shapes), start=1)
             ]
             
             metadata = TableMetadata(
                 task_id=str(task.task_id),
                 status=task.status.value,
-                total_sheets=len(sheets),
+                total_sheets=len(shapes),
                 sheets_info=sheets_info
             )
             
-            return True, f"成功获取 {len(sheets)} 个表格元数据", metadata
+            return True, f"成功获取 {len(shapes)} 个表格元数据", metadata
             
         except Exception as e:
             logger.error(f"获取表格元数据失败: {e}", exc_info=True)
             return False, f"获取表格元数据失败: {str(e)}", None
     
     @staticmethod
-    async def save_table_data(task_id: UUID, table_data: TableDataResponse) -> Tuple[bool, str]:
+    async def save_table_data(
+        task_id: UUID,
+        table_data: TableDataResponse,
+        base_version: Optional[int] = None
+    ) -> Tuple[bool, str, Optional[int]]:
         """
         保存编辑后的表格数据
         
-        将编辑后的数据保存到文件，并重新生成 Excel
+        将编辑后的数据保存到文件（整表快照，版本号递增）；Excel 在下次下载时按新版本生成
         
         Args:
             task_id: 任务 ID
             table_data: 编辑后的表格数据
+            base_version: 数据所基于的版本号，与当前版本不一致时拒绝保存（与增量保存相同）；
+                None 表示不校验（兼容未携带版本号的旧客户端）
             
         Returns:
-            (成功标志, 消息)
+            (成功标志, 消息, 保存后的版本号)
+            
+        Raises:
+            TableVersionConflictError: base_version 与当前版本不一致
         """
-        from app.services.excel_service import ExcelService
-        
         # 1. 获取任务
         task = await TaskService.get_task(task_id)
         if not task:
-            return False, f"任务不存在: {task_id}"
+            return False, f"任务不存在: {task_id}", None
         
-        # 2. 保存编辑后的数据到文件（JSON 格式）
-        try:
-            edited_data_dir = Path(settings.data_dir) / "edited"
-            edited_data_dir.mkdir(parents=True, exist_ok=True)
-            
-            edited_json_path = edited_data_dir / f"{task_id}_edited.json"
+        store = get_table_edit_store()
+        async with store.lock(task_id):
+            # 2. 检查版本（未编辑过的任务版本为 0）
+            fingerprint = None
+            current_version = 0
+            if task.ocr_json_path:
+                fingerprint = get_table_cache().fingerprint(task.ocr_json_path)
+                current = await TableService.load_edit_state(task_id, task.ocr_json_path)
+                current_version = current.version if current else 0
+            if base_version is not None and base_version != current_version:
+                raise TableVersionConflictError(current_version, base_version)
+            
+            # 3. 保存编辑后的数据（整表快照，版本号递增）
+            try:
+                irs = await asyncio.to_thread(
+                    lambda: [TableService.cells_to_ir(sheet.data) for sheet in table_data.sheets]
+                )
+                state = EditedTables(
+                    version=current_version + 1,
+                    fingerprint=fingerprint,
+                    names=[sheet.sheet_name for sheet in table_data.sheets],
+                    irs=irs
+                )
+                await asyncio.to_thread(store.write_snapshot, task_id, state)
+                store.put(task_id, state)
+                
+                logger.info(f"保存编辑数据: task_id={task_id}, version={state.version}")
+                
+            except Exception as e:
+                store.discard(task_id)
+                logger.error(f"保存编辑数据失败: {e}", exc_info=True)
+                return False, f"保存编辑数据失败: {str(e)}", None
             
-            # 将 TableDataResponse 转换为字典并保存
-            with open(edited_json_path, 'w', encoding='utf-8') as f:
-                json.dump(table_data.model_dump(), f, ensure_ascii=False, indent=2)
+            return True, "保存成功", state.version
+    
+    @staticmethod
+    async def patch_table_data(
+        task_id: UUID,
+        patch: TablePatchRequest,
+        generate_excel: bool = False
+    ) -> Tuple[bool, str, Optional[TablePatchResult]]:
+        """
+        增量保存表格修改（单元格区域 diff）
+        
+        只替换受影响 Sheet 的中间表示，修改追加到增量日志，写入量与修改量成正比
+        
+        Args:
+            task_id: 任务 ID
+            patch: 修改请求（base_version 必须等于当前版本）
+            generate_excel: 是否立即生成 Excel（默认在下载时按需生成）
             
-            logger.info(f"保存编辑数据到: {edited_json_path}")
+        Returns:
+            (成功标志, 消息, 修改结果)
             
-        except Exception as e:
-            logger.error(f"保存编辑数据失败: {e}", exc_info=True)
-            return False, f"保存编辑数据失败: {str(e)}"
+        Raises:
+            TableVersionConflictError: base_version 与当前版本不一致
+        """
+        from app.services.excel_service import ExcelService
         
-        # 3. 从编辑后的数据重新生成 Excel
-        try:
-            success, message, excel_path = await ExcelService.generate_excel_from_table_data(
-                task_id, table_data
-            )
-            
-            if not success:
-                return False, f"重新生成 Excel 失败: {message}"
+        # 1. 获取任务
+        task = await TaskService.get_task(task_id)
+        if not task:
+            return False, f"任务不存在: {task_id}", None
+        
+        if not task.ocr_json_path or not Path(task.ocr_json_path).exists():
+            return False, f"OCR JSON 文件不存在: {task.ocr_json_path}", None
+        
+        edits = TableService.flatten_patches(patch.patches)
+        if not edits:
+            return False, "没有需要保存的修改", None
+        
+        store = get_table_edit_store()
+        async with store.lock(task_id):
+            # 2. 检查版本（未编辑过的任务版本为 0，以 OCR 结果为初始状态）
+            state = await TableService.load_edit_state(task_id, task.ocr_json_path)
+            current_version = state.version if state else 0
+            if patch.base_version != current_version:
+                raise TableVersionConflictError(current_version, patch.base_version)
+            
+            if state is None:
+                cached = await TableService.load_cached_tables(task_id, task.ocr_json_path)
+                if not cached or not cached.irs:
+                    return False, "未找到表格数据", None
+                state = EditedTables(
+                    version=0,
+                    fingerprint=cached.fingerprint,
+                    names=[f"Table_{sheet_id}" for sheet_id in range(1, len(cached.irs) + 1)],
+                    irs=list(cached.irs)
+                )
             
-            logger.info(f"成功重新生成 Excel: {excel_path}")
+            # 3. 应用修改（校验失败时状态不变）
+            try:
+                sheet_indexes = state.apply(edits)
+            except ValueError as e:
+                return False, str(e), None
+            state.version += 1
+            
+            # 4. 追加增量日志
+            try:
+                await asyncio.to_thread(store.append, task_id, state, edits)
+            except Exception as e:
+                store.discard(task_id)
+                logger.error(f"保存表格修改失败: {e}", exc_info=True)
+                return False, f"保存表格修改失败: {str(e)}", None
+            store.put(task_id, state)
+            
+            logger.info(
+                f"增量保存表格: task_id={task_id}, version={state.version}, "
+                f"cells={len(edits)}, sheets={[idx + 1 for idx in sheet_indexes]}"
+            )
             
-            return True, "保存成功，Excel 已更新"
+            result = TablePatchResult(
+                task_id=str(task_id),
+                version=state.version,
+                updated_sheets=[idx + 1 for idx in sheet_indexes],
+                updated_cells=len(edits)
+            )
             
-        except Exception as e:
-            logger.error(f"重新生成 Excel 失败: {e}", exc_info=True)
-            return False, f"重新生成 Excel 失败: {str(e)}"
\ No newline at end of file
+        # 5. 立即生成 Excel（可选；ensure_excel 读取最新版本，在编辑锁外执行，不阻塞后续保存）
+        if not generate_excel:
+            return True, "保存成功", result
+        
+        try:
+            success, message, _ = await ExcelService.ensure_excel(task_id)
+        except ExcelPoolBusyError as e:
+            success, message = False, str(e)
+        if not success:
+            return True, f"保存成功，但生成 Excel 失败: {message}", result
+        
+        return True, "保存成功，Excel 已更新", result
@@ -0,0 +1,205 @@
+"""
+跨页 / 跨块表格拼接
+OCR 常把一个逻辑表格按页面（或版面块）拆成多个表格块，导出时每个片段各占一个 Sheet。
+拼接阶段按顺序检查每个片段是否是上一个表格的续表，是则纵向拼接为一个表格：
+
+- 列数必须一致
+- 表头：片段首行与表格首行相同视为重复表头（拼接时去掉）；片段首行是与之不同的表头（<th>）则是新表格
+- 位置（有 bbox 时）：上一片段位于页面底部、当前片段位于下一页顶部，或同一页内上下紧邻；
+  没有 bbox 时只有重复表头才判定为续表
+
+每个片段只与当前未结束的表格比较一次，整个表格拼接完成时一次性合并，
+总耗时与片段数、单元格数成线性关系；输入输出都是迭代器，可用于逐页的流式生成
+"""
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.services.ocr_store import TableBlock
+from app.services.table_ir import TableIR, concat_table_irs, scan_table_shape
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# 同一页内的两个片段在水平方向上至少重叠较窄者宽度的比例
+MIN_HORIZONTAL_OVERLAP = 0.5
+
+
+class TableFragment(NamedTuple):
+    """表格片段"""
+    ir: TableIR
+    page: int                                          # 页序号（多个 OCR 结果合并时连续编号）
+    bbox: Optional[Tuple[float, float, float, float]]  # (x0, y0, x1, y1)
+    page_height: Optional[float]
+    label: Any = None                                  # 调用方附带的信息（默认为表格序号），拼接结果使用第一个片段的 label
+
+
+def first_row_signature(ir: TableIR) -> Tuple[str, ...]:
+    """首行各位置的文本（忽略空白），用于识别重复表头"""
+    grid = ir.grid
+    return tuple(
+        ''.join(ir.texts[cell_id].split()) if cell_id >= 0 else ''
+        for cell_id in grid[:ir.n_cols]
+    )
+
+
+def first_row_is_header(ir: TableIR) -> bool:
+    """首行是否包含表头单元格（<th>）"""
+    return any(cell_id >= 0 and ir.headers[cell_id] for cell_id in ir.grid[:ir.n_cols])
+
+
+def first_row_is_separable(ir: TableIR) -> bool:
+    """首行的单元格是否都不跨到第二行（可以整行去掉）"""
+    return all(cell_id < 0 or ir.rowspans[cell_id] == 1 for cell_id in ir.grid[:ir.n_cols])
+
+
+def is_adjacent(
+    prev: TableFragment,
+    cur: TableFragment,
+    edge_ratio: float,
+    gap_ratio: float
+) -> Optional[bool]:
+    """
+    根据版面位置判断 cur 是否紧接在 prev 之后
+
+    Returns:
+        是否相邻；缺少 bbox 或页面高度时返回 None（无法判断）
+    """
+    if prev.bbox is None or cur.bbox is None or not prev.page_height or not cur.page_height:
+        return None
+
+    if cur.page == prev.page + 1:
+        # 上一片段到达页面底部，当前片段从下一页顶部开始
+        return (
+            prev.bbox[3] >= (1 - edge_ratio) * prev.page_height
+            and cur.bbox[1] <= edge_ratio * cur.page_height
+        )
+
+    if cur.page == prev.page:
+        # 同一页内上下紧邻，且水平方向重叠
+        gap = cur.bbox[1] - prev.bbox[3]
+        if not -gap_ratio * cur.page_height <= gap <= gap_ratio * cur.page_height:
+            return False
+        overlap = min(prev.bbox[2], cur.bbox[2]) - max(prev.bbox[0], cur.bbox[0])
+        narrower = min(prev.bbox[2] - prev.bbox[0], cur.bbox[2] - cur.bbox[0])
+        return narrower > 0 and overlap >= MIN_HORIZONTAL_OVERLAP * narrower
+
+    return False
+
+
+def continuation_skip_rows(
+    header: Tuple[str, ...],
+    last: TableFragment,
+    cur: TableFragment,
+    edge_ratio: float,
+    gap_ratio: float
+) -> Optional[int]:
+    """
+    判断 cur 是否为当前表格的续表
+
+    Args:
+        header: 当前表格首行的签名
+        last: 当前表格的最后一个片段
+
+    Returns:
+        续表时返回拼接时需要跳过的起始行数（重复表头为 1），不是续表时返回 None
+    """
+    if cur.ir.n_cols != last.ir.n_cols:
+        return None
+
+    repeated_header = any(header) and first_row_signature(cur.ir) == header
+    if not repeated_header and first_row_is_header(cur.ir):
+        return None
+
+    adjacent = is_adjacent(last, cur, edge_ratio, gap_ratio)
+    if adjacent is False or (adjacent is None and not repeated_header):
+        return None
+
+    return 1 if repeated_header and first_row_is_separable(cur.ir) else 0
+
+
+def stitch_fragments(
+    fragments: Iterable[TableFragment],
+    edge_ratio: Optional[float] = None,
+    gap_ratio: Optional[float] = None
+) -> Iterator[Tuple[Any, TableIR]]:
+    """
+    拼接续表（流式：只保留当前未结束的表格的片段）
+
+    Args:
+        fragments: 按版面顺序排列的非空表格片段
+        edge_ratio: 页面顶部 / 底部区域占页面高度的比例，默认使用配置
+        gap_ratio: 同一页内片段的最大间距占页面高度的比例，默认使用配置
+
+    Yields:
+        (第一个片段的 label, 拼接后的表格)
+    """
+    if edge_ratio is None:
+        edge_ratio = settings.table_stitch_edge_ratio
+    if gap_ratio is None:
+        gap_ratio = settings.table_stitch_gap_ratio
+
+    group: List[Tuple[TableFragment, int]] = []
+    header: Tuple[str, ...] = ()
+
+    for fragment in fragments:
+        if group:
+            skip_rows = continuation_skip_rows(header, group[-1][0], fragment, edge_ratio, gap_ratio)
+            if skip_rows is not None:
+                group.append((fragment, skip_rows))
+                continue
+            yield _flush(group)
+
+        group = [(fragment, 0)]
+        header = first_row_signature(fragment.ir)
+
+    if group:
+        yield _flush(group)
+
+
+def _flush(group: List[Tuple[TableFragment, int]]) -> Tuple[Any, TableIR]:
+    first = group[0][0]
+    if len(group) == 1:
+        return first.label, first.ir
+    return first.label, concat_table_irs([(fragment.ir, skip_rows) for fragment, skip_rows in group])
+
+
+def blocks_to_fragments(
+    blocks: List[TableBlock],
+    parse,
+    page_base: int = 0
+) -> List[TableFragment]:
+    """
+    解析表格块为片段（跳过空表格），label 为表格块序号
+
+    Args:
+        blocks: load_table_blocks 返回的表格块
+        parse: HTML → TableIR 的解析函数
+        page_base: 页序号偏移（多个 OCR 结果合并时使用）
+    """
+    fragments = []
+    for table_idx, block in enumerate(blocks):
+        ir = parse(block.html)
+        if not ir.is_empty:
+            fragments.append(TableFragment(ir, page_base + block.page_idx, block.bbox, block.page_height, table_idx))
+    return fragments
+
+
+def align_edited_fragments(
+    blocks: List[TableBlock],
+    irs: List[TableIR],
+    page_base: int = 0
+) -> List[TableFragment]:
+    """
+    为编辑后的表格补充版面位置（跳过空表格），label 为表格序号
+
+    编辑状态中的表格与 OCR 结果中的非空表格块一一对应（见 TableService.extract_table_irs），
+    非空判断只扫描形状、不解析；数量对不上时不使用位置信息（只按重复表头拼接）
+    """
+    positioned = [block for block in blocks if min(scan_table_shape(block.html)) > 0]
+    if len(positioned) != len(irs):
+        positioned = [None] * len(irs)
+    return [
+        TableFragment(ir, page_base + block.page_idx, block.bbox, block.page_height, table_idx)
+        if block is not None else TableFragment(ir, page_base, None, None, table_idx)
+        for table_idx, (block, ir) in enumerate(zip(positioned, irs))
+        if not ir.is_empty
+    ]
@@ -7,6 +7,9 @@ from uuid import UUID, uuid4
 from app.models.task import Task, TaskStatus
 from app.schemas.task import TaskCreate, TaskUpdate
 
+# OCR 结果可用（可预览、编辑、导出）的任务状态
+OCR_RESULT_STATUSES = (TaskStatus.OCR_DONE, TaskStatus.EXCEL_GENERATED, TaskStatus.EDITABLE)
+
 
 class TaskService:
     """任务服务类"""
@@ -65,6 +68,19 @@ class TaskService:
         
         return tasks, total
     
+    @staticmethod
+    async def get_task_ids_by_status(statuses: List[TaskStatus]) -> List[UUID]:
+        """
+        按状态获取任务 ID 列表（按创建时间升序）
+        
+        Args:
+            statuses: 状态列表
+            
+        Returns:
+            List[UUID]: 任务 ID 列表
+        """
+        return await Task.filter(status__in=statuses).order_by("created_at").values_list("task_id", flat=True)
+    
     @staticmethod
     async def update_task(task_id: UUID, update_data: TaskUpdate) -> Optional[Task]:
         """
@@ -4,13 +4,17 @@
 from pathlib import Path
 from typing import Optional
 from uuid import UUID
+import hashlib
 import aiofiles
 from fastapi import UploadFile
 
+from app.clients.ocr_client import get_ocr_client
 from app.core.config import get_settings
 from app.core.logging import logger
 from app.services.task_service import TaskService
+from app.services.dedup_service import DedupService
 from app.models.task import TaskStatus
+from app.utils.metrics import track_performance
 
 
 settings = get_settings()
@@ -23,22 +27,25 @@ class UploadService:
     ALLOWED_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp"}
     
     @staticmethod
-    def get_image_storage_path(task_id: UUID, file_extension: str) -> Path:
+    def get_stored_image_path(storage_path: Path) -> str:
         """
-        获取图片存储路径
+        获取写入任务表的图片路径
         
-        存储规则：data/images/{task_id}.{ext}
+        存储绝对路径，但如果可能则转换为相对于项目根目录的路径
         
         Args:
-            task_id: 任务 ID
-            file_extension: 文件扩展名（包含点，如 .png）
+            storage_path: 图片存储的完整路径
             
         Returns:
-            Path: 图片存储的完整路径
+            str: 相对路径（无法计算时为绝对路径）
         """
-        images_dir = settings.data_paths["images"]
-        filename = f"{task_id}{file_extension}"
-        return Path(images_dir) / filename
+        try:
+            # 尝试获取相对于项目根目录的路径
+            project_root = Path.cwd().parent if Path.cwd().name == "backend" else Path.cwd()
+            return str(storage_path.relative_to(project_root))
+        except ValueError:
+            # 如果无法计算相对路径，使用绝对路径
+            return str(storage_path.absolute())
     
     @staticmethod
     def validate_image_file(file: UploadFile) -> tuple[bool, Optional[str]]:
@@ -76,6 +83,8 @@ class UploadService:
         """
         保存上传的图片文件
         
+        存储规则：data/images/{sha256}.{ext}，内容相同的图片共用一个文件
+        
         Args:
             task_id: 任务 ID
             file: 上传的文件对象
@@ -92,32 +101,31 @@ class UploadService:
             # 获取文件扩展名
             file_extension = Path(file.filename).suffix.lower()
             
-            # 确定存储路径
-            storage_path = UploadService.get_image_storage_path(task_id, file_extension)
+            # 先写入临时文件，同时计算内容哈希
+            temp_path = DedupService.get_upload_temp_path(task_id, file_extension)
+            temp_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # 确保目录存在
-            storage_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 异步保存文件
-            file_size = 0
-            async with aiofiles.open(storage_path, 'wb') as f:
-                while chunk := await file.read(8192):  # 8KB chunks
-                    await f.write(chunk)
-                    file_size += len(chunk)
+            with track_performance("upload_save") as span:
+                # 异步保存文件
+                file_size = 0
+                hasher = hashlib.sha256()
+                async with aiofiles.open(temp_path, 'wb') as f:
+                    while chunk := await file.read(settings.upload_chunk_size):
+                        await f.write(chunk)
+                        hasher.update(chunk)
+                        file_size += len(chunk)
+                span['bytes'] = file_size
+                
+                # 验证文件是否保存成功
+                if not temp_path.exists():
+                    return False, "文件保存失败", None
+                
+                # 按内容寻址存储（相同图片只保存一份）
+                storage_path = await DedupService.commit_blob(
+                    temp_path, hasher.hexdigest(), file_extension, file_size
+                )
             
-            # 验证文件是否保存成功
-            if not storage_path.exists():
-                return False, "文件保存失败", None
-            
-            # 构造相对路径（使用绝对路径以避免路径问题）
-            # 存储绝对路径，但如果可能则转换为相对路径
-            try:
-                # 尝试获取相对于项目根目录的路径
-                project_root = Path.cwd().parent if Path.cwd().name == "backend" else Path.cwd()
-                relative_path = str(storage_path.relative_to(project_root))
-            except ValueError:
-                # 如果无法计算相对路径，使用绝对路径
-                relative_path = str(storage_path.absolute())
+            relative_path = UploadService.get_stored_image_path(storage_path)
             
             # 格式化文件大小
             size_info = UploadService.format_file_size(file_size)
@@ -183,6 +191,110 @@ class UploadService:
         
         return True, message
     
+    @staticmethod
+    async def upload_and_start_ocr(
+        task_id: UUID,
+        file: UploadFile
+    ) -> tuple[bool, str]:
+        """
+        上传图片并同时创建 OCR 任务（一站式服务）
+        
+        上传内容按块同时写入 data/images 与 OCR 服务的 multipart 请求，并在同一次读取中计算内容哈希，
+        图片无需落盘后再读取一遍。转发失败时图片仍完整保存，任务保持 uploaded 状态，
+        由后台任务池按原流程从磁盘重新创建 OCR job。
+        内容哈希在上传结束后才能确定：相同图片已有 OCR 结果或正在识别时忽略已创建的 OCR job
+        （OCR 服务没有取消接口），由后台任务池复用已有结果 / 共用处理中的 job；
+        图片已存在但没有可复用的结果时，仍使用本次创建的 OCR job
+        
+        Args:
+            task_id: 任务 ID
+            file: 上传的文件对象
+            
+        Returns:
+            tuple: (是否成功, 消息)
+        """
+        # 1. 检查任务是否存在
+        task = await TaskService.get_task(task_id)
+        if not task:
+            return False, f"任务不存在: {task_id}"
+        
+        # 2. 验证文件
+        is_valid, error_msg = UploadService.validate_image_file(file)
+        if not is_valid:
+            return False, error_msg
+        
+        file_extension = Path(file.filename).suffix.lower()
+        chunk_size = settings.upload_chunk_size
+        
+        # 3. 边保存边转发到 OCR 服务，同时计算内容哈希
+        temp_path = DedupService.get_upload_temp_path(task_id, file_extension)
+        temp_path.parent.mkdir(parents=True, exist_ok=True)
+        file_size = 0
+        hasher = hashlib.sha256()
+        try:
+            async with aiofiles.open(temp_path, 'wb') as f:
+                async def tee():
+                    nonlocal file_size
+                    while chunk := await file.read(chunk_size):
+                        await f.write(chunk)
+                        hasher.update(chunk)
+                        file_size += len(chunk)
+                        yield chunk
+                
+                chunks = tee()
+                success, job_id, ocr_error = await get_ocr_client().create_job_from_stream(
+                    f"{task_id}{file_extension}",
+                    chunks,
+                    content_type=file.content_type or 'image/png',
+                    size=file.size
+                )
+                await chunks.aclose()
+                
+                # 转发中断时把剩余内容写完
+                while chunk := await file.read(chunk_size):
+                    await f.write(chunk)
+                    hasher.update(chunk)
+                    file_size += len(chunk)
+            
+            # 4. 上传结束后按内容哈希去重
+            content_hash = hasher.hexdigest()
+            storage_path = await DedupService.commit_blob(temp_path, content_hash, file_extension, file_size)
+        except Exception as e:
+            temp_path.unlink(missing_ok=True)
+            logger.error(f"保存图片失败: task_id={task_id}, error={str(e)}")
+            return False, f"保存失败: {str(e)}"
+        
+        relative_path = UploadService.get_stored_image_path(storage_path)
+        size_info = UploadService.format_file_size(file_size)
+        
+        # 5. 更新任务信息
+        task.image_path = relative_path
+        reused_json_path = await DedupService.find_ocr_result(relative_path)
+        inflight_job_id = None if reused_json_path else await DedupService.find_inflight_job(task)
+        if reused_json_path or inflight_job_id:
+            # 相同图片已有结果或正在识别：忽略刚创建的 OCR job，由后台任务池复用已有结果 / 共用 job
+            task.status = TaskStatus.UPLOADED
+            await task.save()
+            logger.info(
+                f"图片内容已存在，复用: task_id={task_id}, hash={content_hash}, "
+                f"忽略 OCR job: {job_id if success else '-'}"
+            )
+            return True, f"图片已存在，复用: {relative_path}"
+        
+        logger.info(f"图片保存成功: task_id={task_id}, path={relative_path}, size={size_info}")
+        if success:
+            task.ocr_job_id = job_id
+            task.status = TaskStatus.OCR_PROCESSING
+            task.error_message = None
+            message = f"图片上传成功，OCR 任务已创建，job_id: {job_id}"
+        else:
+            task.status = TaskStatus.UPLOADED
+            logger.warning(f"上传时创建 OCR 任务失败，将从磁盘重试: task_id={task_id}, error={ocr_error}")
+            message = f"图片上传成功，已保存到: {relative_path}"
+        await task.save()
+        
+        return True, f"{message}，大小: {size_info}"
+    
     @staticmethod
     def delete_image(image_path: str) -> bool:
         """
@@ -0,0 +1,182 @@
+"""
+文件下载响应
+在 FileResponse 的基础上补充缓存校验与断点续传：
+- 强 ETag：文件内容的 SHA-256，按 (路径, mtime, 大小) 缓存，文件不变时不重复计算
+- If-None-Match 命中时返回 304，不传输文件内容
+- Range（单个区间）返回 206，If-Range 与当前 ETag 不一致时返回完整文件
+- Cache-Control 由调用方指定
+"""
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+# 读取文件（计算哈希 / 发送区间）的分块大小
+CHUNK_SIZE = 64 * 1024
+
+# 最多缓存的文件 ETag 数
+ETAG_CACHE_ENTRIES = 256
+
+_etag_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+
+def compute_file_etag(path: Path) -> str:
+    """计算文件内容的强 ETag（SHA-256 前 32 位十六进制，带引号）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+async def get_file_etag(path: Path, stat_result: os.stat_result) -> str:
+    """
+    获取文件的 ETag（命中缓存时不读取文件，未命中时在线程中计算）
+    """
+    key = (str(path), stat_result.st_mtime_ns, stat_result.st_size)
+    etag = _etag_cache.get(key)
+    if etag is not None:
+        _etag_cache.move_to_end(key)
+        return etag
+
+    etag = await asyncio.to_thread(compute_file_etag, path)
+    _etag_cache[key] = etag
+    while len(_etag_cache) > ETAG_CACHE_ENTRIES:
+        _etag_cache.popitem(last=False)
+    return etag
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否匹配（弱比较：忽略 W/ 前缀）"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [item.strip() for item in header.split(',')]
+    return any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析 Range 头（只支持单个字节区间）
+
+    Returns:
+        (起始字节, 结束字节)（闭区间）；没有 Range、格式无法识别或包含多个区间时返回 None（返回完整文件）
+
+    Raises:
+        ValueError: 区间超出文件范围（416）
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[len('bytes='):].strip()
+    if ',' in spec or '-' not in spec:
+        return None
+
+    start_text, end_text = (part.strip() for part in spec.split('-', 1))
+    if not start_text.isdigit() and start_text != '':
+        return None
+    if not end_text.isdigit() and end_text != '':
+        return None
+
+    if start_text == '':
+        # bytes=-N：最后 N 个字节
+        if end_text == '' or int(end_text) == 0:
+            raise ValueError(header)
+        length = int(end_text)
+        return max(size - length, 0), size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+async def _iter_file_range(path: Path, start: int, end: int):
+    async with aiofiles.open(path, 'rb') as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def file_download_response(
+    request: Request,
+    path: Path,
+    filename: str,
+    media_type: str,
+    cache_control: str
+) -> Response:
+    """
+    构建文件下载响应（200 / 206 / 304 / 416）
+
+    Args:
+        request: 当前请求（读取 If-None-Match / Range / If-Range）
+        path: 文件路径
+        filename: 下载文件名
+        media_type: 文件类型
+        cache_control: Cache-Control 响应头
+    """
+    stat_result = await asyncio.to_thread(os.stat, path)
+    size = stat_result.st_size
+    etag = await get_file_etag(path, stat_result)
+    headers: Dict[str, str] = {
+        'etag': etag,
+        'cache-control': cache_control,
+        'accept-ranges': 'bytes',
+    }
+
+    # 1. 缓存校验：文件未变化时不传输内容
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    # 2. 区间请求（If-Range 不匹配时忽略 Range，返回完整文件）
+    byte_range = None
+    if_range = request.headers.get('if-range')
+    if not if_range or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get('range'), size)
+        except ValueError:
+            headers['content-range'] = f'bytes */{size}'
+            return Response(status_code=416, headers=headers)
+
+    if byte_range is not None:
+        start, end = byte_range
+        headers.update({
+            'content-range': f'bytes {start}-{end}/{size}',
+            'content-length': str(end - start + 1),
+            'content-disposition': _content_disposition(filename),
+        })
+        return StreamingResponse(
+            _iter_file_range(path, start, end),
+            status_code=206,
+            media_type=media_type,
+            headers=headers
+        )
+
+    # 3. 完整文件
+    return FileResponse(
+        path=str(path),
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result
+    )
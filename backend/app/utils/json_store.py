@@ -0,0 +1,103 @@
+"""
+JSON 文件存储工具模块
+OCR JSON、编辑数据、表格缓存等 JSON 文件的统一读写入口：
+- 紧凑序列化（无缩进），已安装 orjson 时优先使用（可通过配置 json_use_orjson 关闭）
+- 写入先写同目录下唯一命名的临时文件再原子替换，读取方不会看到写了一半的文件，
+  并发写入同一目标时也不会互相覆盖临时文件
+- 读写均为同步函数，协程中由调用方通过 asyncio.to_thread 执行，不阻塞事件循环
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Union
+
+from app.core.config import get_settings
+from app.core.logging import logger
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+settings = get_settings()
+
+PathLike = Union[str, Path]
+
+
+def _use_orjson() -> bool:
+    return orjson is not None and settings.json_use_orjson
+
+
+def dumps(data: Any) -> bytes:
+    """
+    紧凑序列化为 UTF-8 字节（非 ASCII 字符不转义）
+    """
+    if _use_orjson():
+        try:
+            return orjson.dumps(data)
+        except TypeError as e:
+            # orjson 不支持的数据（如超过 64 位的整数）回退到标准库
+            logger.warning(f"orjson 序列化失败，回退到 json: {str(e)}")
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(raw: Union[bytes, str]) -> Any:
+    """
+    反序列化 JSON 字节或字符串
+    """
+    if _use_orjson():
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def read_json(path: PathLike) -> Any:
+    """
+    读取 JSON 文件
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        解析后的数据
+    """
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def write_bytes_atomic(path: PathLike, raw: bytes) -> int:
+    """
+    写入文件（同目录下唯一命名的临时文件 + 原子替换）
+
+    Args:
+        path: 文件路径
+        raw: 文件内容
+
+    Returns:
+        int: 写入的字节数
+    """
+    path = Path(path)
+    f = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{path.name}.", suffix='.tmp', delete=False)
+    try:
+        with f:
+            f.write(raw)
+        os.replace(f.name, path)
+    except BaseException:
+        Path(f.name).unlink(missing_ok=True)
+        raise
+    return len(raw)
+
+
+def write_json(path: PathLike, data: Any) -> int:
+    """
+    写入 JSON 文件（临时文件 + 原子替换）
+
+    Args:
+        path: 文件路径
+        data: 要写入的数据
+
+    Returns:
+        int: 写入的字节数
+    """
+    return write_bytes_atomic(path, dumps(data))
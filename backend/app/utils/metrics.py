@@ -1,13 +1,24 @@
 """
 性能监控和指标收集模块
+
+热路径上的各阶段（上传保存、OCR 请求、HTML 解析、合并单元格展开、工作簿构建与保存等）
+用 track_performance 记录为带尺寸信息（bytes / rows / cols / merges 等）的 span：
+- 全局累计到 MetricsCollector（/api/v1/tasks/metrics/summary）
+- 当前上下文开启了 collect_spans 时（调试模式下的请求剖析、Excel 生成子进程）同时追加到 span 列表
 """
+import logging
 import time
-from typing import Dict, Any, Optional
+from contextvars import ContextVar
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 from contextlib import contextmanager
 from collections import defaultdict
 from datetime import datetime
 
-from app.core.logging import logger
+# 不使用 app.core.logging：本模块会被 Excel 生成子进程导入，子进程中不应重复配置日志文件
+logger = logging.getLogger(__name__)
+
+# 当前上下文收集的 span（None 表示不收集）；asyncio.to_thread 会复制上下文，线程中的 span 同样会被收集
+_current_spans: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar('current_spans', default=None)
 
 
 class MetricsCollector:
@@ -20,6 +31,7 @@ class MetricsCollector:
             'min_time': float('inf'),
             'max_time': 0.0,
             'errors': 0,
+            'sizes': {},
             'last_updated': None
         })
     
@@ -27,7 +39,8 @@ class MetricsCollector:
         self,
         operation: str,
         duration: float,
-        success: bool = True
+        success: bool = True,
+        sizes: Optional[Dict[str, Any]] = None
     ):
         """
         记录操作指标
@@ -36,6 +49,7 @@ class MetricsCollector:
             operation: 操作名称
             duration: 操作耗时（秒）
             success: 是否成功
+            sizes: 尺寸信息（如 bytes / rows / cols），数值项累加
         """
         metric = self._metrics[operation]
         metric['count'] += 1
@@ -44,15 +58,22 @@ class MetricsCollector:
         metric['max_time'] = max(metric['max_time'], duration)
         if not success:
             metric['errors'] += 1
+        if sizes:
+            totals = metric['sizes']
+            for key, value in sizes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] = totals.get(key, 0) + value
         metric['last_updated'] = datetime.now()
         
-        # 记录到日志
-        status = "成功" if success else "失败"
-        logger.info(
-            f"[指标] {operation} - {status} | "
-            f"耗时: {duration:.3f}s | "
-            f"累计: {metric['count']}次"
-        )
+        # 记录到日志（热路径上调用频繁，只在 DEBUG 级别输出）
+        if logger.isEnabledFor(logging.DEBUG):
+            status = "成功" if success else "失败"
+            logger.debug(
+                f"[指标] {operation} - {status} | "
+                f"耗时: {duration:.3f}s | "
+                f"尺寸: {format_sizes(sizes)} | "
+                f"累计: {metric['count']}次"
+            )
     
     def get_metrics(self, operation: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -80,6 +101,7 @@ class MetricsCollector:
                 'avg_time': f"{avg_time:.3f}s",
                 'min_time': f"{metric['min_time']:.3f}s",
                 'max_time': f"{metric['max_time']:.3f}s",
+                'sizes': dict(metric['sizes']),
                 'last_updated': metric['last_updated'].isoformat() if metric['last_updated'] else None
             }
         else:
@@ -96,6 +118,7 @@ class MetricsCollector:
                     'avg_time': f"{avg_time:.3f}s",
                     'min_time': f"{metric['min_time']:.3f}s",
                     'max_time': f"{metric['max_time']:.3f}s",
+                    'sizes': dict(metric['sizes']),
                     'last_updated': metric['last_updated'].isoformat() if metric['last_updated'] else None
                 }
             
@@ -124,24 +147,98 @@ def get_metrics_collector() -> MetricsCollector:
     return _metrics_collector
 
 
+def format_sizes(sizes: Optional[Dict[str, Any]]) -> str:
+    """尺寸信息格式化为 "k=v k=v"（用于日志与 Server-Timing）"""
+    if not sizes:
+        return "-"
+    return " ".join(f"{key}={value}" for key, value in sizes.items())
+
+
+def record_span(
+    operation: str,
+    duration: float,
+    success: bool = True,
+    sizes: Optional[Dict[str, Any]] = None
+):
+    """
+    记录一个 span：累计到全局指标，当前上下文正在收集时同时追加到 span 列表
+    """
+    _metrics_collector.record_operation(operation, duration, success, sizes)
+    spans = _current_spans.get()
+    if spans is not None:
+        spans.append({
+            'name': operation,
+            'duration': duration,
+            'success': success,
+            'sizes': sizes or {}
+        })
+
+
+def replay_spans(spans: Iterable[Dict[str, Any]]):
+    """记录在其他进程中收集的 span（Excel 生成子进程返回）"""
+    for span in spans:
+        record_span(span['name'], span['duration'], span['success'], span['sizes'])
+
+
+def summarize_spans(spans: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    按名称汇总 span（保持首次出现的顺序）
+
+    Returns:
+        {名称: {'duration': 总耗时（秒）, 'count': 次数, 'sizes': 数值尺寸累加，其余取首个值}}
+    """
+    summary: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        entry = summary.setdefault(span['name'], {'duration': 0.0, 'count': 0, 'sizes': {}})
+        entry['duration'] += span['duration']
+        entry['count'] += 1
+        totals = entry['sizes']
+        for key, value in span['sizes'].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+            else:
+                totals.setdefault(key, value)
+    return summary
+
+
 @contextmanager
-def track_performance(operation: str):
+def collect_spans() -> Iterator[List[Dict[str, Any]]]:
+    """
+    在当前上下文中收集 span，退出时恢复之前的状态
+
+    使用示例:
+    with collect_spans() as spans:
+        await handle()
+    # spans: [{'name', 'duration', 'success', 'sizes'}, ...]
+    """
+    spans: List[Dict[str, Any]] = []
+    token = _current_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_spans.reset(token)
+
+
+@contextmanager
+def track_performance(operation: str, **sizes: Any) -> Iterator[Dict[str, Any]]:
     """
     性能追踪上下文管理器
     
+    yield 的字典为本次 span 的尺寸信息，执行过程中可以补充（如写入后的字节数）
+    
     使用示例:
-    with track_performance("ocr_processing"):
-        # 执行操作
-        pass
+    with track_performance("workbook_save", sheets=3) as span:
+        wb.save(path)
+        span['bytes'] = os.path.getsize(path)
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
     success = True
     
     try:
-        yield
-    except Exception as e:
+        yield sizes
+    except Exception:
         success = False
         raise
     finally:
-        duration = time.time() - start_time
-        _metrics_collector.record_operation(operation, duration, success)
+        duration = time.perf_counter() - start_time
+        record_span(operation, duration, success, sizes)
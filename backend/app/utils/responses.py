@@ -0,0 +1,32 @@
+"""
+直接编码的 JSON 响应
+大数据量的读取接口（如表格数据）由服务层构建 dict / list，
+在这里按 ResponseModel 的结构直接编码，跳过 pydantic 的校验与序列化
+"""
+from typing import Any, Dict, Optional
+
+from fastapi.responses import Response
+
+from app.utils.json_store import dumps
+
+
+def json_response(
+    message: str,
+    data: Any,
+    media_type: str = "application/json",
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    构建 {"success": true, "message": ..., "data": ...} 响应
+
+    Args:
+        message: 响应消息
+        data: 响应数据（只能包含 JSON 可编码的类型）
+        media_type: 响应的 Content-Type
+        headers: 额外的响应头
+    """
+    return Response(
+        content=dumps({"success": True, "message": message, "data": data}),
+        media_type=media_type,
+        headers=headers
+    )
@@ -2,8 +2,8 @@
  * Excel 编辑区域组件
  */
 import { useState, useEffect } from 'react';
-import { getTableData, generateExcel, saveTableData, downloadExcel } from '../../services/api';
-import type { TableDataResponse } from '../../types';
+import { getTableData, patchTableData, downloadExcel } from '../../services/api';
+import type { TableDataResponse, CellRangePatch } from '../../types';
 import EditableTableRenderer from './EditableTableRenderer';
 import './ExcelArea.css';
 
@@ -18,6 +18,8 @@ export default function ExcelArea({ taskId }: ExcelAreaProps) {
   const [error, setError] = useState<string>('');
   const [isModified, setIsModified] = useState(false);
   const [saving, setSaving] = useState(false);
+  // 未保存的修改：`${sheetId}:${row}:${col}` → 新文本
+  const [pendingEdits, setPendingEdits] = useState<Map<string, string>>(new Map());
 
   // 获取表格数据
   useEffect(() => {
@@ -25,6 +27,7 @@ export default function ExcelArea({ taskId }: ExcelAreaProps) {
       setTableData(null);
       setCurrentSheet(0);
       setIsModified(false);
+      setPendingEdits(new Map());
       return;
     }
 
@@ -37,6 +40,7 @@ export default function ExcelArea({ taskId }: ExcelAreaProps) {
         setTableData(response.data);
         setCurrentSheet(0);
         setIsModified(false);
+        setPendingEdits(new Map());
       } catch (err) {
         console.error('获取表格数据失败:', err);
         setError(err instanceof Error ? err.message : '获取表格数据失败');
@@ -55,8 +59,10 @@ export default function ExcelArea({ taskId }: ExcelAreaProps) {
     if (!tableData) return;
 
     const updatedData = { ...tableData };
-    updatedData.sheets[currentSheet].data[rowIndex][colIndex].text = newValue;
+    const sheet = updatedData.sheets[currentSheet];
+    sheet.data[rowIndex][colIndex].text = newValue;
     setTableData(updatedData);
+    setPendingEdits(new Map(pendingEdits).set(`${sheet.sheet_id}:${rowIndex}:${colIndex}`, newValue));
     setIsModified(true);
   };
 
@@ -66,9 +72,19 @@ export default function ExcelArea({ taskId }: ExcelAreaProps) {
     
     setSaving(true);
     try {
-      await saveTableData(taskId, tableData);
+      // 只提交修改过的单元格
+      const patches: CellRangePatch[] = Array.from(pendingEdits, ([key, text]) => {
+        const [sheetId, row, col] = key.split(':').map(Number);
+        return { sheet_id: sheetId, row, col, values: [[text]] };
+      });
+      const response = await patchTableData(taskId, {
+        base_version: tableData.version,
+        patches,
+      });
+      setTableData({ ...tableData, version: response.data.version });
+      setPendingEdits(new Map());
       setIsModified(false);
-      alert('保存成功！Excel 已更新。');
+      alert('保存成功！');
     } catch (err) {
       console.error('保存失败:', err);
       alert('保存失败: ' + (err instanceof Error ? err.message : '未知错误'));
@@ -90,27 +106,8 @@ export default function ExcelArea({ taskId }: ExcelAreaProps) {
         }
       }
       
-      // 尝试下载
-      try {
-        await downloadExcel(taskId);
-      } catch (downloadErr) {
-        // 如果下载失败（Excel文件不存在），先生成Excel再下载
-        const errorMessage = downloadErr instanceof Error ? downloadErr.message : '';
-        if (errorMessage.includes('Excel 文件尚未生成') || errorMessage.includes('Bad Request')) {
-          // 只调用 generateExcel，不调用 saveTableData
-          // generateExcel 会从 OCR JSON 生成 Excel
-          console.log('Excel文件不存在，正在生成...');
-          await generateExcel(taskId);
-          
-          // 等待一小段时间确保文件生成完成
-          await new Promise(resolve => setTimeout(resolve, 500));
-          
-          // 再次尝试下载
-          await downloadExcel(taskId);
-        } else {
-          throw downloadErr;
-        }
-      }
+      // 服务端按当前版本按需生成 Excel
+      await downloadExcel(taskId);
     } catch (err) {
       console.error('下载失败:', err);
       alert('下载失败: ' + (err instanceof Error ? err.message : '未知错误'));
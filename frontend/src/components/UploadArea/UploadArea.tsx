@@ -2,7 +2,7 @@
  * 上传区域组件
  */
 import { useState } from 'react';
-import { uploadImage, startOCR, pollOCR, getTask } from '../../services/api';
+import { uploadAndSubmitOCR, getTask } from '../../services/api';
 import { TaskStatus } from '../../types';
 import './UploadArea.css';
 
@@ -55,7 +55,7 @@ export default function UploadArea({ onUploadSuccess }: UploadAreaProps) {
   /**
    * 轮询 OCR 结果（递归）
    */
-  const pollOCRResult = async (taskId: string, maxAttempts = 30): Promise<void> => {
+  const pollOCRResult = async (taskId: string, maxAttempts = 150): Promise<void> => {
     for (let attempt = 0; attempt < maxAttempts; attempt++) {
       try {
         // 获取任务状态
@@ -75,11 +75,8 @@ export default function UploadArea({ onUploadSuccess }: UploadAreaProps) {
           throw new Error(task.error_message || 'OCR 识别失败');
         }
 
-        // 每 2 秒轮询一次
+        // 每 2 秒查询一次任务状态（OCR 由后台队列处理）
         await new Promise(resolve => setTimeout(resolve, 2000));
-        
-        // 调用 poll 接口尝试拉取结果
-        await pollOCR(taskId);
       } catch (error) {
         console.error('轮询 OCR 失败:', error);
         setUploadStatus('error');
@@ -100,25 +97,18 @@ export default function UploadArea({ onUploadSuccess }: UploadAreaProps) {
     if (!file) return;
 
     try {
-      // 1. 上传图片
+      // 1. 上传图片并提交 OCR（图片边上传边转发给 OCR 服务）
       setUploadStatus('uploading');
       setStatusMessage('正在上传图片...');
       setErrorMessage('');
       
-      const uploadResponse = await uploadImage(file);
+      const uploadResponse = await uploadAndSubmitOCR(file);
       const taskId = uploadResponse.data.task_id;
       setCurrentTaskId(taskId);
       
-      console.log('上传成功，任务ID:', taskId);
-
-      // 2. 启动 OCR
-      setUploadStatus('ocr_starting');
-      setStatusMessage('正在启动 OCR 识别...');
-      
-      await startOCR(taskId);
-      console.log('OCR 启动成功');
+      console.log('上传成功，OCR 已提交，任务ID:', taskId);
 
-      // 3. 开始轮询 OCR 结果
+      // 2. 开始轮询 OCR 结果
       setUploadStatus('ocr_polling');
       setStatusMessage('OCR 处理中，请稍候...');
       
@@ -1,7 +1,21 @@
 /**
  * API 服务
  */
-import type { ApiResponse, Task, TableDataResponse } from '../types';
+import type {
+  ApiResponse,
+  BatchCreateResponse,
+  BatchDownloadFormat,
+  BatchProgress,
+  DocumentCreateRequest,
+  DocumentInfo,
+  DocumentLayout,
+  Task,
+  TableDataResponse,
+  TablePatchRequest,
+  TablePatchResult,
+  TableWindow,
+  TableWindowQuery,
+} from '../types';
 
 const API_BASE = '/api/v1';
 
@@ -47,6 +61,25 @@ export async function uploadImage(file: File): Promise<ApiResponse<Task>> {
   return response.json();
 }
 
+/**
+ * 上传图片、创建任务并提交 OCR（一站式）
+ */
+export async function uploadAndSubmitOCR(file: File): Promise<ApiResponse<Task>> {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const response = await fetch(`${API_BASE}/upload/image-and-ocr`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok) {
+    await throwApiError(response, `上传失败: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
 /**
  * 获取任务信息
  */
@@ -75,6 +108,21 @@ export async function startOCR(taskId: string): Promise<ApiResponse> {
   return response.json();
 }
 
+/**
+ * 提交 OCR 到后台队列（立即返回）
+ */
+export async function submitOCR(taskId: string): Promise<ApiResponse> {
+  const response = await fetch(`${API_BASE}/ocr/submit/${taskId}`, {
+    method: 'POST',
+  });
+
+  if (!response.ok) {
+    await throwApiError(response, `提交 OCR 失败: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
 /**
  * 轮询 OCR 结果
  */
@@ -103,6 +151,32 @@ export async function getTableData(taskId: string): Promise<ApiResponse<TableDat
   return response.json();
 }
 
+/**
+ * 获取单个 Sheet 的窗口数据（按视口分页加载大表格）
+ */
+export async function getTableWindow(
+  taskId: string,
+  sheetId: number,
+  query: TableWindowQuery = {}
+): Promise<ApiResponse<TableWindow>> {
+  const params = new URLSearchParams();
+  Object.entries(query).forEach(([key, value]) => {
+    if (value !== undefined) {
+      params.set(key, String(value));
+    }
+  });
+  const search = params.toString();
+  const response = await fetch(
+    `${API_BASE}/table/data/${taskId}/sheets/${sheetId}${search ? `?${search}` : ''}`
+  );
+
+  if (!response.ok) {
+    await throwApiError(response, `获取表格数据失败: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
 /**
  * 生成 Excel
  */
@@ -119,10 +193,10 @@ export async function generateExcel(taskId: string): Promise<ApiResponse> {
 }
 
 /**
- * 保存表格数据
+ * 保存表格数据（整表，base_version 取 tableData.version，版本不一致时返回 409）
  */
 export async function saveTableData(taskId: string, tableData: TableDataResponse): Promise<ApiResponse> {
-  const response = await fetch(`${API_BASE}/table/save/${taskId}`, {
+  const response = await fetch(`${API_BASE}/table/save/${taskId}?base_version=${tableData.version}`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
@@ -138,18 +212,34 @@ export async function saveTableData(taskId: string, tableData: TableDataResponse
 }
 
 /**
- * 下载 Excel 文件
+ * 增量保存表格修改（只提交修改过的单元格）
  */
-export async function downloadExcel(taskId: string): Promise<void> {
-  const response = await fetch(`${API_BASE}/excel/download/${taskId}`);
+export async function patchTableData(
+  taskId: string,
+  patch: TablePatchRequest
+): Promise<ApiResponse<TablePatchResult>> {
+  const response = await fetch(`${API_BASE}/table/data/${taskId}`, {
+    method: 'PATCH',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(patch),
+  });
 
   if (!response.ok) {
-    await throwApiError(response, `下载 Excel 失败: ${response.statusText}`);
+    await throwApiError(response, `保存表格修改失败: ${response.statusText}`);
   }
 
+  return response.json();
+}
+
+/**
+ * 把文件下载响应保存到本地（文件名取自 Content-Disposition）
+ */
+async function saveResponseAsFile(response: Response, fallbackFilename: string): Promise<void> {
   // 获取文件名
   const contentDisposition = response.headers.get('Content-Disposition');
-  let filename = `table_${taskId}.xlsx`;
+  let filename = fallbackFilename;
   if (contentDisposition) {
     const matches = /filename[^;=\n]*=((['"]).*?\2|[^;\n]*)/.exec(contentDisposition);
     if (matches != null && matches[1]) {
@@ -168,3 +258,115 @@ export async function downloadExcel(taskId: string): Promise<void> {
   window.URL.revokeObjectURL(url);
   document.body.removeChild(a);
 }
+
+/**
+ * 下载 Excel 文件
+ */
+export async function downloadExcel(taskId: string): Promise<void> {
+  const response = await fetch(`${API_BASE}/excel/download/${taskId}`);
+
+  if (!response.ok) {
+    await throwApiError(response, `下载 Excel 失败: ${response.statusText}`);
+  }
+
+  await saveResponseAsFile(response, `table_${taskId}.xlsx`);
+}
+
+/**
+ * 批量上传图片（或 zip 压缩包）并提交 OCR
+ */
+export async function createBatch(files: File[], name?: string): Promise<ApiResponse<BatchCreateResponse>> {
+  const formData = new FormData();
+  files.forEach((file) => formData.append('files', file));
+  if (name) {
+    formData.append('name', name);
+  }
+
+  const response = await fetch(`${API_BASE}/batches`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok) {
+    await throwApiError(response, `批量上传失败: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
+/**
+ * 查询批次进度
+ */
+export async function getBatchProgress(batchId: string): Promise<ApiResponse<BatchProgress>> {
+  const response = await fetch(`${API_BASE}/batches/${batchId}`);
+
+  if (!response.ok) {
+    await throwApiError(response, `获取批次进度失败: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
+/**
+ * 下载批次的合并文件（xlsx：一个多 Sheet 工作簿；zip：每个任务一个工作簿）
+ */
+export async function downloadBatch(
+  batchId: string,
+  format: BatchDownloadFormat = 'xlsx',
+  partial = false
+): Promise<void> {
+  const params = new URLSearchParams({ format, partial: String(partial) });
+  const response = await fetch(`${API_BASE}/batches/${batchId}/download?${params}`);
+
+  if (!response.ok) {
+    await throwApiError(response, `下载批次文件失败: ${response.statusText}`);
+  }
+
+  await saveResponseAsFile(response, `batch_${batchId}.${format}`);
+}
+
+/**
+ * 创建文档（多个任务按页顺序合并，taskIds 与 batchId 二选一）
+ */
+export async function createDocument(request: DocumentCreateRequest): Promise<ApiResponse<DocumentInfo>> {
+  const response = await fetch(`${API_BASE}/documents`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(request),
+  });
+
+  if (!response.ok) {
+    await throwApiError(response, `创建文档失败: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
+/**
+ * 获取文档信息
+ */
+export async function getDocument(documentId: string): Promise<ApiResponse<DocumentInfo>> {
+  const response = await fetch(`${API_BASE}/documents/${documentId}`);
+
+  if (!response.ok) {
+    await throwApiError(response, `获取文档失败: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
+/**
+ * 下载文档合并后的工作簿
+ */
+export async function downloadDocument(documentId: string, layout?: DocumentLayout): Promise<void> {
+  const query = layout ? `?layout=${layout}` : '';
+  const response = await fetch(`${API_BASE}/documents/${documentId}/download${query}`);
+
+  if (!response.ok) {
+    await throwApiError(response, `下载文档失败: ${response.statusText}`);
+  }
+
+  await saveResponseAsFile(response, `document_${documentId}.xlsx`);
+}
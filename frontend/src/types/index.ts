@@ -5,6 +5,7 @@
 // 任务状态枚举
 export enum TaskStatus {
   UPLOADED = 'uploaded',
+  OCR_QUEUED = 'ocr_queued',
   OCR_PROCESSING = 'ocr_processing',
   OCR_DONE = 'ocr_done',
   OCR_FAILED = 'ocr_failed',
@@ -49,6 +50,108 @@ export interface TableDataResponse {
   status: string;
   total_sheets: number;
   sheets: TableSheet[];
+  version: number;
+}
+
+// 单元格区域修改
+export interface CellRangePatch {
+  sheet_id: number;
+  row: number;
+  col: number;
+  values: (string | null)[][];
+}
+
+// 表格增量修改请求
+export interface TablePatchRequest {
+  base_version: number;
+  patches: CellRangePatch[];
+}
+
+// 表格增量修改结果
+export interface TablePatchResult {
+  task_id: string;
+  version: number;
+  updated_sheets: number[];
+  updated_cells: number;
+}
+
+// 单个 Sheet 的窗口数据（部分行列）
+export interface TableWindow {
+  task_id: string;
+  sheet_id: number;
+  sheet_name: string;
+  rows: number; // Sheet 总行数
+  cols: number; // Sheet 总列数
+  row_offset: number;
+  col_offset: number;
+  data: CellData[][];
+  version: number;
+}
+
+// 窗口查询参数（未指定时使用服务端默认值）
+export interface TableWindowQuery {
+  row_offset?: number;
+  row_limit?: number;
+  col_offset?: number;
+  col_limit?: number;
+}
+
+// 批次内单个任务的状态
+export interface BatchItem {
+  position: number;
+  task_id: string;
+  filename: string;
+  status: TaskStatus | null;
+  error_message?: string | null;
+}
+
+// 批量上传结果
+export interface BatchCreateResponse {
+  batch_id: string;
+  name?: string | null;
+  total: number;
+  items: BatchItem[];
+  rejected: { filename: string; reason: string }[];
+}
+
+// 批次汇总进度
+export interface BatchProgress {
+  batch_id: string;
+  name?: string | null;
+  total: number;
+  queued: number;
+  processing: number;
+  done: number;
+  failed: number;
+  percent: number;
+  finished: boolean;
+  created_at: string;
+  items: BatchItem[];
+}
+
+// 批次下载格式
+export type BatchDownloadFormat = 'xlsx' | 'zip';
+
+// 文档工作簿布局：每个表格一个 Sheet / 所有表格纵向排列在一个 Sheet
+export type DocumentLayout = 'sheets' | 'stacked';
+
+// 创建文档请求（task_ids 与 batch_id 二选一）
+export interface DocumentCreateRequest {
+  name?: string;
+  task_ids?: string[];
+  batch_id?: string;
+  layout?: DocumentLayout;
+}
+
+// 文档信息
+export interface DocumentInfo {
+  document_id: string;
+  name?: string | null;
+  layout: DocumentLayout;
+  total_pages: number;
+  ready_pages: number;
+  created_at: string;
+  pages: { page_no: number; task_id: string; status: TaskStatus | null }[];
 }
 
 // API 响应基础结构
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+"""
+合并单元格展开基准测试
+对比 rowspan / colspan 展开的两种实现（只测 CPU 耗时，不含 HTML 解析）：
+- loop：逐单元格、逐列的纯 Python 循环（优化前）
+- numpy：按列的占用位图放置单元格，网格与展开结果一次性向量化生成（当前实现）
+
+覆盖三个环节：
+- build：HTMLTableParser 行数据 → TableIR（build_table_ir）
+- dataframe：ExcelService.parse_html_table 的展开
+- cells：TableService.parse_html_table_to_cells / 窗口读取的展开（ir_window_to_rows）
+
+用法（项目根目录）：
+    PYTHONPATH=backend python scripts/bench_span_expansion.py
+    PYTHONPATH=backend python scripts/bench_span_expansion.py --cells 40000 --repeat 5
+"""
+import argparse
+import glob
+import statistics
+import time
+from array import array
+
+import pandas as pd
+
+from app.services.excel_service import ExcelService
+from app.services.ocr_store import load_table_html_blocks
+from app.services.table_ir import HTMLTableParser, TableIR, build_table_ir, parse_table_html
+from app.services.table_service import TableService, _EMPTY_CELL, _EMPTY_HEADER_CELL
+
+
+def loop_build_table_ir(rows_data):
+    """优化前的 build_table_ir：逐列查找空位、逐位置写入网格"""
+    n_cols = 0
+    for row in rows_data:
+        n_cols = max(n_cols, sum(cell['colspan'] for cell in row))
+
+    grid = array('i')
+    texts = []
+    anchor_rows = array('i')
+    anchor_cols = array('i')
+    rowspans = array('i')
+    colspans = array('i')
+    headers = bytearray()
+
+    if n_cols <= 0:
+        return TableIR(0, 0, grid, texts, anchor_rows, anchor_cols, rowspans, colspans, headers)
+
+    empty_row = array('i', [-1]) * n_cols
+    n_rows = 0
+
+    for row_idx, row in enumerate(rows_data):
+        while n_rows <= row_idx:
+            grid.extend(empty_row)
+            n_rows += 1
+
+        base = row_idx * n_cols
+        col_idx = 0
+        for cell in row:
+            while col_idx < n_cols and grid[base + col_idx] != -1:
+                col_idx += 1
+            if col_idx >= n_cols:
+                break
+
+            colspan = 1
+            max_colspan = max(cell['colspan'], 1)
+            while (colspan < max_colspan and col_idx + colspan < n_cols
+                   and grid[base + col_idx + colspan] == -1):
+                colspan += 1
+            rowspan = max(cell['rowspan'], 1)
+
+            cell_id = len(texts)
+            texts.append(cell['text'])
+            anchor_rows.append(row_idx)
+            anchor_cols.append(col_idx)
+            rowspans.append(rowspan)
+            colspans.append(colspan)
+            headers.append(1 if cell['is_header'] else 0)
+
+            while n_rows < row_idx + rowspan:
+                grid.extend(empty_row)
+                n_rows += 1
+            for r in range(row_idx, row_idx + rowspan):
+                offset = r * n_cols + col_idx
+                for c in range(colspan):
+                    grid[offset + c] = cell_id
+
+            col_idx += colspan
+
+    return TableIR(n_rows, n_cols, grid, texts, anchor_rows, anchor_cols, rowspans, colspans, headers)
+
+
+def loop_dataframe(html_content):
+    """优化前的 ExcelService.parse_html_table"""
+    ir = parse_table_html(html_content)
+    if ir.is_empty:
+        return pd.DataFrame()
+    expanded_rows = [[''] * ir.n_cols for _ in range(ir.n_rows)]
+    for cell_id, row, col, rowspan, _ in ir.iter_cells():
+        text = ir.texts[cell_id]
+        for r in range(row, row + rowspan):
+            expanded_rows[r][col] = text
+    return pd.DataFrame(expanded_rows)
+
+
+def loop_window_rows(ir):
+    """优化前的 TableService.ir_window_to_rows（整表窗口）"""
+    anchors = {}
+    expanded_rows = []
+    for row_idx in range(ir.n_rows):
+        base = row_idx * ir.n_cols
+        expanded_row = []
+        for col_idx in range(ir.n_cols):
+            cell_id = ir.grid[base + col_idx]
+            if cell_id == -1:
+                expanded_row.append(_EMPTY_CELL)
+            elif ir.anchor_rows[cell_id] == row_idx and ir.anchor_cols[cell_id] != col_idx:
+                expanded_row.append(_EMPTY_HEADER_CELL if ir.headers[cell_id] else _EMPTY_CELL)
+            else:
+                cell = anchors.get(cell_id)
+                if cell is None:
+                    cell = anchors[cell_id] = {
+                        "text": ir.texts[cell_id],
+                        "rowspan": ir.rowspans[cell_id],
+                        "colspan": ir.colspans[cell_id],
+                        "is_header": bool(ir.headers[cell_id])
+                    }
+                expanded_row.append(cell)
+        expanded_rows.append(expanded_row)
+    return expanded_rows
+
+
+def synthetic_html(kind, n_cells):
+    """
+    构造约 n_cells 个位置的表格
+
+    - plain：方表，没有合并单元格
+    - merged：方表，首列每 10 行一个 rowspan，每行若干 colspan=2，表头行整体 colspan
+    - wide：宽表，前 3 列整表 rowspan（每一行都有被占用的列），其余列间隔 colspan=3
+    """
+    parts = ['<table>']
+    if kind == 'wide':
+        rows = 20
+        cols = max(n_cells // rows, 8)
+        for r in range(rows):
+            parts.append('<tr>')
+            if r == 0:
+                parts.extend(f'<th rowspan="{rows}">K{c}</th>' for c in range(3))
+            c = 3
+            while c < cols:
+                if (r + c) % 7 == 0 and c + 3 <= cols:
+                    parts.append(f'<td colspan="3">{r}-{c}</td>')
+                    c += 3
+                else:
+                    parts.append(f'<td>{r}-{c}</td>')
+                    c += 1
+            parts.append('</tr>')
+    else:
+        side = max(int(n_cells ** 0.5), 4)
+        for r in range(side):
+            parts.append('<tr>')
+            if kind == 'merged' and r == 0:
+                parts.extend(f'<th colspan="4">H{c}</th>' for c in range(side // 4))
+                parts.extend('<th>H</th>' for _ in range(side % 4))
+                parts.append('</tr>')
+                continue
+            c = 0
+            if kind == 'merged':
+                if r % 10 == 1:
+                    parts.append(f'<td rowspan="10">G{r}</td>')
+                c = 1
+            while c < side:
+                if kind == 'merged' and (r + c) % 5 == 0 and c + 2 <= side:
+                    parts.append(f'<td colspan="2">{r}-{c}</td>')
+                    c += 2
+                else:
+                    parts.append(f'<td>{r}-{c}</td>')
+                    c += 1
+            parts.append('</tr>')
+    parts.append('</table>')
+    return ''.join(parts)
+
+
+def load_corpus_html(pattern):
+    return [html for path in sorted(glob.glob(pattern)) for html in load_table_html_blocks(path)]
+
+
+def same_ir(a, b):
+    return (
+        (a.n_rows, a.n_cols, a.texts) == (b.n_rows, b.n_cols, b.texts)
+        and a.grid == b.grid
+        and (a.anchor_rows, a.anchor_cols, a.rowspans, a.colspans, a.headers)
+        == (b.anchor_rows, b.anchor_cols, b.rowspans, b.colspans, b.headers)
+    )
+
+
+def timed(fn, items, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def run_case(label, html_contents, repeat):
+    rows_data = []
+    for html_content in html_contents:
+        parser = HTMLTableParser()
+        parser.feed(html_content)
+        rows_data.append(parser.get_table_data())
+    irs = [parse_table_html(html_content) for html_content in html_contents]
+
+    # 两种实现的结果必须一致
+    for data, ir, html_content in zip(rows_data, irs, html_contents):
+        assert same_ir(loop_build_table_ir(data), build_table_ir(data)), f"{label}: build 结果不一致"
+        assert loop_dataframe(html_content).equals(ExcelService.parse_html_table(html_content)), \
+            f"{label}: dataframe 结果不一致"
+        assert loop_window_rows(ir) == TableService.ir_window_to_rows(ir, 0, ir.n_rows, 0, ir.n_cols), \
+            f"{label}: cells 结果不一致"
+
+    cells = sum(ir.n_rows * ir.n_cols for ir in irs)
+    spans = sum(len(ir.merges()) for ir in irs)
+    print(f"{label}: {len(irs)} 个表格, {cells} 个位置, {spans} 个合并区域")
+    stages = [
+        ("build", loop_build_table_ir, build_table_ir, rows_data),
+        ("dataframe", loop_dataframe, ExcelService.parse_html_table, html_contents),
+        ("cells", loop_window_rows, lambda ir: TableService.ir_window_to_rows(ir, 0, ir.n_rows, 0, ir.n_cols), irs),
+    ]
+    for name, baseline, current, items in stages:
+        loop_ms = timed(baseline, items, repeat)
+        numpy_ms = timed(current, items, repeat)
+        print(f"  {name:<10} loop {loop_ms:8.2f} ms   numpy {numpy_ms:8.2f} ms   {loop_ms / numpy_ms:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并单元格展开基准测试")
+    parser.add_argument("--corpus", default="data/ocr_json/*.json", help="OCR JSON 文件 glob")
+    parser.add_argument("--cells", type=int, default=10000, help="合成表格的位置数")
+    parser.add_argument("--repeat", type=int, default=7, help="每种实现重复次数（取中位数）")
+    args = parser.parse_args()
+
+    corpus = load_corpus_html(args.corpus)
+    if corpus:
+        run_case("corpus", corpus, args.repeat)
+    for kind in ("plain", "merged", "wide"):
+        run_case(f"{kind}-{args.cells}", [synthetic_html(kind, args.cells)], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
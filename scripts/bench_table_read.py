@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+表格读取路径基准测试
+对比 GET /api/v1/table/data 的两种响应构建方式（不经过 HTTP，只测服务端 CPU 耗时）：
+- pydantic：逐单元格构建校验过的 CellData → TableDataResponse → model_dump → ResponseModel 序列化（优化前）
+- direct：从中间表示展开为 dict，直接编码为 JSON（当前实现）
+- columnar：列式编码（Accept: application/x-table-columnar+json）
+
+用法（项目根目录）：
+    PYTHONPATH=backend python scripts/bench_table_read.py
+    PYTHONPATH=backend python scripts/bench_table_read.py --rows 5000 --cols 12 --repeat 5
+"""
+import argparse
+import glob
+import json
+import random
+import statistics
+import time
+
+from app.schemas.common import ResponseModel
+from app.schemas.table import CellData, TableDataResponse, TableSheet
+from app.services.ocr_store import load_table_html_blocks
+from app.services.table_columnar import encode_columnar_sheet
+from app.services.table_ir import parse_table_html
+from app.services.table_service import TableService
+from app.utils.json_store import dumps
+
+
+def load_corpus_irs(pattern):
+    """读取 data/ocr_json 中的所有非空表格"""
+    irs = []
+    for path in sorted(glob.glob(pattern)):
+        for html_content in load_table_html_blocks(path):
+            ir = parse_table_html(html_content)
+            if not ir.is_empty:
+                irs.append(ir)
+    return irs
+
+
+def build_synthetic_ir(rows, cols, seed=0):
+    """构造大表格：每 50 行一个 2×2 合并单元格，首行为表头"""
+    rng = random.Random(seed)
+    parts = ['<table>', '<tr>', *(f'<th>列{c}</th>' for c in range(cols)), '</tr>']
+    for r in range(1, rows):
+        parts.append('<tr>')
+        if r % 50 == 1:
+            parts.append('<td rowspan="2" colspan="2">合并</td>')
+            parts.extend(f'<td>{rng.randint(0, 99999)}</td>' for _ in range(cols - 2))
+        elif r % 50 == 2:
+            parts.extend(f'<td>{rng.randint(0, 99999)}</td>' for _ in range(cols - 2))
+        else:
+            parts.extend(f'<td>{rng.randint(0, 99999)}</td>' for _ in range(cols))
+        parts.append('</tr>')
+    parts.append('</table>')
+    return parse_table_html(''.join(parts))
+
+
+def pydantic_body(irs):
+    """优化前的实现：校验过的 CellData + ResponseModel 序列化"""
+    sheets = []
+    for sheet_id, ir in enumerate(irs, start=1):
+        anchors = [
+            CellData(
+                text=ir.texts[cell_id],
+                rowspan=ir.rowspans[cell_id],
+                colspan=ir.colspans[cell_id],
+                is_header=bool(ir.headers[cell_id])
+            )
+            for cell_id in range(ir.n_cells)
+        ]
+        data = []
+        for row_idx in range(ir.n_rows):
+            row = []
+            for col_idx in range(ir.n_cols):
+                cell_id = ir.grid[row_idx * ir.n_cols + col_idx]
+                if cell_id == -1:
+                    row.append(CellData(text="", rowspan=1, colspan=1, is_header=False))
+                elif ir.anchor_rows[cell_id] == row_idx and ir.anchor_cols[cell_id] != col_idx:
+                    row.append(CellData(text="", rowspan=1, colspan=1, is_header=bool(ir.headers[cell_id])))
+                else:
+                    row.append(anchors[cell_id])
+            data.append(row)
+        sheets.append(TableSheet(
+            sheet_id=sheet_id, sheet_name=f"Table_{sheet_id}", rows=ir.n_rows, cols=ir.n_cols, data=data
+        ))
+    response = TableDataResponse(
+        task_id="bench", status="editable", total_sheets=len(sheets), sheets=sheets, version=0
+    )
+    envelope = ResponseModel(success=True, message="ok", data=response.model_dump())
+    return json.dumps(envelope.model_dump(mode="json"), ensure_ascii=False).encode("utf-8")
+
+
+def direct_body(irs):
+    """当前实现：dict 展开 + 直接编码"""
+    data = {
+        "task_id": "bench",
+        "status": "editable",
+        "total_sheets": len(irs),
+        "sheets": TableService.build_sheet_payloads(irs),
+        "version": 0
+    }
+    return dumps({"success": True, "message": "ok", "data": data})
+
+
+def columnar_body(irs):
+    """列式编码"""
+    data = {
+        "task_id": "bench",
+        "status": "editable",
+        "total_sheets": len(irs),
+        "version": 0,
+        "sheets": [
+            encode_columnar_sheet(sheet_id, f"Table_{sheet_id}", ir)
+            for sheet_id, ir in enumerate(irs, start=1)
+        ]
+    }
+    return dumps({"success": True, "message": "ok", "data": data})
+
+
+def bench(name, fn, irs, repeat):
+    timings = []
+    body = b''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(irs)
+        timings.append(time.perf_counter() - start)
+    print(f"  {name:<10} median {statistics.median(timings) * 1000:8.1f} ms   body {len(body) / 1024:9.1f} KB")
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="表格读取路径基准测试")
+    parser.add_argument("--corpus", default="data/ocr_json/*.json", help="OCR JSON 文件 glob")
+    parser.add_argument("--rows", type=int, default=5000, help="合成大表格行数（0 表示跳过）")
+    parser.add_argument("--cols", type=int, default=12, help="合成大表格列数")
+    parser.add_argument("--repeat", type=int, default=5, help="每种方式重复次数（取中位数）")
+    args = parser.parse_args()
+
+    cases = [("corpus", load_corpus_irs(args.corpus))]
+    if args.rows > 0:
+        cases.append((f"{args.rows}x{args.cols}", [build_synthetic_ir(args.rows, args.cols)]))
+
+    for label, irs in cases:
+        cells = sum(ir.n_rows * ir.n_cols for ir in irs)
+        print(f"{label}: {len(irs)} 个表格, {cells} 个单元格")
+        baseline = bench("pydantic", pydantic_body, irs, args.repeat)
+        current = bench("direct", direct_body, irs, args.repeat)
+        bench("columnar", columnar_body, irs, args.repeat)
+        # 两种方式的响应内容必须一致
+        assert json.loads(baseline) == json.loads(current), "direct 与 pydantic 响应不一致"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+HTML 表格扫描器正确性校验与基准测试
+专用扫描器（TABLE_HTML_TOKENIZER=regex）必须与 HTMLTableParser 得到相同的中间表示，
+无法处理的标记必须返回 None（回退到 HTMLTableParser），不能给出不同的结果：
+
+- corpus：data/ocr_json 中的所有表格
+- edge：子集边界上的手写用例（字符引用、大小写、内嵌标签、注释、未闭合标签等）
+- mutated：对语料随机删除 / 替换标签、插入特殊字符后的变体
+
+用法（项目根目录）：
+    PYTHONPATH=backend python scripts/check_table_tokenizer.py
+    PYTHONPATH=backend python scripts/check_table_tokenizer.py --mutations 2000 --repeat 5
+"""
+import argparse
+import glob
+import random
+import re
+import statistics
+import time
+
+from app.services.ocr_store import load_table_html_blocks
+from app.services.table_ir import HTMLTableParser, build_table_ir, build_table_ir_from_cells, scan_table_cells
+
+EDGE_CASES = [
+    '<table><tr><td>a &amp; b</td><td>&lt;x&gt; &#36;&nbsp;1</td></tr></table>',
+    '<TABLE><TR><TD ROWSPAN="2">A</TD><Td>b</tD></TR><tr><td>c</td></tr></TABLE>',
+    '<table><tr><td><b>粗体</b> 与 <i>斜体</i><br/>换行</td><td><img src="a.png" alt="x"/></td></tr></table>',
+    '<table><tr><td colspan=2>unquoted</td></tr><tr><td rowspan=\'3\' colspan = "1">q</td><td>z</td></tr></table>',
+    '<table><tr><td colspan="2" colspan="3">dup</td><td>x</td></tr></table>',
+    '<table><tr><td class="c" style="width:10px" colspan="2">styled</td></tr></table>',
+    '<table>\n  <tr>\n    <th>H1</th>\n    <th>H2</th>\n  </tr>\n  <tr><td>\n  1 \n</td><td> 2</td></tr>\n</table>',
+    '<html><body><table><tr><td>wrapped</td></tr></table></body></html>',
+    '<table><tr><td>a < b</td><td>c</td></tr></table>',
+    '<table><tr><td>x<!-- comment --></td></tr></table>',
+    '<table><tr><td>unclosed<td>next</td></tr></table>',
+    '<table><tr><td>a</td></tr><tr><td>b</td></table>',
+    '<table><tr><td>outer<table><tr><td>inner</td></tr></table></td></tr></table>',
+    '<table><tr><td>a</td></tr></table><table><tr><td>b</td></tr></table>',
+    '<table><tr><td colspan="2.0">bad span</td></tr></table>',
+    '<table><tr><td colspan="0">zero</td><td rowspan="0">zero</td></tr></table>',
+    '<table><tr><td title="a>b">quoted gt</td></tr></table>',
+    '<table><tr><td/><td>self closing</td></tr></table>',
+    '<table><tr><td>x</td></tr><script>var s = "<td>";</script></table>',
+    '<table><tr></tr><tr><td>after empty row</td></tr></table>',
+    '<table><tr><td>a&amp</td><td>&unknown;</td></tr></table>',
+    '<table><tr><td>a</td></tr>',
+    '',
+]
+
+
+def parse_with_htmlparser(html_content):
+    parser = HTMLTableParser()
+    parser.feed(html_content)
+    return build_table_ir(parser.get_table_data())
+
+
+def parse_with_scanner(html_content):
+    cells = scan_table_cells(html_content)
+    return None if cells is None else build_table_ir_from_cells(*cells)
+
+
+def check(html_content):
+    """
+    Returns:
+        'match' / 'fallback'；两种方式结果不一致时抛出 AssertionError
+    """
+    scanned = parse_with_scanner(html_content)
+    if scanned is None:
+        return 'fallback'
+    expected = parse_with_htmlparser(html_content)
+    assert scanned.to_dict() == expected.to_dict(), f"扫描结果不一致: {html_content[:200]!r}"
+    return 'match'
+
+
+def mutate(html_content, rng):
+    """随机删除或替换一个标签，或插入特殊字符"""
+    tags = list(re.finditer(r'<[^<>]*>', html_content))
+    choice = rng.random()
+    if tags and choice < 0.4:
+        tag = rng.choice(tags)
+        return html_content[:tag.start()] + html_content[tag.end():]
+    if tags and choice < 0.7:
+        tag = rng.choice(tags)
+        replacement = rng.choice(['<td>', '</td>', '<tr>', '</tr>', '<th colspan="2">', '<br/>', '<b>', '<td rowspan="3">'])
+        return html_content[:tag.start()] + replacement + html_content[tag.end():]
+    pos = rng.randrange(len(html_content) + 1)
+    return html_content[:pos] + rng.choice(['&amp;', '<', '>', '<!-- x -->', '&#x41;', ' ', '\n']) + html_content[pos:]
+
+
+def timed(fn, items, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML 表格扫描器正确性校验与基准测试")
+    parser.add_argument("--corpus", default="data/ocr_json/*.json", help="OCR JSON 文件 glob")
+    parser.add_argument("--mutations", type=int, default=1000, help="随机变体数量")
+    parser.add_argument("--repeat", type=int, default=5, help="基准测试重复次数（取中位数）")
+    args = parser.parse_args()
+
+    corpus = [html for path in sorted(glob.glob(args.corpus)) for html in load_table_html_blocks(path)]
+    rng = random.Random(0)
+    mutated = [mutate(rng.choice(corpus), rng) for _ in range(args.mutations)] if corpus else []
+
+    for label, items in (("corpus", corpus), ("edge", EDGE_CASES), ("mutated", mutated)):
+        results = [check(html_content) for html_content in items]
+        print(f"{label:<8} {len(items):5d} 个表格: 一致 {results.count('match')}, 回退 {results.count('fallback')}")
+    assert all(check(html_content) == 'match' for html_content in corpus), "语料中的表格不应回退"
+
+    if corpus:
+        cells = sum(html_content.count('<td') + html_content.count('<th') for html_content in corpus)
+        htmlparser_ms = timed(parse_with_htmlparser, corpus, args.repeat)
+        scanner_ms = timed(parse_with_scanner, corpus, args.repeat)
+        print(f"corpus ({cells} 个单元格): htmlparser {htmlparser_ms:.1f} ms   regex {scanner_ms:.1f} ms   "
+              f"{htmlparser_ms / scanner_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()